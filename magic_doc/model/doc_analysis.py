@@ -29,6 +29,7 @@ from magic_doc.model.seq_layout import SeqLayout
 import paddle 
 
 from magic_doc.utils.yaml_load import patch_yaml_load_with_env
+from magic_pdf.libs.Constants import MFD_BATCH_SIZE_VALUE
 from magic_doc.utils import get_repo_directory
 
 logging.disable(logging.WARNING)
@@ -71,6 +72,7 @@ class DocAnalysis(object):
           apply_layout: do layout analysis or not, must be True (defaults to be True).
           apply_formula: do formulat detection and recognition or not, defaults to be False.
           apply_ocr: do ocr(text detection and recognition) or not, defaults to be False.
+          mfd_batch_size: number of pages sent to the formula detection model at once, defaults to be MFD_BATCH_SIZE_VALUE (same as magic_pdf).
 
         """
         self.configs = patch_yaml_load_with_env(configs, "model", yaml.FullLoader)  # load config and patch with env var !
@@ -79,6 +81,7 @@ class DocAnalysis(object):
             "apply_formula", self.configs["models"]["formula"]
         )
         self.apply_ocr = kwargs.get("apply_ocr", self.configs["models"]["ocr"])
+        self.mfd_batch_size = max(kwargs.get("mfd_batch_size", MFD_BATCH_SIZE_VALUE), 1)
         logging.info(
             "DocAnalysis init, this may take some times. apply_layout: {}, apply_formula: {}, apply_ocr: {}".format(
                 self.apply_layout, self.apply_formula, self.apply_ocr
@@ -147,14 +150,25 @@ class DocAnalysis(object):
 
         layout_inference_results = self.layout_model(layout_inference_reqs)
 
+        mfd_results = []
+        if self.apply_formula:
+            for start in range(0, len(image_list), self.mfd_batch_size):
+                mfd_results.extend(
+                    self.mfd_model.predict(
+                        image_list[start: start + self.mfd_batch_size],
+                        imgsz=1888,
+                        conf=0.25,
+                        iou=0.45,
+                        verbose=False,
+                    )
+                )
+
         for idx, layout_res in layout_inference_results:
             image = image_list[idx]
             img_H, img_W = image.shape[0], image.shape[1]
 
             if self.apply_formula:
-                mfd_res = self.mfd_model.predict(
-                    image, imgsz=1888, conf=0.25, iou=0.45, verbose=False
-                )[0]
+                mfd_res = mfd_results[idx]
                 for xyxy, conf, cla in zip(
                     mfd_res.boxes.xyxy.cpu(),
                     mfd_res.boxes.conf.cpu(),
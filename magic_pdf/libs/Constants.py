@@ -16,6 +16,75 @@ STRUCT_EQTABLE = "struct_eqtable"
 # table recognition max time default value
 TABLE_MAX_TIME_VALUE = 400
 
+# table recognition time budget of a whole document
+TABLE_DOC_MAX_TIME_VALUE = 1200
+
+# table recognition batch size default value
+TABLE_BATCH_SIZE_VALUE = 1
+
+# batches of table crops buffered and sorted by size before they are dispatched
+TABLE_SORT_WINDOW_VALUE = 4
+
+# layout detection batch size default value
+LAYOUT_BATCH_SIZE_VALUE = 1
+
+# formula detection batch size default value
+MFD_BATCH_SIZE_VALUE = 1
+
+# formula detection input image size
+MFD_IMG_SIZE = 1888
+
+# formula recognition batch size default value
+MFR_BATCH_SIZE_VALUE = 64
+
+# entries of the cross-document formula latex cache, 0 only deduplicates formulas within a document
+MFR_CACHE_SIZE_VALUE = 0
+
+# skip model inference on blank pages
+BLANK_PAGE_ENABLE_VALUE = True
+
+# a page is only treated as blank when the pdf page also has no text, images or drawings
+BLANK_PAGE_REQUIRE_EMPTY_PDF_VALUE = True
+
+# a rendered page is blank when fewer than this ratio of its pixels differ from the background
+BLANK_PAGE_INK_RATIO = 0.0001
+
+# gray level difference from the background for a pixel to count as ink
+BLANK_PAGE_INK_THRESHOLD = 48
+
+# number of pages rendered ahead of model inference
+RASTER_PREFETCH_VALUE = 4
+
+# number of processes used for page rendering, 0 renders in a background thread
+RASTER_WORKERS_VALUE = 0
+
+# pixel budget of a rendered page when adaptive dpi is enabled, A4 and Letter at 200 dpi fit in it
+RASTER_MAX_PIXELS_VALUE = 4500000
+
+# lowest dpi chosen by the font size rule of adaptive dpi
+RASTER_MIN_DPI_VALUE = 100
+
+# rendered height in pixels of the median font that adaptive dpi aims for
+RASTER_TARGET_FONT_PX_VALUE = 40
+
+# pages buffered between model inference and parsing in pipelined mode
+PIPELINE_QUEUE_SIZE_VALUE = 8
+
+# max disk usage of the page result cache, in MB
+PAGE_CACHE_MAX_SIZE_MB_VALUE = 2048
+
+# number of model processes used on cpu, values below 2 use a single model instance in the current process
+MODEL_POOL_WORKERS_VALUE = 0
+
+# pages per task dispatched to the model processes
+MODEL_POOL_TASK_PAGES_VALUE = 1
+
+# inference backend of layout and formula recognition models
+INFERENCE_BACKEND_TORCH = "torch"
+
+# dynamic int8 quantization of the Linear layers, only used when device is cpu
+INFERENCE_BACKEND_TORCH_INT8 = "torch_int8"
+
 # pp_table_result_max_length
 TABLE_MAX_LEN = 480
 
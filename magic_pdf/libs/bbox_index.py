@@ -0,0 +1,43 @@
+"""
+页面级的均匀网格空间索引, 按bbox查询可能相交的候选框, 避免对所有框两两计算重叠
+"""
+import math
+
+# 网格边长(pdf坐标), 常规页面约12x16个格子
+GRID_CELL_SIZE = 50
+
+
+class BboxGridIndex:
+    """
+    把每个bbox登记到它覆盖的所有格子中, 查询时只返回与查询框覆盖的格子有交集的bbox下标
+    支持按下标删除, 删除后的bbox不再出现在查询结果中
+    """
+
+    def __init__(self, bboxes: list, cell_size: float = GRID_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.removed = set()
+        for idx, bbox in enumerate(bboxes):
+            for cell in self._cells_of(bbox):
+                self.cells.setdefault(cell, []).append(idx)
+
+    def _cells_of(self, bbox):
+        x0, y0, x1, y1 = bbox[:4]
+        col_start, col_end = math.floor(min(x0, x1) / self.cell_size), math.floor(max(x0, x1) / self.cell_size)
+        row_start, row_end = math.floor(min(y0, y1) / self.cell_size), math.floor(max(y0, y1) / self.cell_size)
+        for col in range(col_start, col_end + 1):
+            for row in range(row_start, row_end + 1):
+                yield col, row
+
+    def query(self, bbox) -> list:
+        """
+        return: 与bbox所在格子有交集且未删除的bbox下标, 按下标升序
+        边界相接的bbox也会返回, 是否真正重叠由调用方判断
+        """
+        candidates = set()
+        for cell in self._cells_of(bbox):
+            candidates.update(self.cells.get(cell, ()))
+        return sorted(candidates - self.removed)
+
+    def remove(self, idx: int):
+        self.removed.add(idx)
@@ -3,6 +3,8 @@
 from loguru import logger
 import math
 
+import numpy as np
+
 def _is_in_or_part_overlap(box1, box2) -> bool:
     """
     两个bbox是否有部分重叠或者包含
@@ -256,6 +258,65 @@ def get_minbox_if_overlap_by_ratio(bbox1, bbox2, ratio):
     else:
         return None
 
+def _intersection_area_matrix(bboxes1: np.ndarray, bboxes2: np.ndarray):
+    """
+    bboxes1: (N, 4), bboxes2: (M, 4)
+    return: (N, M)的重叠面积, 以及(N, M)的不相交标记, 不相交的位置重叠面积无意义
+    """
+    x_left = np.maximum(bboxes1[:, None, 0], bboxes2[None, :, 0])
+    y_top = np.maximum(bboxes1[:, None, 1], bboxes2[None, :, 1])
+    x_right = np.minimum(bboxes1[:, None, 2], bboxes2[None, :, 2])
+    y_bottom = np.minimum(bboxes1[:, None, 3], bboxes2[None, :, 3])
+    no_overlap = (x_right < x_left) | (y_bottom < y_top)
+    return (x_right - x_left) * (y_bottom - y_top), no_overlap
+
+
+def _bbox_area_array(bboxes: np.ndarray):
+    return (bboxes[:, 2] - bboxes[:, 0]) * (bboxes[:, 3] - bboxes[:, 1])
+
+
+def calculate_iou_matrix(bboxes1: np.ndarray, bboxes2: np.ndarray):
+    """
+    批量计算两组bbox两两之间的iou, 计算方式与calculate_iou相同
+    return: (N, M)的np.ndarray, 并集面积为0(calculate_iou会抛出除零异常)的位置为nan
+    """
+    intersection_area, no_overlap = _intersection_area_matrix(bboxes1, bboxes2)
+    union_area = _bbox_area_array(bboxes1)[:, None] + _bbox_area_array(bboxes2)[None, :] - intersection_area
+    with np.errstate(divide='ignore', invalid='ignore'):
+        iou = intersection_area / union_area
+    return np.where(no_overlap, 0.0, iou)
+
+
+def calculate_overlap_area_2_minbox_area_ratio_matrix(bboxes1: np.ndarray, bboxes2: np.ndarray):
+    """
+    批量计算两组bbox两两之间的重叠面积占最小面积的box的比例, 计算方式与calculate_overlap_area_2_minbox_area_ratio相同
+    return: (N, M)的np.ndarray
+    """
+    intersection_area, no_overlap = _intersection_area_matrix(bboxes1, bboxes2)
+    min_box_area = np.minimum(_bbox_area_array(bboxes1)[:, None], _bbox_area_array(bboxes2)[None, :])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = intersection_area / min_box_area
+    return np.where(no_overlap | (min_box_area == 0), 0.0, ratio)
+
+
+def _is_in_matrix(bboxes1: np.ndarray, bboxes2: np.ndarray):
+    """
+    批量判断bboxes1中的每个box是否完全在bboxes2中的每个box里面, 与_is_in相同
+    return: (N, M)的bool np.ndarray
+    """
+    return ((bboxes1[:, None, 0] >= bboxes2[None, :, 0]) & (bboxes1[:, None, 1] >= bboxes2[None, :, 1]) &
+            (bboxes1[:, None, 2] <= bboxes2[None, :, 2]) & (bboxes1[:, None, 3] <= bboxes2[None, :, 3]))
+
+
+def _is_in_or_part_overlap_matrix(bboxes1: np.ndarray, bboxes2: np.ndarray):
+    """
+    批量判断两组bbox两两之间是否有部分重叠或者包含, 与_is_in_or_part_overlap相同
+    return: (N, M)的bool np.ndarray
+    """
+    return ~((bboxes1[:, None, 2] < bboxes2[None, :, 0]) | (bboxes1[:, None, 0] > bboxes2[None, :, 2]) |
+             (bboxes1[:, None, 3] < bboxes2[None, :, 1]) | (bboxes1[:, None, 1] > bboxes2[None, :, 3]))
+
+
 def get_bbox_in_boundry(bboxes:list, boundry:tuple)-> list:
     x0, y0, x1, y1 = boundry
     new_boxes = [box for box in bboxes if box[0] >= x0 and box[1] >= y0 and box[2] <= x1 and box[3] <= y1]
@@ -405,4 +466,41 @@ def bbox_distance(bbox1, bbox2):
     elif top:
         return y2 - y1b
     else:             # rectangles intersect
-        return 0
\ No newline at end of file
+        return 0
+
+
+def bbox_relative_pos_matrix(bboxes1: np.ndarray, bboxes2: np.ndarray):
+    """
+    批量计算bboxes1中的每个box相对于bboxes2中的每个box的位置关系, 与bbox_relative_pos相同
+    return: (left, right, bottom, top), 每个都是(N, M)的bool np.ndarray
+    """
+    left = bboxes2[None, :, 2] < bboxes1[:, None, 0]
+    right = bboxes1[:, None, 2] < bboxes2[None, :, 0]
+    bottom = bboxes2[None, :, 3] < bboxes1[:, None, 1]
+    top = bboxes1[:, None, 3] < bboxes2[None, :, 1]
+    return left, right, bottom, top
+
+
+def bbox_distance_matrix(bboxes1: np.ndarray, bboxes2: np.ndarray):
+    """
+    批量计算两组bbox两两之间的距离, 计算方式与bbox_distance相同
+    return: (N, M)的np.ndarray
+    """
+    left, right, bottom, top = bbox_relative_pos_matrix(bboxes1, bboxes2)
+    x1, y1, x1b, y1b = (bboxes1[:, None, idx] for idx in range(4))
+    x2, y2, x2b, y2b = (bboxes2[None, :, idx] for idx in range(4))
+    # 按bbox_distance中判断的先后顺序, 取第一个满足的条件
+    return np.select(
+        [top & left, left & bottom, bottom & right, right & top, left, right, bottom, top],
+        [
+            np.sqrt((x1 - x2b) ** 2 + (y1b - y2) ** 2),
+            np.sqrt((x1 - x2b) ** 2 + (y1 - y2b) ** 2),
+            np.sqrt((x1b - x2) ** 2 + (y1 - y2b) ** 2),
+            np.sqrt((x1b - x2) ** 2 + (y1b - y2) ** 2),
+            np.broadcast_to(x1 - x2b, left.shape),
+            np.broadcast_to(x2 - x1b, left.shape),
+            np.broadcast_to(y1 - y2b, left.shape),
+            np.broadcast_to(y2 - y1b, left.shape),
+        ],
+        default=0.0,
+    )
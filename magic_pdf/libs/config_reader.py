@@ -87,5 +87,115 @@ def get_table_recog_config():
         return table_config
 
 
+def get_layout_config():
+    config = read_config()
+    layout_config = config.get("layout-config")
+    if layout_config is None:
+        logger.warning(f"'layout-config' not found in {CONFIG_FILE_NAME}, use 'batch_size: 1' as default")
+        return json.loads('{"batch_size": 1}')
+    else:
+        return layout_config
+
+
+def get_formula_config():
+    config = read_config()
+    formula_config = config.get("formula-config")
+    if formula_config is None:
+        logger.warning(f"'formula-config' not found in {CONFIG_FILE_NAME}, use 'mfd_batch_size: 1, mfr_batch_size: 64' as default")
+        return json.loads('{"mfd_batch_size": 1, "mfr_batch_size": 64}')
+    else:
+        return formula_config
+
+
+def get_raster_config():
+    config = read_config()
+    raster_config = config.get("raster-config")
+    if raster_config is None:
+        logger.warning(f"'raster-config' not found in {CONFIG_FILE_NAME}, use 'prefetch: 4, workers: 0' as default")
+        return json.loads('{"prefetch": 4, "workers": 0}')
+    else:
+        return raster_config
+
+
+def get_blank_page_config():
+    config = read_config()
+    blank_page_config = config.get("blank-page-config")
+    if blank_page_config is None:
+        logger.warning(f"'blank-page-config' not found in {CONFIG_FILE_NAME}, use 'enable: true, require_empty_pdf_page: true, ink_ratio: 0.0001, ink_threshold: 48' as default")
+        return json.loads('{"enable": true, "require_empty_pdf_page": true, "ink_ratio": 0.0001, "ink_threshold": 48}')
+    else:
+        return blank_page_config
+
+
+def get_ocr_config():
+    config = read_config()
+    ocr_config = config.get("ocr-config")
+    if ocr_config is None:
+        logger.warning(f"'ocr-config' not found in {CONFIG_FILE_NAME}, use 'hybrid: true' as default")
+        return json.loads('{"hybrid": true}')
+    else:
+        return ocr_config
+
+
+def get_page_cache_config():
+    config = read_config()
+    page_cache_config = config.get("page-cache-config")
+    if page_cache_config is None:
+        logger.warning(f"'page-cache-config' not found in {CONFIG_FILE_NAME}, use 'enable: false' as default")
+        return json.loads('{"enable": false}')
+    else:
+        return page_cache_config
+
+
+def get_pipeline_config():
+    config = read_config()
+    pipeline_config = config.get("pipeline-config")
+    if pipeline_config is None:
+        logger.warning(f"'pipeline-config' not found in {CONFIG_FILE_NAME}, use 'enable: false, queue_size: 8' as default")
+        return json.loads('{"enable": false, "queue_size": 8}')
+    else:
+        return pipeline_config
+
+
+def get_inference_config():
+    config = read_config()
+    inference_config = config.get("inference-config")
+    if inference_config is None:
+        logger.warning(f"'inference-config' not found in {CONFIG_FILE_NAME}, use 'backend: torch' as default")
+        return json.loads('{"backend": "torch"}')
+    else:
+        return inference_config
+
+
+def get_model_pool_config():
+    config = read_config()
+    model_pool_config = config.get("model-pool-config")
+    if model_pool_config is None:
+        logger.warning(f"'model-pool-config' not found in {CONFIG_FILE_NAME}, use 'workers: 0, threads_per_worker: 0, task_pages: 1' as default")
+        return json.loads('{"workers": 0, "threads_per_worker": 0, "task_pages": 1}')
+    else:
+        return model_pool_config
+
+
+def get_checkpoint_config():
+    config = read_config()
+    checkpoint_config = config.get("checkpoint-config")
+    if checkpoint_config is None:
+        logger.warning(f"'checkpoint-config' not found in {CONFIG_FILE_NAME}, use 'enable: false' as default")
+        return json.loads('{"enable": false}')
+    else:
+        return checkpoint_config
+
+
+def get_parse_config():
+    config = read_config()
+    parse_config = config.get("parse-config")
+    if parse_config is None:
+        logger.warning(f"'parse-config' not found in {CONFIG_FILE_NAME}, use 'workers: 0' as default")
+        return json.loads('{"workers": 0}')
+    else:
+        return parse_config
+
+
 if __name__ == "__main__":
     ak, sk, endpoint = get_s3_config("llm-raw")
@@ -1,5 +1,6 @@
 from io import BytesIO
 import re
+import unicodedata
 import fitz
 import numpy as np
 from loguru import logger
@@ -33,6 +34,22 @@ def extract_pages(src_pdf_bytes: bytes):
     return sample_docs
 
 
+def calculate_cid_chars_ratio(text: str) -> float:
+    """
+    乱码文本用pdfminer提取出来的文本特征是(cid:xxx), 计算乱码字符占全部字符的比例
+    """
+    cid_pattern = re.compile(r'\(cid:\d+\)')
+    matches = cid_pattern.findall(text)
+    cid_count = len(matches)
+    cid_len = sum(len(match) for match in matches)
+    text_len = len(text)
+    if text_len == 0:
+        cid_chars_radio = 0
+    else:
+        cid_chars_radio = cid_count/(cid_count + text_len - cid_len)
+    return cid_chars_radio
+
+
 def detect_invalid_chars(src_pdf_bytes: bytes) -> bool:
     """"
     检测PDF中是否包含非法字符
@@ -44,19 +61,52 @@ def detect_invalid_chars(src_pdf_bytes: bytes) -> bool:
     text = extract_text(sample_pdf_file_like_object)
     text = text.replace("\n", "")
     # logger.info(text)
-    '''乱码文本用pdfminer提取出来的文本特征是(cid:xxx)'''
-    cid_pattern = re.compile(r'\(cid:\d+\)')
-    matches = cid_pattern.findall(text)
-    cid_count = len(matches)
-    cid_len = sum(len(match) for match in matches)
-    text_len = len(text)
-    if text_len == 0:
-        cid_chars_radio = 0
-    else:
-        cid_chars_radio = cid_count/(cid_count + text_len - cid_len)
-    logger.info(f"cid_count: {cid_count}, text_len: {text_len}, cid_chars_radio: {cid_chars_radio}")
+    cid_chars_radio = calculate_cid_chars_ratio(text)
+    logger.info(f"text_len: {len(text)}, cid_chars_radio: {cid_chars_radio}")
     '''当一篇文章存在5%以上的文本是乱码时,认为该文档为乱码文档'''
     if cid_chars_radio > 0.05:
         return False  # 乱码文档
     else:
         return True   # 正常文档
+
+
+def detect_page_text_layer_valid(page: fitz.Page, min_chars=50, max_invalid_ratio=0.05, min_text_coverage=0.1) -> bool:
+    """
+    判断单页的文字层是否可以直接使用, 用于OCR模式下跳过文字层完好的页面
+    1. 去掉空白后的字符数不少于min_chars
+    2. 乱码字符(fitz无法映射unicode时输出的�, 以及控制字符/私有区字符)占比不超过max_invalid_ratio
+    3. 页面上有大图(扫描页)时, 文本块覆盖的面积占大图面积的比例不低于min_text_coverage,
+       避免扫描页上只有页眉页脚水印等少量文字时被误判为有效文字层
+    4. 与detect_invalid_chars相同, pdfminer提取的(cid:xxx)占比不超过max_invalid_ratio;
+       缺少ToUnicode的字体在fitz中会输出看似正常但错误的字符, 只能用这一条识别, pdfminer较慢, 放在最后
+    """
+    text = page.get_text("text", flags=fitz.TEXTFLAGS_TEXT)
+    chars = [c for c in text if not c.isspace()]
+    if len(chars) < min_chars:
+        return False
+    invalid_count = sum(1 for c in chars if c == '\ufffd' or unicodedata.category(c) in ('Cc', 'Co', 'Cs'))
+    if invalid_count / len(chars) > max_invalid_ratio:
+        return False
+
+    page_area = page.rect.width * page.rect.height
+    if page_area <= 0:
+        return False
+    image_area = max([fitz.Rect(img["bbox"]).intersect(page.rect).get_area() for img in page.get_image_info()],
+                     default=0)
+    if image_area / page_area > 0.5:
+        text_area = sum(fitz.Rect(block[:4]).intersect(page.rect).get_area()
+                        for block in page.get_text("blocks", flags=fitz.TEXTFLAGS_TEXT) if block[6] == 0)
+        if text_area / image_area < min_text_coverage:
+            return False
+
+    page_docs = fitz.open()
+    page_docs.insert_pdf(page.parent, from_page=page.number, to_page=page.number)
+    try:
+        page_text = extract_text(BytesIO(page_docs.tobytes())).replace("\n", "")
+    except Exception as e:
+        # pdfminer无法解析的字体同样不可信, 交给OCR
+        logger.warning(f"pdfminer failed to extract page {page.number}: {e}")
+        return False
+    finally:
+        page_docs.close()
+    return calculate_cid_chars_ratio(page_text) <= max_invalid_ratio
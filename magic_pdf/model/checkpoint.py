@@ -0,0 +1,55 @@
+"""
+doc_analyze的断点续跑: 每页的模型结果完成后通过AbsReaderWriter写入单独的checkpoint文件,
+进程被中断后重新运行时, 已有结果的页面直接读取, 从第一个没有结果的页面继续推理
+"""
+import hashlib
+import json
+
+from loguru import logger
+
+from magic_pdf.libs.commons import join_path
+from magic_pdf.rw.AbsReaderWriter import AbsReaderWriter
+
+
+class AnalyzeCheckpoint:
+    """
+    checkpoint文件位于<path>/<key>/page_<page_no>.json, key由pdf内容和影响推理结果的配置共同决定,
+    pdf或配置变化后使用新的目录, 不会读到旧的结果
+    """
+
+    def __init__(self, writer: AbsReaderWriter, path: str = "checkpoint"):
+        self.writer = writer
+        self.path = path
+        self.key_dir = None
+
+    def bind(self, pdf_bytes: bytes, signature: dict):
+        """
+        signature: 影响推理结果的配置, 例如ocr开关和模型版本, 见page_cache.get_model_signature
+        """
+        hasher = hashlib.sha256(pdf_bytes)
+        hasher.update(json.dumps(signature, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+        self.key_dir = join_path(self.path, hasher.hexdigest()[:32])
+
+    def _page_path(self, page_no: int) -> str:
+        return join_path(self.key_dir, f"page_{page_no:05d}.json")
+
+    def load(self) -> list:
+        """
+        按页序读取已完成的页面, 遇到第一个缺失或不完整的文件时停止
+        return: list of page dict, 与doc_analyze的model_json格式相同
+        """
+        pages = []
+        while True:
+            try:
+                # read_offset在文件不存在时直接抛出异常, 不会像read一样输出错误日志
+                content = self.writer.read_offset(self._page_path(len(pages)))
+                pages.append(json.loads(content.decode("utf-8")))
+            except Exception:
+                break
+        if len(pages) > 0:
+            logger.info(f"resume from checkpoint {self.key_dir}, {len(pages)} pages already analyzed")
+        return pages
+
+    def save(self, page_dict: dict):
+        self.writer.write(json.dumps(page_dict, ensure_ascii=False), self._page_path(page_dict["page_info"]["page_no"]),
+                          AbsReaderWriter.MODE_TXT)
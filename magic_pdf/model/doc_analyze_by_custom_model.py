@@ -1,10 +1,25 @@
+import multiprocessing
+import os
+import queue
+import threading
 import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from multiprocessing import resource_tracker, shared_memory
 
 import fitz
 import numpy as np
 from loguru import logger
 
-from magic_pdf.libs.config_reader import get_local_models_dir, get_device, get_table_recog_config
+from magic_pdf.libs.Constants import RASTER_PREFETCH_VALUE, RASTER_WORKERS_VALUE, RASTER_MAX_PIXELS_VALUE, \
+    RASTER_MIN_DPI_VALUE, RASTER_TARGET_FONT_PX_VALUE, BLANK_PAGE_INK_RATIO, BLANK_PAGE_INK_THRESHOLD, \
+    BLANK_PAGE_ENABLE_VALUE, BLANK_PAGE_REQUIRE_EMPTY_PDF_VALUE
+from magic_pdf.libs.config_reader import get_device, get_raster_config, get_ocr_config, get_model_pool_config, \
+    get_blank_page_config
+from magic_pdf.libs.pdf_check import detect_page_text_layer_valid
+from magic_pdf.model.model_metrics import new_page_metrics, summarize_doc_metrics
+from magic_pdf.model.page_cache import get_page_cache, get_model_signature, PageResultCache
 from magic_pdf.model.model_list import MODEL
 import magic_pdf.model as model_config
 
@@ -23,31 +38,236 @@ def remove_duplicates_dicts(lst):
     return unique_dicts
 
 
-def load_images_from_pdf(pdf_bytes: bytes, dpi=200) -> list:
+def get_page_font_size(page) -> float:
+    """
+    按字符数加权的字号中位数, 没有文字层时返回0
+    """
+    sizes = []
+    for block in page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]:
+        for line in block.get("lines", []):
+            for span in line["spans"]:
+                text_len = len(span["text"].strip())
+                if text_len > 0 and span["size"] > 0:
+                    sizes.append((span["size"], text_len))
+    if len(sizes) == 0:
+        return 0
+    sizes.sort()
+    half = sum(text_len for _, text_len in sizes) / 2
+    count = 0
+    for size, text_len in sizes:
+        count += text_len
+        if count >= half:
+            return size
+    return sizes[-1][0]
+
+
+def get_adaptive_dpi(page, dpi=200, max_pixels=RASTER_MAX_PIXELS_VALUE, min_dpi=RASTER_MIN_DPI_VALUE,
+                     target_font_px=RASTER_TARGET_FONT_PX_VALUE) -> float:
+    """
+    自适应渲染分辨率, 只会降低不会超过dpi:
+    1. 像素预算, 渲染后的像素数不超过max_pixels, 大幅面页面不再渲染成超大图片
+    2. 文字层的字号中位数渲染后高于target_font_px时按比例降低, 大字号的页面(幻灯片、海报)不需要高分辨率
+    常规A4/Letter页面的结果与固定dpi相同
+    """
+    page_area = page.rect.width * page.rect.height
+    if page_area <= 0:
+        return dpi
+    adaptive_dpi = min(dpi, 72 * (max_pixels / page_area) ** 0.5)
+    font_size = get_page_font_size(page)
+    if font_size > 0:
+        adaptive_dpi = min(adaptive_dpi, max(target_font_px * 72 / font_size, min_dpi))
+    return adaptive_dpi
+
+
+def render_page_to_image(page, dpi=200, adaptive_dpi=False) -> dict:
+    """
+    adaptive_dpi: 为True时dpi作为上限, 实际分辨率见get_adaptive_dpi
+    """
     try:
         from PIL import Image
     except ImportError:
         logger.error("Pillow not installed, please install by pip.")
         exit(1)
 
+    if adaptive_dpi:
+        dpi = get_adaptive_dpi(page, dpi)
+    mat = fitz.Matrix(dpi / 72, dpi / 72)
+    pm = page.get_pixmap(matrix=mat, alpha=False)
+
+    # If the width or height exceeds 9000 after scaling, do not scale further.
+    if pm.width > 9000 or pm.height > 9000:
+        pm = page.get_pixmap(matrix=fitz.Matrix(1, 1), alpha=False)
+
+    img = Image.frombytes("RGB", (pm.width, pm.height), pm.samples)
+    img = np.array(img)
+    img_dict = {"img": img, "width": pm.width, "height": pm.height}
+    return img_dict
+
+
+def is_blank_page(img: np.ndarray, ink_ratio=BLANK_PAGE_INK_RATIO, ink_threshold=BLANK_PAGE_INK_THRESHOLD) -> bool:
+    """
+    空白页检测: 与背景色(灰度中位数)相差超过ink_threshold的像素占比低于ink_ratio时认为是空白页
+    隔4个像素采样, 扫描件背面的轻微噪点和底色不影响判断
+    """
+    sample = img[::4, ::4]
+    gray = sample.mean(axis=2) if sample.ndim == 3 else sample
+    if gray.size == 0:
+        return True
+    background = np.median(gray)
+    return np.count_nonzero(np.abs(gray - background) > ink_threshold) < gray.size * ink_ratio
+
+
+def is_empty_pdf_page(page) -> bool:
+    """
+    pdf页面中没有文字、图片和绘图, 浅色或低对比度的内容在渲染结果中可能被误判为空白, 需要同时满足该条件
+    """
+    return len(page.get_text("text").strip()) == 0 and len(page.get_images()) == 0 and len(page.get_drawings()) == 0
+
+
+def load_images_from_pdf(pdf_bytes: bytes, dpi=200) -> list:
     images = []
     with fitz.open("pdf", pdf_bytes) as doc:
         for index in range(0, doc.page_count):
-            page = doc[index]
-            mat = fitz.Matrix(dpi / 72, dpi / 72)
-            pm = page.get_pixmap(matrix=mat, alpha=False)
-
-            # If the width or height exceeds 9000 after scaling, do not scale further.
-            if pm.width > 9000 or pm.height > 9000:
-                pm = page.get_pixmap(matrix=fitz.Matrix(1, 1), alpha=False)
-
-            img = Image.frombytes("RGB", (pm.width, pm.height), pm.samples)
-            img = np.array(img)
-            img_dict = {"img": img, "width": pm.width, "height": pm.height}
-            images.append(img_dict)
+            images.append(render_page_to_image(doc[index], dpi))
     return images
 
 
+# 渲染进程内的pdf对象, 由_raster_worker_init在每个进程中打开一次
+_raster_worker_doc = None
+
+
+def _raster_worker_init(pdf_bytes: bytes):
+    global _raster_worker_doc
+    _raster_worker_doc = fitz.open("pdf", pdf_bytes)
+
+
+def _raster_worker_render(page_start: int, page_end: int, dpi: int, adaptive_dpi: bool = False) -> list:
+    """
+    在渲染进程中渲染[page_start, page_end)的页面, 每页像素写入一块共享内存, 只把共享内存的名字和尺寸返回给主进程
+    """
+    pages = []
+    for index in range(page_start, page_end):
+        img_dict = render_page_to_image(_raster_worker_doc[index], dpi, adaptive_dpi)
+        img = img_dict["img"]
+        shm = shared_memory.SharedMemory(create=True, size=img.nbytes)
+        np.ndarray(img.shape, dtype=img.dtype, buffer=shm.buf)[:] = img
+        pages.append((shm.name, img.shape, img_dict["width"], img_dict["height"]))
+        shm.close()
+        # 共享内存由主进程负责unlink, 避免渲染进程的resource_tracker在退出时重复回收
+        # 只有posix系统会登记共享内存, 登记的名字带有前导的"/"
+        if os.name == "posix":
+            resource_tracker.unregister(f"/{shm.name}", "shared_memory")
+    return pages
+
+
+def _load_image_from_shm(shm_name: str, shape: tuple, width: int, height: int) -> dict:
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        img = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+    return {"img": img, "width": width, "height": height}
+
+
+def _release_shm_pages(pages):
+    for shm_name, _, _, _ in pages:
+        shm = shared_memory.SharedMemory(name=shm_name)
+        shm.close()
+        shm.unlink()
+
+
+def iter_images_from_pdf_by_process_pool(pdf_bytes: bytes, dpi=200, workers=2, prefetch=RASTER_PREFETCH_VALUE,
+                                         adaptive_dpi=False, start_page=0):
+    """
+    多进程渲染pdf, 每个进程持有自己的fitz.Document, 以页段为单位分配任务
+    渲染结果通过共享内存传回主进程, 并按页码顺序产出, 在途页面数不超过prefetch
+    """
+    with fitz.open("pdf", pdf_bytes) as doc:
+        page_count = doc.page_count
+    pages_per_task = max(prefetch // workers, 1)
+    # workers大于prefetch时只有prefetch个进程同时渲染, 保证在途页面数不超过prefetch
+    max_pending_tasks = max(prefetch // pages_per_task, 1)
+    page_ranges = [(start, min(start + pages_per_task, page_count))
+                   for start in range(start_page, page_count, pages_per_task)]
+
+    pending = deque()
+    rendered = deque()
+    # 渲染进程使用spawn, 主进程此时已加载模型并有表格/流水线等线程在运行, fork后锁和线程池状态不可靠
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_raster_worker_init, initargs=(pdf_bytes,)) as executor:
+        try:
+            for page_start, page_end in page_ranges:
+                pending.append(executor.submit(_raster_worker_render, page_start, page_end, dpi, adaptive_dpi))
+                if len(pending) < max_pending_tasks:
+                    continue
+                rendered.extend(pending.popleft().result())
+                while rendered:
+                    yield _load_image_from_shm(*rendered.popleft())
+            while pending:
+                rendered.extend(pending.popleft().result())
+                while rendered:
+                    yield _load_image_from_shm(*rendered.popleft())
+        finally:
+            # 提前退出或出错时, 回收还没有被消费的共享内存
+            _release_shm_pages(rendered)
+            while pending:
+                future = pending.popleft()
+                if not future.cancel() and future.exception() is None:
+                    _release_shm_pages(future.result())
+
+
+def iter_images_from_pdf(pdf_bytes: bytes, dpi=200, prefetch=RASTER_PREFETCH_VALUE, workers=0, adaptive_dpi=False,
+                         start_page=0):
+    """
+    按页渲染pdf的生成器, 后台线程最多预先渲染prefetch页, 内存占用只和prefetch相关, 和总页数无关
+    workers大于1时使用多进程渲染, 见iter_images_from_pdf_by_process_pool
+    start_page: 从该页开始渲染, 断点续跑时跳过已有结果的页面
+    """
+    if workers > 1:
+        yield from iter_images_from_pdf_by_process_pool(pdf_bytes, dpi, workers, prefetch, adaptive_dpi, start_page)
+        return
+
+    page_queue = queue.Queue(maxsize=max(prefetch, 1))
+    stop_event = threading.Event()
+    end_flag = object()
+
+    def put(item):
+        while not stop_event.is_set():
+            try:
+                page_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def render_worker():
+        try:
+            with fitz.open("pdf", pdf_bytes) as doc:
+                for index in range(start_page, doc.page_count):
+                    if not put(render_page_to_image(doc[index], dpi, adaptive_dpi)):
+                        return
+        except Exception as e:
+            put(e)
+            return
+        put(end_flag)
+
+    worker = threading.Thread(target=render_worker, daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = page_queue.get()
+            if item is end_flag:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # 消费方提前退出时通知渲染线程停止
+        stop_event.set()
+        worker.join()
+
+
 class ModelSingleton:
     _instance = None
     _models = {}
@@ -58,12 +278,33 @@ class ModelSingleton:
         return cls._instance
 
     def get_model(self, ocr: bool, show_log: bool):
+        # 已关闭的模型进程池(任务出错或进程异常退出)及其derive出的实例不再可用, 丢弃后重新创建
+        for closed_key in [key for key, model in self._models.items() if getattr(model, "closed", False)]:
+            logger.warning(f"model pool {closed_key} is closed, it will be recreated")
+            del self._models[closed_key]
         key = (ocr, show_log)
         if key not in self._models:
-            self._models[key] = custom_model_init(ocr=ocr, show_log=show_log)
+            # 已有其他组合的模型时, 共享其layout/公式/表格等子模型, 只按需补充ocr模型
+            base_model = next((model for (model_ocr, _), model in self._models.items() if model_ocr == ocr),
+                              next(iter(self._models.values()), None))
+            if base_model is not None and hasattr(base_model, "derive"):
+                self._models[key] = base_model.derive(ocr=ocr, show_log=show_log)
+            else:
+                self._models[key] = model_pool_init(ocr=ocr, show_log=show_log) or custom_model_init(ocr=ocr,
+                                                                                                   show_log=show_log)
         return self._models[key]
 
 
+def model_pool_init(ocr: bool = False, show_log: bool = False):
+    """
+    device为cpu且model-pool-config.workers大于1时, 启动多个模型进程, 否则返回None
+    """
+    if not str(get_device()).startswith("cpu"):
+        return None
+    from magic_pdf.model.model_pool import new_model_pool
+    return new_model_pool(ocr, show_log, get_model_pool_config())
+
+
 def custom_model_init(ocr: bool = False, show_log: bool = False):
     model = None
 
@@ -80,17 +321,6 @@ def custom_model_init(ocr: bool = False, show_log: bool = False):
             from magic_pdf.model.pp_structure_v2 import CustomPaddleModel
             custom_model = CustomPaddleModel(ocr=ocr, show_log=show_log)
         elif model == MODEL.PEK:
-            # from magic_pdf.model.pdf_extract_kit import CustomPEKModel
-            # # 从配置文件读取model-dir和device
-            # local_models_dir = get_local_models_dir()
-            # device = get_device()
-            # table_config = get_table_recog_config()
-            # model_input = {"ocr": ocr,
-            #                "show_log": show_log,
-            #                "models_dir": local_models_dir,
-            #                "device": device,
-            #                "table_config": table_config}
-            # custom_model = CustomPEKModel(**model_input)
             from magic_pdf.model.pdf_extract_kit_preload import PreloadedPEKModel
             custom_model = PreloadedPEKModel(ocr=ocr, show_log=show_log)
         else:
@@ -105,24 +335,188 @@ def custom_model_init(ocr: bool = False, show_log: bool = False):
     return custom_model
 
 
-def doc_analyze(pdf_bytes: bytes, ocr: bool = False, show_log: bool = False):
+def doc_analyze(pdf_bytes: bytes, ocr: bool = False, show_log: bool = False, hybrid_ocr: bool = None,
+                return_metrics: bool = False, page_callback=None, checkpoint=None):
+    """
+    hybrid_ocr: 仅在ocr为True时生效, 文字层完好的页面跳过OCR, page_info中标记text_layer_valid,
+                解析阶段这些页面使用pdf文字层的span; 为None时读取配置文件中的ocr-config
+    return_metrics: 为True时返回(model_json, metrics), metrics包含每页各阶段的耗时和数量统计(pages)以及整篇文档的汇总(summary)
+    page_callback: 流水线模式, 每页的结果完成后按页序调用page_callback(page_dict), 供下游逐页解析;
+                   此时公式识别按batch进行, 不再等整篇文档
+    checkpoint: AnalyzeCheckpoint, 每页的结果完成后写入checkpoint, 已有结果的页面不再推理;
+                此时公式识别同样按batch进行
+    """
 
     model_manager = ModelSingleton()
     custom_model = model_manager.get_model(ocr, show_log)
 
-    images = load_images_from_pdf(pdf_bytes)
+    if ocr and hybrid_ocr is None:
+        hybrid_ocr = get_ocr_config().get("hybrid", True)
+    use_text_layer = bool(ocr and hybrid_ocr)
+
+    blank_page_config = get_blank_page_config()
+    blank_page_enable = bool(blank_page_config.get("enable", BLANK_PAGE_ENABLE_VALUE))
+    blank_require_empty_pdf = bool(blank_page_config.get("require_empty_pdf_page", BLANK_PAGE_REQUIRE_EMPTY_PDF_VALUE))
+    blank_ink_ratio = float(blank_page_config.get("ink_ratio", BLANK_PAGE_INK_RATIO))
+    blank_ink_threshold = float(blank_page_config.get("ink_threshold", BLANK_PAGE_INK_THRESHOLD))
+
+    # 文字层检测和空白页检测共用的pdf对象
+    pdf_doc = fitz.open("pdf", pdf_bytes) if use_text_layer or (blank_page_enable and blank_require_empty_pdf) else None
+
+    def is_blank(page_no, img):
+        if not blank_page_enable or not is_blank_page(img, blank_ink_ratio, blank_ink_threshold):
+            return False
+        return not blank_require_empty_pdf or is_empty_pdf_page(pdf_doc[page_no])
 
     model_json = []
+    page_metrics_list = []
+    if checkpoint is not None:
+        checkpoint.bind(pdf_bytes, dict(get_model_signature(ocr, model_config.__model_mode__),
+                                        hybrid_ocr=use_text_layer))
+        for page_dict in checkpoint.load():
+            model_json.append(page_dict)
+            page_metrics = new_page_metrics()
+            page_metrics.update(page_no=page_dict["page_info"]["page_no"], resumed=True,
+                                text_layer_valid=page_dict["page_info"].get("text_layer_valid", False))
+            page_metrics_list.append(page_metrics)
+            if page_callback is not None:
+                page_callback(page_dict)
+
+    # 渲染与推理流式进行, 同时驻留内存的页面数不超过prefetch + page_batch_size
+    raster_config = get_raster_config()
+    prefetch = max(int(raster_config.get("prefetch", RASTER_PREFETCH_VALUE)), 1)
+    raster_workers = int(raster_config.get("workers", RASTER_WORKERS_VALUE))
+    # 检测结果的坐标按page_info中的宽高映射回pdf坐标(见get_scale_ratio), 每页的分辨率可以不同
+    adaptive_dpi = bool(raster_config.get("adaptive_dpi", False))
+    images = iter_images_from_pdf(pdf_bytes, prefetch=prefetch, workers=raster_workers, adaptive_dpi=adaptive_dpi,
+                                  start_page=len(model_json))
+
+    # 多页合并为一个batch送入layout和公式检测模型
+    page_batch_size = max(getattr(custom_model, "page_batch_size", 1), 1)
+
+    # 公式识别延后到整篇文档的公式都收集完之后统一分桶推理
+    mfr_pending = []
+
+    # 命中缓存的页面跳过推理, 未命中的页面在公式识别完成后写入缓存
+    page_cache = get_page_cache()
+    model_signature = get_model_signature(ocr, model_config.__model_mode__) if page_cache is not None else None
+    cache_pending = []
+    checkpoint_pending = []
+
+    # 表格识别在单独的线程中与后续页面的推理并行, 整篇文档共享时间预算
+    table_group = None
+    if getattr(custom_model, "apply_table", False) and hasattr(custom_model, "new_table_task_group"):
+        table_group = custom_model.new_table_task_group()
+
+    mfr_cost = 0.0
+
+    def flush_pending():
+        """
+        识别已收集的公式并等待已提交的表格, 完成后的结果才能写入缓存和checkpoint
+        """
+        nonlocal mfr_cost
+        mfr_start = time.time()
+        if len(mfr_pending) > 0:
+            custom_model.batch_formula_recognition(mfr_pending)
+            mfr_pending.clear()
+        mfr_cost += time.time() - mfr_start
+        if table_group is not None:
+            table_group.collect()
+        for cache_key, result in cache_pending:
+            page_cache.put(cache_key, result)
+        cache_pending.clear()
+        for page_dict in checkpoint_pending:
+            checkpoint.save(page_dict)
+        checkpoint_pending.clear()
+
     doc_analyze_start = time.time()
-    for index, img_dict in enumerate(images):
-        img = img_dict["img"]
-        page_width = img_dict["width"]
-        page_height = img_dict["height"]
-        result = custom_model(img)
-        page_info = {"page_no": index, "height": page_height, "width": page_width}
-        page_dict = {"layout_dets": result, "page_info": page_info}
-        model_json.append(page_dict)
+    # 送入模型推理的batch序号, 记录在每页的指标中
+    batch_no = 0
+    try:
+        while True:
+            batch_images = list(islice(images, page_batch_size))
+            if len(batch_images) == 0:
+                break
+            if use_text_layer:
+                text_layer_valid_list = [detect_page_text_layer_valid(pdf_doc[len(model_json) + index])
+                                         for index in range(len(batch_images))]
+            else:
+                text_layer_valid_list = [False] * len(batch_images)
+
+            # 空白页不送入模型, layout_dets为空
+            blank_list = [is_blank(len(model_json) + index, img_dict["img"])
+                          for index, img_dict in enumerate(batch_images)]
+            batch_result = [[] if blank else None for blank in blank_list]
+            cache_keys = [None] * len(batch_images)
+            if page_cache is not None:
+                for index, (img_dict, text_layer_valid) in enumerate(zip(batch_images, text_layer_valid_list)):
+                    if blank_list[index]:
+                        continue
+                    page_signature = dict(model_signature, ocr=ocr and not text_layer_valid)
+                    cache_keys[index] = PageResultCache.make_key(img_dict["img"], page_signature)
+                    batch_result[index] = page_cache.get(cache_keys[index])
+            miss_indexes = [index for index, result in enumerate(batch_result) if result is None]
+            batch_metrics = [new_page_metrics() for _ in batch_images]
+            for index, result in enumerate(batch_result):
+                batch_metrics[index]["cache_hit"] = result is not None and not blank_list[index]
+                batch_metrics[index]["blank"] = blank_list[index]
+            if len(miss_indexes) > 0:
+                miss_metrics = []
+                batch_start = time.time()
+                miss_result = custom_model.batch_analyze([batch_images[index]["img"] for index in miss_indexes],
+                                                         mfr_pending=mfr_pending,
+                                                         ocr_mask=[not text_layer_valid_list[index]
+                                                                   for index in miss_indexes],
+                                                         metrics=miss_metrics,
+                                                         table_group=table_group)
+                batch_cost = time.time() - batch_start
+                if len(miss_metrics) != len(miss_indexes):
+                    # 模型没有提供分阶段的指标
+                    miss_metrics = [new_page_metrics() for _ in miss_indexes]
+                for index, result, page_metrics in zip(miss_indexes, miss_result, miss_metrics):
+                    batch_result[index] = result
+                    # analyze_time是batch耗时按页数的平均值, 单页耗时无法从batch推理中拆分
+                    page_metrics.update(analyze_time=batch_cost / len(miss_indexes), batch_no=batch_no,
+                                        batch_pages=len(miss_indexes), batch_time=batch_cost, cache_hit=False)
+                    batch_metrics[index] = page_metrics
+                    if page_cache is not None:
+                        cache_pending.append((cache_keys[index], result))
+                batch_no += 1
+
+            for img_dict, result, text_layer_valid, page_metrics in zip(batch_images, batch_result,
+                                                                        text_layer_valid_list, batch_metrics):
+                page_info = {"page_no": len(model_json), "height": img_dict["height"], "width": img_dict["width"]}
+                if text_layer_valid:
+                    page_info["text_layer_valid"] = True
+                page_dict = {"layout_dets": result, "page_info": page_info}
+                model_json.append(page_dict)
+                if checkpoint is not None:
+                    checkpoint_pending.append(page_dict)
+                page_metrics.update(page_no=page_info["page_no"], text_layer_valid=text_layer_valid)
+                page_metrics_list.append(page_metrics)
+            if page_callback is not None or checkpoint is not None:
+                flush_pending()
+            if page_callback is not None:
+                for page_dict in model_json[-len(batch_images):]:
+                    page_callback(page_dict)
+        flush_pending()
+    finally:
+        # 出错或提前结束时立即停止渲染, 回收渲染线程/进程和还没有被消费的共享内存
+        images.close()
+        if pdf_doc is not None:
+            pdf_doc.close()
+        if table_group is not None:
+            table_group.close()
     doc_analyze_cost = time.time() - doc_analyze_start
+    if use_text_layer:
+        skipped = sum(1 for page_dict in model_json if page_dict["page_info"].get("text_layer_valid"))
+        logger.info(f"hybrid ocr: {skipped}/{len(model_json)} pages use text layer instead of ocr")
+    if page_cache is not None:
+        logger.info(f"page cache stats: {page_cache.stats()}")
     logger.info(f"doc analyze cost: {doc_analyze_cost}")
 
+    if return_metrics:
+        metrics = {"pages": page_metrics_list,
+                   "summary": summarize_doc_metrics(page_metrics_list, doc_analyze_cost, mfr_time=mfr_cost)}
+        return model_json, metrics
     return model_json
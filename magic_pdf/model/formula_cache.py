@@ -0,0 +1,61 @@
+"""
+公式识别去重: 按公式截图的像素哈希去重, 同一篇文档内重复的公式(公式引用、页眉、重复出现的符号)只做一次生成
+可选的跨文档LRU缓存保存crop hash -> latex, 处理同一批相似文档时跨文档复用
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def make_crop_key(mf_image) -> str:
+    """
+    mf_image: PIL.Image, 统一转为灰度后按尺寸和像素计算哈希, 颜色不同但字形相同的公式视为同一个公式
+    """
+    gray = mf_image.convert("L")
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(f"{gray.width}x{gray.height}".encode())
+    hasher.update(gray.tobytes())
+    return hasher.hexdigest()
+
+
+class FormulaLatexCache:
+    """
+    crop hash -> latex的内存LRU缓存, 多个线程共享同一个模型时加锁访问
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        with self._lock:
+            latex = self._entries.get(key)
+            if latex is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return latex
+
+    def put(self, key: str, latex: str):
+        with self._lock:
+            self._entries[key] = latex
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def new_formula_cache(max_size: int):
+    """
+    max_size为0时不使用跨文档缓存, 只做单次调用内的去重
+    """
+    if max_size <= 0:
+        return None
+    return FormulaLatexCache(max_size)
@@ -1,6 +1,8 @@
 import json
 import math
 
+import numpy as np
+
 from magic_pdf.libs.commons import fitz
 from loguru import logger
 
@@ -11,16 +13,19 @@ from magic_pdf.rw.AbsReaderWriter import AbsReaderWriter
 from magic_pdf.rw.DiskReaderWriter import DiskReaderWriter
 from magic_pdf.libs.local_math import float_gt
 from magic_pdf.libs.boxbase import (
-    _is_in,
-    bbox_relative_pos,
     bbox_distance,
-    _is_part_overlap,
     calculate_overlap_area_in_bbox1_area_ratio,
-    calculate_iou,
+    calculate_iou_matrix,
+    _is_in_matrix,
+    _is_in_or_part_overlap_matrix,
+    bbox_relative_pos_matrix,
+    bbox_distance_matrix,
 )
 from magic_pdf.libs.ModelBlockTypeEnum import ModelBlockTypeEnum
 
 CAPATION_OVERLAP_AREA_RATIO = 0.6
+# 参与高iou去重的category_id
+HIGH_IOU_CATEGORY_IDS = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]
 
 
 class MagicModel:
@@ -29,107 +34,107 @@ class MagicModel:
 
     """
 
-    def __fix_axis(self):
-        for model_page_info in self.__model_list:
-            need_remove_list = []
-            page_no = model_page_info["page_info"]["page_no"]
-            horizontal_scale_ratio, vertical_scale_ratio = get_scale_ratio(
-                model_page_info, self.__docs[page_no]
-            )
-            layout_dets = model_page_info["layout_dets"]
-            for layout_det in layout_dets:
-
-                if layout_det.get("bbox") is not None:
-                    # 兼容直接输出bbox的模型数据,如paddle
-                    x0, y0, x1, y1 = layout_det["bbox"]
-                else:
-                    # 兼容直接输出poly的模型数据，如xxx
-                    x0, y0, _, _, x1, y1, _, _ = layout_det["poly"]
-
-                bbox = [
-                    int(x0 / horizontal_scale_ratio),
-                    int(y0 / vertical_scale_ratio),
-                    int(x1 / horizontal_scale_ratio),
-                    int(y1 / vertical_scale_ratio),
-                ]
-                layout_det["bbox"] = bbox
-                # 删除高度或者宽度小于等于0的spans
-                if bbox[2] - bbox[0] <= 0 or bbox[3] - bbox[1] <= 0:
-                    need_remove_list.append(layout_det)
-            for need_remove in need_remove_list:
-                layout_dets.remove(need_remove)
-
-    def __fix_by_remove_low_confidence(self):
-        for model_page_info in self.__model_list:
-            need_remove_list = []
-            layout_dets = model_page_info["layout_dets"]
-            for layout_det in layout_dets:
-                if layout_det["score"] <= 0.05:
-                    need_remove_list.append(layout_det)
-                else:
-                    continue
-            for need_remove in need_remove_list:
-                layout_dets.remove(need_remove)
+    def __fix_axis(self, model_page_info):
+        layout_dets = model_page_info["layout_dets"]
+        if len(layout_dets) == 0:
+            return
+        page_no = model_page_info["page_info"]["page_no"]
+        horizontal_scale_ratio, vertical_scale_ratio = get_scale_ratio(
+            model_page_info, self.__docs[page_no]
+        )
+        # 兼容直接输出bbox的模型数据,如paddle, 和直接输出poly的模型数据，如xxx
+        raw_bboxes = np.array(
+            [
+                layout_det["bbox"]
+                if layout_det.get("bbox") is not None
+                else [layout_det["poly"][i] for i in (0, 1, 4, 5)]
+                for layout_det in layout_dets
+            ],
+            dtype=np.float64,
+        )
+        scale = np.array(
+            [horizontal_scale_ratio, vertical_scale_ratio, horizontal_scale_ratio, vertical_scale_ratio]
+        )
+        # 与int()相同, 向0取整
+        bboxes = np.trunc(raw_bboxes / scale).astype(np.int64)
+        for layout_det, bbox in zip(layout_dets, bboxes.tolist()):
+            layout_det["bbox"] = bbox
+        # 删除高度或者宽度小于等于0的spans
+        keep = (bboxes[:, 2] - bboxes[:, 0] > 0) & (bboxes[:, 3] - bboxes[:, 1] > 0)
+        layout_dets[:] = [layout_dets[i] for i in np.flatnonzero(keep)]
+
+    def __fix_by_remove_low_confidence(self, model_page_info):
+        layout_dets = model_page_info["layout_dets"]
+        scores = np.array([layout_det["score"] for layout_det in layout_dets], dtype=np.float64)
+        layout_dets[:] = [layout_dets[i] for i in np.flatnonzero(~(scores <= 0.05))]
 
-    def __fix_by_remove_high_iou_and_low_confidence(self):
-        for model_page_info in self.__model_list:
-            need_remove_list = []
-            layout_dets = model_page_info["layout_dets"]
-            for layout_det1 in layout_dets:
-                for layout_det2 in layout_dets:
-                    if layout_det1 == layout_det2:
-                        continue
-                    if layout_det1["category_id"] in [
-                        0,
-                        1,
-                        2,
-                        3,
-                        4,
-                        5,
-                        6,
-                        7,
-                        8,
-                        9,
-                    ] and layout_det2["category_id"] in [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]:
-                        if (
-                            calculate_iou(layout_det1["bbox"], layout_det2["bbox"])
-                            > 0.9
-                        ):
-                            if layout_det1["score"] < layout_det2["score"]:
-                                layout_det_need_remove = layout_det1
-                            else:
-                                layout_det_need_remove = layout_det2
-
-                            if layout_det_need_remove not in need_remove_list:
-                                need_remove_list.append(layout_det_need_remove)
-                        else:
-                            continue
-                    else:
-                        continue
-            for need_remove in need_remove_list:
-                layout_dets.remove(need_remove)
+    def __fix_by_remove_high_iou_and_low_confidence(self, model_page_info):
+        layout_dets = model_page_info["layout_dets"]
+        # 只在category_id为0-9的模型数据之间比较
+        candidates = [
+            idx for idx, layout_det in enumerate(layout_dets) if layout_det["category_id"] in HIGH_IOU_CATEGORY_IDS
+        ]
+        if len(candidates) < 2:
+            return
+        bboxes = np.array([layout_dets[idx]["bbox"] for idx in candidates], dtype=np.float64)
+        scores = np.array([layout_dets[idx]["score"] for idx in candidates], dtype=np.float64)
+        # 内容完全相同的模型数据之间不比较, 相同的数据bbox必然相同
+        groups = []
+        same_bbox = {}
+        for idx in candidates:
+            representatives = same_bbox.setdefault(tuple(layout_dets[idx]["bbox"]), [])
+            group = next((first for first in representatives if layout_dets[first] == layout_dets[idx]), idx)
+            if group == idx:
+                representatives.append(idx)
+            groups.append(group)
+        groups = np.array(groups)
+
+        high_iou = (calculate_iou_matrix(bboxes, bboxes) > 0.9) & (groups[:, None] != groups[None, :])
+        # 每对高iou的数据中删除置信度较低的那个, 置信度相同时两个都删除(两两循环中每对会正反各比较一次)
+        need_remove = np.any(high_iou & (scores[:, None] <= scores[None, :]), axis=1)
+        # 相同的数据只删除第一个
+        need_remove_idx = set(np.unique(groups[need_remove]).tolist())
+        if len(need_remove_idx) > 0:
+            layout_dets[:] = [
+                layout_det for idx, layout_det in enumerate(layout_dets) if idx not in need_remove_idx
+            ]
 
     def __init__(self, model_list: list, docs: fitz.Document):
+        """
+        model_list可以只包含部分页面(例如并行解析时每个进程只处理一段页面), 按page_info中的page_no索引
+        """
         self.__model_list = model_list
         self.__docs = docs
+        self.__pages = {}
+        for model_page_info in self.__model_list:
+            self.__pages[model_page_info["page_info"]["page_no"]] = model_page_info
+            self.__fix_page(model_page_info)
+
+    def __fix_page(self, model_page_info):
         """为所有模型数据添加bbox信息(缩放，poly->bbox)"""
-        self.__fix_axis()
+        self.__fix_axis(model_page_info)
         """删除置信度特别低的模型数据(<0.05),提高质量"""
-        self.__fix_by_remove_low_confidence()
+        self.__fix_by_remove_low_confidence(model_page_info)
         """删除高iou(>0.9)数据中置信度较低的那个"""
-        self.__fix_by_remove_high_iou_and_low_confidence()
+        self.__fix_by_remove_high_iou_and_low_confidence(model_page_info)
 
-    def __reduct_overlap(self, bboxes):
-        N = len(bboxes)
-        keep = [True] * N
-        for i in range(N):
-            for j in range(N):
-                if i == j:
-                    continue
-                if _is_in(bboxes[i]["bbox"], bboxes[j]["bbox"]):
-                    keep[i] = False
+    def append_page(self, model_page_info):
+        """
+        流水线解析时逐页追加模型数据, 页面需按页码顺序追加
+        """
+        assert model_page_info["page_info"]["page_no"] == len(self.__model_list)
+        self.__model_list.append(model_page_info)
+        self.__pages[model_page_info["page_info"]["page_no"]] = model_page_info
+        self.__fix_page(model_page_info)
 
-        return [bboxes[i] for i in range(N) if keep[i]]
+    def __reduct_overlap(self, bboxes):
+        # 删除被其它bbox完全包含的bbox, 相同的bbox互相包含, 都会被删除
+        if len(bboxes) == 0:
+            return []
+        bbox_array = np.array([bbox["bbox"] for bbox in bboxes], dtype=np.float64)
+        is_in = _is_in_matrix(bbox_array, bbox_array)
+        np.fill_diagonal(is_in, False)
+        return [bboxes[i] for i in np.flatnonzero(~is_in.any(axis=1))]
 
     def __tie_up_category_by_distance(
         self, page_no, subject_category_id, object_category_id
@@ -143,44 +148,28 @@ class MagicModel:
         # subject 和 object 的 bbox 会合并成一个大的 bbox （named: merged bbox）。 筛选出所有和 merged bbox 有 overlap 且 overlap 面积大于 object 的面积的 subjects。
         # 再求出筛选出的 subjects 和 object 的最短距离！
         def may_find_other_nearest_bbox(subject_idx, object_idx):
-            ret = float("inf")
-
-            x0 = min(
-                all_bboxes[subject_idx]["bbox"][0], all_bboxes[object_idx]["bbox"][0]
-            )
-            y0 = min(
-                all_bboxes[subject_idx]["bbox"][1], all_bboxes[object_idx]["bbox"][1]
-            )
-            x1 = max(
-                all_bboxes[subject_idx]["bbox"][2], all_bboxes[object_idx]["bbox"][2]
-            )
-            y1 = max(
-                all_bboxes[subject_idx]["bbox"][3], all_bboxes[object_idx]["bbox"][3]
-            )
-
-            object_area = abs(
-                all_bboxes[object_idx]["bbox"][2] - all_bboxes[object_idx]["bbox"][0]
-            ) * abs(
-                all_bboxes[object_idx]["bbox"][3] - all_bboxes[object_idx]["bbox"][1]
+            merged_bbox = np.concatenate(
+                [
+                    np.minimum(bboxes[subject_idx, :2], bboxes[object_idx, :2]),
+                    np.maximum(bboxes[subject_idx, 2:], bboxes[object_idx, 2:]),
+                ]
+            )[None, :]
+            object_area = abs_areas[object_idx]
+
+            # 与 merged bbox 部分重叠或者被 merged bbox 包含, 且面积不小于 object 的其它 subjects
+            is_part_overlap = _is_in_or_part_overlap_matrix(merged_bbox, bboxes)[0] & ~_is_in_matrix(
+                merged_bbox, bboxes
+            )[0]
+            matched = np.flatnonzero(
+                is_subject
+                & (idxes != subject_idx)
+                & (is_part_overlap | _is_in_matrix(bboxes, merged_bbox)[:, 0])
+                & (abs_areas >= object_area)
             )
-
-            for i in range(len(all_bboxes)):
-                if (
-                    i == subject_idx
-                    or all_bboxes[i]["category_id"] != subject_category_id
-                ):
-                    continue
-                if _is_part_overlap([x0, y0, x1, y1], all_bboxes[i]["bbox"]) or _is_in(
-                    all_bboxes[i]["bbox"], [x0, y0, x1, y1]
-                ):
-
-                    i_area = abs(
-                        all_bboxes[i]["bbox"][2] - all_bboxes[i]["bbox"][0]
-                    ) * abs(all_bboxes[i]["bbox"][3] - all_bboxes[i]["bbox"][1])
-                    if i_area >= object_area:
-                        ret = min(float("inf"), dis[i][object_idx])
-
-            return ret
+            # 逐个遍历时后面满足条件的 subject 会覆盖前面的结果, 取最后一个
+            if len(matched) == 0:
+                return float("inf")
+            return dis[matched[-1]][object_idx]
 
         def expand_bbbox(idxes):
             x0s = [all_bboxes[idx]["bbox"][0] for idx in idxes] 
@@ -195,7 +184,7 @@ class MagicModel:
                     lambda x: {"bbox": x["bbox"], "score": x["score"]},
                     filter(
                         lambda x: x["category_id"] == subject_category_id,
-                        self.__model_list[page_no]["layout_dets"],
+                        self.__pages[page_no]["layout_dets"],
                     ),
                 )
             )
@@ -207,7 +196,7 @@ class MagicModel:
                     lambda x: {"bbox": x["bbox"], "score": x["score"]},
                     filter(
                         lambda x: x["category_id"] == object_category_id,
-                        self.__model_list[page_no]["layout_dets"],
+                        self.__pages[page_no]["layout_dets"],
                     ),
                 )
             )
@@ -239,113 +228,84 @@ class MagicModel:
             )
 
         N = len(all_bboxes)
-        dis = [[MAX_DIS_OF_POINT] * N for _ in range(N)]
-
-        for i in range(N):
-            for j in range(i):
-                if (
-                    all_bboxes[i]["category_id"] == subject_category_id
-                    and all_bboxes[j]["category_id"] == subject_category_id
-                ):
-                    continue
-
-                dis[i][j] = bbox_distance(all_bboxes[i]["bbox"], all_bboxes[j]["bbox"])
-                dis[j][i] = dis[i][j]
+        bboxes = np.array([v["bbox"] for v in all_bboxes], dtype=np.float64).reshape(N, 4)
+        idxes = np.arange(N)
+        is_subject = np.array([v["category_id"] == subject_category_id for v in all_bboxes], dtype=bool)
+        is_object = np.array([v["category_id"] == object_category_id for v in all_bboxes], dtype=bool)
+        abs_areas = np.abs(bboxes[:, 2] - bboxes[:, 0]) * np.abs(bboxes[:, 3] - bboxes[:, 1])
+
+        # bbox_distance 对两个 bbox 是对称的, 取 i > j 的结果; subject 之间以及自身的距离为 MAX_DIS_OF_POINT
+        dis_matrix = np.tril(bbox_distance_matrix(bboxes, bboxes), -1)
+        dis_matrix = dis_matrix + dis_matrix.T
+        dis_matrix[np.ix_(is_subject, is_subject)] = MAX_DIS_OF_POINT
+        np.fill_diagonal(dis_matrix, MAX_DIS_OF_POINT)
+        # 逐个取值时 list 比 np.ndarray 快
+        dis = dis_matrix.tolist()
+
+        left, right, bottom, top = bbox_relative_pos_matrix(bboxes, bboxes)
+        # 相对位置超过一个方向(在斜对角)的 bbox 之间不关联
+        pos_flag_ok = left.astype(np.int8) + right + bottom + top <= 1
+        # 左右相邻时不超过 subject 的宽度, 上下相邻时不超过 subject 的高度
+        one_way_dis = np.where(
+            left | right,
+            (bboxes[:, 2] - bboxes[:, 0])[:, None],
+            (bboxes[:, 3] - bboxes[:, 1])[:, None],
+        )
 
         used = set()
+        used_mask = np.zeros(N, dtype=bool)
         for i in range(N):
             # 求第 i 个 subject 所关联的 object
-            if all_bboxes[i]["category_id"] != subject_category_id:
+            if not is_subject[i]:
                 continue
             seen = set()
-            candidates = []
-            arr = []
-            for j in range(N):
-
-                pos_flag_count = sum(
-                    list(
-                        map(
-                            lambda x: 1 if x else 0,
-                            bbox_relative_pos(
-                                all_bboxes[i]["bbox"], all_bboxes[j]["bbox"]
-                            ),
-                        )
-                    )
-                )
-                if pos_flag_count > 1:
-                    continue
-                if (
-                    all_bboxes[j]["category_id"] != object_category_id
-                    or j in used
-                    or dis[i][j] == MAX_DIS_OF_POINT
-                ):
-                    continue
-                left, right, _, _ = bbox_relative_pos(
-                    all_bboxes[i]["bbox"], all_bboxes[j]["bbox"]
-                )  # 由  pos_flag_count 相关逻辑保证本段逻辑准确性
-                if left or right:
-                    one_way_dis = all_bboxes[i]["bbox"][2] - all_bboxes[i]["bbox"][0]
-                else:
-                    one_way_dis = all_bboxes[i]["bbox"][3] - all_bboxes[i]["bbox"][1]
-                if dis[i][j] > one_way_dis:
-                    continue
-                arr.append((dis[i][j], j))
-
-            arr.sort(key=lambda x: x[0])
-            if len(arr) > 0:
+            seen_mask = np.zeros(N, dtype=bool)
+            arr = np.flatnonzero(
+                pos_flag_ok[i]
+                & is_object
+                & ~used_mask
+                & (dis_matrix[i] != MAX_DIS_OF_POINT)
+                & ~(dis_matrix[i] > one_way_dis[i])
+            )
+            if len(arr) == 0:
+                j = None
+            else:
+                # 距离相同时取下标最小的 object, 与稳定排序的结果相同
+                j = int(arr[np.argmin(dis_matrix[i, arr])])
                 # bug: 离该subject 最近的 object 可能跨越了其它的 subject 。比如 [this subect] [some sbuject] [the nearest objec of subject]
-                if may_find_other_nearest_bbox(i, arr[0][1]) >= arr[0][0]:
-
-                    candidates.append(arr[0][1])
-                    seen.add(arr[0][1])
-
-            # 已经获取初始种子
-            for j in set(candidates):
-                tmp = []
-                for k in range(i + 1, N):
-                    pos_flag_count = sum(
-                        list(
-                            map(
-                                lambda x: 1 if x else 0,
-                                bbox_relative_pos(
-                                    all_bboxes[j]["bbox"], all_bboxes[k]["bbox"]
-                                ),
-                            )
-                        )
+                if may_find_other_nearest_bbox(i, j) >= dis[i][j]:
+                    seen.add(j)
+                    seen_mask[j] = True
+                else:
+                    j = None
+
+            # 已经获取初始种子 j, 继续寻找离 j 最近的 objects
+            if j is not None:
+                ks = np.flatnonzero(
+                    (idxes > i)
+                    & pos_flag_ok[j]
+                    & is_object
+                    & ~used_mask
+                    & ~seen_mask
+                    & (dis_matrix[j] != MAX_DIS_OF_POINT)
+                    & ~(dis_matrix[j] > dis_matrix[i, j])
+                )
+                for k in ks.tolist():
+                    others = (idxes > i) & ~used_mask & ~seen_mask
+                    others[[j, k]] = False
+                    other_dis = dis_matrix[others, k]
+                    # 与 float_gt 相同: 其它 bbox 到 k 的距离都大于 j 到 k 的距离
+                    is_nearest = np.all(
+                        (np.abs(other_dis - dis_matrix[j, k]) > 0.0001) & (other_dis > dis_matrix[j, k])
                     )
 
-                    if pos_flag_count > 1:
-                        continue
-
-                    if (
-                        all_bboxes[k]["category_id"] != object_category_id
-                        or k in used
-                        or k in seen
-                        or dis[j][k] == MAX_DIS_OF_POINT
-                        or dis[j][k] > dis[i][j]
-                    ):
-                        continue
-
-                    is_nearest = True
-                    for l in range(i + 1, N):
-                        if l in (j, k) or l in used or l in seen:
-                            continue
-
-                        if not float_gt(dis[l][k], dis[j][k]):
-                            is_nearest = False
-                            break
-
                     if is_nearest:
                         nx0, ny0, nx1, ny1 = expand_bbbox(list(seen) + [k])
                         n_dis = bbox_distance(all_bboxes[i]["bbox"], [nx0, ny0, nx1, ny1])
                         if float_gt(dis[i][j], n_dis):
                             continue
-                        tmp.append(k)
                         seen.add(k)
-
-                candidates = tmp
-                if len(candidates) == 0:
-                    break
+                        seen_mask[k] = True
 
             # 已经获取到某个 figure 下所有的最靠近的 captions，以及最靠近这些 captions 的 captions 。
             # 先扩一下 bbox，
@@ -396,6 +356,7 @@ class MagicModel:
                         > CAPATION_OVERLAP_AREA_RATIO
                     ):
                         used.add(j)
+                        used_mask[j] = True
                         subject_object_relation_map[i].append(j)
 
         for i in sorted(subject_object_relation_map.keys()):
@@ -524,7 +485,7 @@ class MagicModel:
 
     def get_ocr_text(self, page_no: int) -> list:  # paddle 搞的，有字也有坐标
         text_spans = []
-        model_page_info = self.__model_list[page_no]
+        model_page_info = self.__pages[page_no]
         layout_dets = model_page_info["layout_dets"]
         for layout_det in layout_dets:
             if layout_det["category_id"] == "15":
@@ -544,7 +505,7 @@ class MagicModel:
             return new_spans
 
         all_spans = []
-        model_page_info = self.__model_list[page_no]
+        model_page_info = self.__pages[page_no]
         layout_dets = model_page_info["layout_dets"]
         allow_category_id_list = [3, 5, 13, 14, 15]
         """当成span拼接的"""
@@ -592,12 +553,9 @@ class MagicModel:
         self, type: int, page_no: int, extra_col: list[str] = []
     ) -> list:
         blocks = []
-        for page_dict in self.__model_list:
+        page_dict = self.__pages.get(page_no)
+        if page_dict is not None:
             layout_dets = page_dict.get("layout_dets", [])
-            page_info = page_dict.get("page_info", {})
-            page_number = page_info.get("page_no", -1)
-            if page_no != page_number:
-                continue
             for item in layout_dets:
                 category_id = item.get("category_id", -1)
                 bbox = item.get("bbox", None)
@@ -613,7 +571,7 @@ class MagicModel:
         return blocks
 
     def get_model_list(self, page_no):
-        return self.__model_list[page_no]
+        return self.__pages[page_no]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,47 @@
+"""
+doc_analyze的单页指标和整篇文档汇总
+按batch推理的阶段(layout、公式检测)的耗时按batch内页数平均分摊到每一页
+analyze_time同样是所在batch的总耗时按页数平均的值, batch_size大于1时不代表单页耗时,
+送入模型的页面另外记录所在batch的序号(batch_no)、页数(batch_pages)和总耗时(batch_time)
+"""
+
+TIME_KEYS = ["layout_time", "mfd_preprocess_time", "mfd_time", "mfr_time", "ocr_preprocess_time", "ocr_time",
+             "table_time", "analyze_time"]
+COUNT_KEYS = ["layout_regions", "formulas", "ocr_regions", "ocr_lines", "tables"]
+
+
+def new_page_metrics() -> dict:
+    """
+    单页各阶段的耗时(秒)和数量统计
+    """
+    page_metrics = {key: 0.0 for key in TIME_KEYS}
+    page_metrics.update({key: 0 for key in COUNT_KEYS})
+    return page_metrics
+
+
+def summarize_doc_metrics(page_metrics_list: list, doc_time: float, mfr_time: float = 0.0, top_n: int = 5) -> dict:
+    """
+    汇总整篇文档的指标
+    mfr_time: 整篇文档延后统一做公式识别时的耗时, 不计入单页指标
+    return: 各项耗时和数量的总和, 以及总耗时最长的top_n个batch
+    """
+    summary = {"pages": len(page_metrics_list), "doc_time": round(doc_time, 3)}
+    for key in TIME_KEYS:
+        summary[key] = round(sum(page_metrics[key] for page_metrics in page_metrics_list), 3)
+    summary["mfr_time"] = round(summary["mfr_time"] + mfr_time, 3)
+    for key in COUNT_KEYS:
+        summary[key] = sum(page_metrics[key] for page_metrics in page_metrics_list)
+    summary["cache_hits"] = sum(1 for page_metrics in page_metrics_list if page_metrics.get("cache_hit"))
+    summary["blank_pages"] = sum(1 for page_metrics in page_metrics_list if page_metrics.get("blank"))
+    summary["resumed_pages"] = sum(1 for page_metrics in page_metrics_list if page_metrics.get("resumed"))
+    summary["text_layer_pages"] = sum(1 for page_metrics in page_metrics_list if page_metrics.get("text_layer_valid"))
+    # 单页耗时无法从batch推理中拆分, 按batch统计最慢的部分, batch_size为1时即为最慢的页
+    batches = {}
+    for page_metrics in page_metrics_list:
+        if page_metrics.get("batch_no") is None:
+            continue
+        batch = batches.setdefault(page_metrics["batch_no"], {"batch_no": page_metrics["batch_no"], "page_nos": [],
+                                                              "batch_time": round(page_metrics["batch_time"], 3)})
+        batch["page_nos"].append(page_metrics["page_no"])
+    summary["slowest_batches"] = sorted(batches.values(), key=lambda batch: batch["batch_time"], reverse=True)[:top_n]
+    return summary
@@ -0,0 +1,205 @@
+"""
+CPU多实例模型池: 启动K个模型进程, 每个进程限定intra-op线程数, 由doc_analyze把页面分发给各个进程
+单个进程用满所有核时扩展性很差, 例如64核的机器上8个进程各用8个线程比1个进程用64个线程快得多
+页面按task_pages页为一个任务放入共享的任务队列, 空闲的进程主动从队列中取任务(work stealing),
+慢页面(公式、表格多)只占住一个进程, 不像split_to_chunks按进程数静态切分那样拖慢整批
+"""
+import atexit
+import copy
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import traceback
+
+from loguru import logger
+
+from magic_pdf.libs.Constants import MODEL_POOL_WORKERS_VALUE, MODEL_POOL_TASK_PAGES_VALUE
+
+# 等待结果时检查模型进程是否存活的间隔
+POLL_INTERVAL = 1
+
+# intra-op线程数由这些环境变量控制, 需要在模型进程import torch/paddle之前设置
+THREAD_ENV_KEYS = ["OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS", "CPU_NUM"]
+
+
+def _default_model_init(ocr: bool, show_log: bool):
+    from magic_pdf.model.doc_analyze_by_custom_model import custom_model_init
+    return custom_model_init(ocr=ocr, show_log=show_log)
+
+
+def _pool_worker(threads: int, model_mode: str, show_log: bool, model_init, task_queue, result_queue):
+    """
+    模型进程: 从task_queue取任务, 推理完成后把结果放入result_queue, 收到None时退出
+    task: (task_id, images, ocr_mask, ocr)
+    result: (task_id, (list of layout_res, list of page metrics), error)
+    """
+    for key in THREAD_ENV_KEYS:
+        os.environ[key] = str(threads)
+    import magic_pdf.model as model_config
+    model_config.__model_mode__ = model_mode
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    try:
+        import cv2
+        cv2.setNumThreads(threads)
+    except ImportError:
+        pass
+
+    models = {}
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        task_id, images, ocr_mask, ocr = task
+        try:
+            if ocr not in models:
+                # 不同ocr开关的模型共享layout/公式/表格子模型
+                base_model = next(iter(models.values()), None)
+                if base_model is not None and hasattr(base_model, "derive"):
+                    models[ocr] = base_model.derive(ocr=ocr, show_log=show_log)
+                else:
+                    models[ocr] = model_init(ocr, show_log)
+            model = models[ocr]
+            # 任务内的公式在本进程中分桶识别, 表格在batch_analyze内同步识别
+            mfr_pending = []
+            metrics = []
+            result = model.batch_analyze(images, mfr_pending=mfr_pending, ocr_mask=ocr_mask, metrics=metrics)
+            if len(mfr_pending) > 0:
+                mfr_start = time.time()
+                model.batch_formula_recognition(mfr_pending)
+                mfr_cost = (time.time() - mfr_start) / len(images)
+                for page_metrics in metrics:
+                    page_metrics["mfr_time"] += mfr_cost
+            result_queue.put((task_id, (result, metrics), None))
+        except Exception:
+            result_queue.put((task_id, None, traceback.format_exc()))
+
+
+class ModelPool:
+    """
+    与CustomPEKModel的batch_analyze接口相同, 可以直接作为doc_analyze的模型使用
+    公式识别和表格识别在模型进程内完成, 调用方传入的mfr_pending和table_group不会被使用,
+    表格的整篇文档时间预算(doc_max_time)在此模式下不生效, 单表的max_time仍然生效
+    """
+
+    def __init__(self, workers: int, threads_per_worker: int = 0, task_pages: int = 1, ocr: bool = False,
+                 show_log: bool = False, model_init=None):
+        """
+        workers: 模型进程数
+        threads_per_worker: 每个进程的intra-op线程数, 为0时按cpu核数平分
+        task_pages: 每个任务的页数, 越小负载越均衡, 越大layout和公式检测的batch越满
+        model_init: model_init(ocr, show_log)返回模型实例, 在模型进程中调用, 默认为custom_model_init
+        """
+        import magic_pdf.model as model_config
+
+        self.workers = max(workers, 1)
+        if threads_per_worker <= 0:
+            threads_per_worker = max((os.cpu_count() or 1) // self.workers, 1)
+        self.threads_per_worker = threads_per_worker
+        self.task_pages = max(task_pages, 1)
+        self.apply_ocr = ocr
+        # doc_analyze每次送入的页数, 保持每个进程有多个任务排队, 先完成的进程继续取任务
+        self.page_batch_size = self.workers * self.task_pages * 4
+
+        # 模型进程使用spawn, 不继承主进程中已初始化的torch/paddle线程池
+        context = multiprocessing.get_context("spawn")
+        self._task_queue = context.Queue()
+        self._result_queue = context.Queue()
+        # derive出的实例共享以下状态
+        self._lock = threading.Lock()
+        self._task_ids = itertools.count()
+        self._closed = threading.Event()
+        self._processes = [
+            context.Process(target=_pool_worker, daemon=True,
+                            args=(self.threads_per_worker, model_config.__model_mode__, show_log,
+                                  model_init or _default_model_init, self._task_queue, self._result_queue))
+            for _ in range(self.workers)
+        ]
+        for process in self._processes:
+            process.start()
+        atexit.register(self.close)
+        logger.info(f"model pool started, workers: {self.workers}, threads per worker: {self.threads_per_worker}")
+
+    @property
+    def closed(self) -> bool:
+        """
+        任务出错或模型进程异常退出后进程池会被关闭, ModelSingleton据此丢弃该进程池, 下次调用时重新创建
+        """
+        return self._closed.is_set()
+
+    def derive(self, ocr: bool, show_log: bool = False):
+        """
+        共享模型进程, 只有ocr开关不同
+        """
+        model = copy.copy(self)
+        model.apply_ocr = ocr
+        return model
+
+    def batch_analyze(self, images, mfr_pending=None, ocr_mask=None, metrics=None, table_group=None):
+        """
+        images按task_pages切分为任务, 由空闲的模型进程取走推理, 结果按images的顺序返回
+        """
+        if len(images) == 0:
+            return []
+        if ocr_mask is None:
+            ocr_mask = [True] * len(images)
+        with self._lock:
+            if self._closed.is_set():
+                raise RuntimeError("model pool is closed")
+            task_starts = {}
+            for start in range(0, len(images), self.task_pages):
+                task_id = next(self._task_ids)
+                task_starts[task_id] = start
+                self._task_queue.put((task_id, images[start: start + self.task_pages],
+                                      ocr_mask[start: start + self.task_pages], self.apply_ocr))
+
+            result = [None] * len(images)
+            page_metrics_list = [None] * len(images)
+            while len(task_starts) > 0:
+                try:
+                    task_id, task_result, error = self._result_queue.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    dead = [process.pid for process in self._processes if not process.is_alive()]
+                    if len(dead) > 0:
+                        self.close()
+                        raise RuntimeError(f"model pool worker exited unexpectedly, pid: {dead}")
+                    continue
+                if error is not None:
+                    # 剩余任务的结果仍会陆续返回, 关闭进程池以免和下一次调用的结果混在一起
+                    self.close()
+                    raise RuntimeError(f"model pool task failed:\n{error}")
+                start = task_starts.pop(task_id)
+                task_layout_res, task_metrics = task_result
+                result[start: start + len(task_layout_res)] = task_layout_res
+                page_metrics_list[start: start + len(task_metrics)] = task_metrics
+        if metrics is not None and all(page_metrics is not None for page_metrics in page_metrics_list):
+            metrics.extend(page_metrics_list)
+        return result
+
+    def close(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        for _ in self._processes:
+            self._task_queue.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+
+def new_model_pool(ocr: bool, show_log: bool, pool_config: dict):
+    """
+    按model-pool-config创建模型池, workers小于2时返回None, 使用单个模型实例
+    """
+    workers = int(pool_config.get("workers", MODEL_POOL_WORKERS_VALUE))
+    if workers < 2:
+        return None
+    return ModelPool(workers, threads_per_worker=int(pool_config.get("threads_per_worker", 0)),
+                     task_pages=int(pool_config.get("task_pages", MODEL_POOL_TASK_PAGES_VALUE)), ocr=ocr, show_log=show_log)
@@ -0,0 +1,157 @@
+"""
+按页缓存模型推理结果(layout_dets), 以渲染后的页面图片+模型版本+配置的哈希为key, 存放在本地磁盘
+同一份pdf重复处理, 或不同pdf之间有相同页面(封面、附录、再版)时, 命中缓存的页面跳过全部模型推理
+缓存目录总大小超过max_size时按最近使用时间(LRU)淘汰
+"""
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+from loguru import logger
+
+from magic_pdf.libs.Constants import PAGE_CACHE_MAX_SIZE_MB_VALUE
+from magic_pdf.libs.config_reader import get_page_cache_config, get_table_recog_config, \
+    get_inference_config
+from magic_pdf.libs.version import __version__
+
+CACHE_FILE_SUFFIX = ".json"
+
+
+class PageResultCache:
+
+    def __init__(self, cache_dir: str, max_size_mb: float = PAGE_CACHE_MAX_SIZE_MB_VALUE):
+        self.cache_dir = cache_dir
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> 文件大小, 按最近使用时间从旧到新排列
+        self._index = OrderedDict()
+        self._size = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + CACHE_FILE_SUFFIX)
+
+    def _load_index(self):
+        """
+        启动时扫描缓存目录, 以文件mtime作为最近使用时间恢复LRU顺序
+        """
+        entries = []
+        for sub_dir in os.listdir(self.cache_dir):
+            sub_path = os.path.join(self.cache_dir, sub_dir)
+            if not os.path.isdir(sub_path):
+                continue
+            for file_name in os.listdir(sub_path):
+                if not file_name.endswith(CACHE_FILE_SUFFIX):
+                    continue
+                stat = os.stat(os.path.join(sub_path, file_name))
+                entries.append((stat.st_mtime, file_name[:-len(CACHE_FILE_SUFFIX)], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._size += size
+        self._evict()
+
+    @staticmethod
+    def make_key(image: np.ndarray, model_signature: dict) -> str:
+        """
+        image: 渲染后的页面图片
+        model_signature: 影响推理结果的模型版本和配置, 需可json序列化
+        """
+        hasher = hashlib.sha256()
+        hasher.update(json.dumps(model_signature, sort_keys=True).encode("utf-8"))
+        hasher.update(str(image.shape).encode("utf-8"))
+        hasher.update(np.ascontiguousarray(image).tobytes())
+        return hasher.hexdigest()
+
+    def get(self, key: str):
+        """
+        命中时返回layout_dets, 否则返回None
+        """
+        path = self._path(key)
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    layout_dets = json.load(f)
+                os.utime(path)
+            except (OSError, ValueError) as e:
+                # 缓存文件被外部删除或损坏, 当作未命中
+                logger.warning(f"page cache read failed: {path}, {e}")
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+            self.hits += 1
+            return layout_dets
+
+    def put(self, key: str, layout_dets: list):
+        path = self._path(key)
+        data = json.dumps(layout_dets, ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            if key in self._index:
+                self._remove(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 先写临时文件再rename, 避免多进程同时读写时读到半个文件
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._index[key] = len(data)
+            self._size += len(data)
+            self._evict()
+
+    def _remove(self, key: str):
+        self._size -= self._index.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        while self._size > self.max_size and len(self._index) > 0:
+            oldest_key = next(iter(self._index))
+            self._remove(oldest_key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._index), "size": self._size}
+
+
+_page_cache = None
+
+
+def get_page_cache():
+    """
+    按magic-pdf.json中的page-cache-config返回进程内共享的缓存对象, 未开启时返回None
+    """
+    global _page_cache
+    page_cache_config = get_page_cache_config()
+    if not page_cache_config.get("enable", False):
+        return None
+    cache_dir = os.path.expanduser(page_cache_config.get("dir", "~/.cache/magic-pdf/page-cache"))
+    max_size_mb = page_cache_config.get("max_size_mb", PAGE_CACHE_MAX_SIZE_MB_VALUE)
+    if _page_cache is None or _page_cache.cache_dir != cache_dir:
+        _page_cache = PageResultCache(cache_dir, max_size_mb)
+    return _page_cache
+
+
+def get_model_signature(ocr: bool, model_mode: str) -> dict:
+    """
+    影响单页推理结果的因素, 任一变化都会使旧缓存失效, batch_size等只影响速度的配置不计入
+    """
+    return {
+        "version": __version__,
+        "model_mode": model_mode,
+        "ocr": ocr,
+        "table_config": get_table_recog_config(),
+        # int8量化后的模型输出与fp32略有差异
+        "inference_config": get_inference_config(),
+    }
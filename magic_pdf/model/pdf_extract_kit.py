@@ -1,4 +1,9 @@
+import copy
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
 from loguru import logger
+import math
 import os
 import time
 
@@ -19,6 +24,8 @@ try:
     from torchvision import transforms
     from torch.utils.data import Dataset, DataLoader
     from ultralytics import YOLO
+    from ultralytics.data.augment import LetterBox
+    from ultralytics.utils import ops
     from unimernet.common.config import Config
     import unimernet.tasks as tasks
     from unimernet.processors import load_processor
@@ -30,17 +37,21 @@ except ImportError as e:
         '"pip install magic-pdf[full] --extra-index-url https://myhloli.github.io/wheels/"')
     exit(1)
 
+from magic_pdf.model.formula_cache import make_crop_key, new_formula_cache
+from magic_pdf.model.model_metrics import new_page_metrics
+from magic_pdf.model.quantize import apply_inference_backend
+from magic_pdf.model.table_task import TableTaskGroup, new_table_executor
 from magic_pdf.model.pek_sub_modules.layoutlmv3.model_init import Layoutlmv3_Predictor
 from magic_pdf.model.pek_sub_modules.post_process import get_croped_image, latex_rm_whitespace
-from magic_pdf.model.pek_sub_modules.self_modify import ModifiedPaddleOCR
-from magic_pdf.model.pek_sub_modules.structeqtable.StructTableModel import StructTableModel
-from magic_pdf.model.ppTableModel import ppTableModel
 
 
 def table_model_init(table_model_type, model_path, max_time, _device_='cpu'):
+    # 表格模型依赖struct_eqtable/paddleocr, 在使用时才导入, 只导入所选的一种
     if table_model_type == STRUCT_EQTABLE:
+        from magic_pdf.model.pek_sub_modules.structeqtable.StructTableModel import StructTableModel
         table_model = StructTableModel(model_path, max_time=max_time, device=_device_)
     else:
+        from magic_pdf.model.ppTableModel import ppTableModel
         config = {
             "model_dir": model_path,
             "device": _device_
@@ -49,6 +60,12 @@ def table_model_init(table_model_type, model_path, max_time, _device_='cpu'):
     return table_model
 
 
+def ocr_model_init(show_log=False, **kwargs):
+    # paddleocr在使用时才导入, 只处理文本型pdf时不需要安装和加载
+    from magic_pdf.model.pek_sub_modules.self_modify import ModifiedPaddleOCR
+    return ModifiedPaddleOCR(show_log=show_log, **kwargs)
+
+
 def mfd_model_init(weight):
     mfd_model = YOLO(weight)
     return mfd_model
@@ -91,6 +108,43 @@ class MathDataset(Dataset):
             return image
 
 
+def mfd_preprocess(images, imgsz=MFD_IMG_SIZE, stride=32):
+    """
+    与ultralytics对list输入的预处理保持一致: 尺寸相同的页面按最小矩形letterbox, 否则统一padding到imgsz
+    return: BCHW float tensor, 可直接传给YOLO.predict
+    """
+    same_shapes = len({image.shape for image in images}) == 1
+    letterbox = LetterBox((imgsz, imgsz), auto=same_shapes, stride=stride)
+    batch = np.stack([letterbox(image=image) for image in images])
+    # BGR to RGB, BHWC to BCHW, 与ultralytics处理ndarray输入的方式相同
+    batch = np.ascontiguousarray(batch[..., ::-1].transpose((0, 3, 1, 2)))
+    return torch.from_numpy(batch).float() / 255.0
+
+
+def timed_mfd_preprocess(images):
+    preprocess_start = time.time()
+    batch = mfd_preprocess(images)
+    return batch, time.time() - preprocess_start
+
+
+def mfr_bucket_batches(mf_image_list, batch_size):
+    """
+    按宽高比分桶, 桶内按宽度排序后切分batch, 使同一batch内的公式长度接近, 减少padding和无效的解码步数
+    return: list of index list, 每个元素为一个batch在mf_image_list中的下标
+    """
+    buckets = {}
+    for idx, mf_image in enumerate(mf_image_list):
+        width, height = mf_image.size
+        aspect_ratio = max(width, 1) / max(height, 1)
+        buckets.setdefault(round(math.log2(aspect_ratio)), []).append(idx)
+    batches = []
+    for bucket_key in sorted(buckets.keys()):
+        bucket = sorted(buckets[bucket_key], key=lambda idx: mf_image_list[idx].size[0])
+        for start in range(0, len(bucket), batch_size):
+            batches.append(bucket[start: start + batch_size])
+    return batches
+
+
 class CustomPEKModel:
 
     def __init__(self, ocr: bool = False, show_log: bool = False, **kwargs):
@@ -116,7 +170,20 @@ class CustomPEKModel:
         self.table_config = kwargs.get("table_config", self.configs["config"]["table_config"])
         self.apply_table = self.table_config.get("is_table_recog_enable", False)
         self.table_max_time = self.table_config.get("max_time", TABLE_MAX_TIME_VALUE)
+        self.table_doc_max_time = self.table_config.get("doc_max_time", TABLE_DOC_MAX_TIME_VALUE)
+        self.table_batch_size = self.table_config.get("batch_size", TABLE_BATCH_SIZE_VALUE)
         self.table_model_type = self.table_config.get("model", TABLE_MASTER)
+        # formula config
+        self.formula_config = kwargs.get("formula_config", {})
+        self.mfd_batch_size = self.formula_config.get("mfd_batch_size", MFD_BATCH_SIZE_VALUE)
+        self.mfr_batch_size = self.formula_config.get("mfr_batch_size", MFR_BATCH_SIZE_VALUE)
+        self.mfr_cache = new_formula_cache(self.formula_config.get("mfr_cache_size", MFR_CACHE_SIZE_VALUE))
+        # layout config
+        self.layout_config = kwargs.get("layout_config", {})
+        self.layout_batch_size = self.layout_config.get("batch_size", LAYOUT_BATCH_SIZE_VALUE)
+        # inference config, torch_int8仅在cpu上生效
+        self.inference_config = kwargs.get("inference_config", {})
+        self.inference_backend = self.inference_config.get("backend", INFERENCE_BACKEND_TORCH)
         self.apply_ocr = ocr
         logger.info(
             "DocAnalysis init, this may take some times. apply_layout: {}, apply_formula: {}, apply_ocr: {}, apply_table: {}".format(
@@ -139,6 +206,7 @@ class CustomPEKModel:
             mfr_weight_dir = str(os.path.join(models_dir, self.configs["weights"]["mfr"]))
             mfr_cfg_path = str(os.path.join(model_config_dir, "UniMERNet", "demo.yaml"))
             self.mfr_model, mfr_vis_processors = mfr_model_init(mfr_weight_dir, mfr_cfg_path, _device_=self.device)
+            self.mfr_model = apply_inference_backend(self.mfr_model, "mfr", self.inference_backend, self.device)
             self.mfr_transform = transforms.Compose([mfr_vis_processors, ])
 
         # 初始化layout模型
@@ -147,9 +215,11 @@ class CustomPEKModel:
             str(os.path.join(model_config_dir, "layoutlmv3", "layoutlmv3_base_inference.yaml")),
             device=self.device
         )
+        self.layout_model.predictor.model = apply_inference_backend(
+            self.layout_model.predictor.model, "layout", self.inference_backend, self.device)
         # 初始化ocr
         if self.apply_ocr:
-            self.ocr_model = ModifiedPaddleOCR(show_log=show_log)
+            self.ocr_model = ocr_model_init(show_log=show_log)
 
         # init table model
         if self.apply_table:
@@ -159,45 +229,232 @@ class CustomPEKModel:
         logger.info('DocAnalysis init done!')
 
     def __call__(self, image):
+        return self.batch_analyze([image])[0]
 
-        latex_filling_list = []
-        mf_image_list = []
+    def derive(self, ocr: bool, show_log: bool = False):
+        """
+        返回与当前实例共享layout/公式/表格模型的新实例, 只有ocr开关不同
+        ocr为True且当前实例没有ocr模型时, 只初始化ocr模型
+        """
+        model = copy.copy(self)
+        model.apply_ocr = ocr
+        if ocr and getattr(self, "ocr_model", None) is None:
+            model.ocr_model = ocr_model_init(show_log=show_log)
+        return model
+
+    @property
+    def page_batch_size(self):
+        """
+        调用方每次传给batch_analyze的页数, 保证layout和公式检测都能凑满一个batch
+        """
+        if self.apply_formula:
+            return max(self.layout_batch_size, self.mfd_batch_size, 1)
+        return max(self.layout_batch_size, 1)
+
+    def new_table_task_group(self):
+        """
+        表格识别任务组, 整篇文档共用一个, 在单独的线程中识别表格
+        """
+        if getattr(self, "table_executor", None) is None:
+            self.table_executor = new_table_executor()
+        # TableMaster(paddle TableSystem)只支持单张图片, 不缓存和分组, 逐张提交
+        table_batch_size = max(getattr(self, "table_batch_size", TABLE_BATCH_SIZE_VALUE), 1) \
+            if self.table_model_type == STRUCT_EQTABLE else 1
+        return TableTaskGroup(self.table_executor, self.recognize_table_batch, self.table_max_time,
+                              getattr(self, "table_doc_max_time", TABLE_DOC_MAX_TIME_VALUE),
+                              batch_size=table_batch_size)
+
+    def recognize_table(self, image):
+        """
+        识别单张表格截图
+        return: dict, 成功时为{"latex": ...}或{"html": ...}, 失败时为空dict
+        """
+        return self.recognize_table_batch([image])[0]
+
+    def recognize_table_batch(self, images):
+        """
+        批量识别表格截图, struct_eqtable每table_batch_size张表格一次推理, TableMaster逐张识别
+        return: list of dict, 与images一一对应, 见recognize_table
+        """
+        table_batch_size = max(getattr(self, "table_batch_size", TABLE_BATCH_SIZE_VALUE), 1)
+        results = []
+        with torch.no_grad():
+            if self.table_model_type == STRUCT_EQTABLE:
+                for latex_code in self.table_model.image2latex_batch(images, batch_size=table_batch_size):
+                    if latex_code and latex_code.strip().endswith(('end{tabular}', 'end{table}')):
+                        results.append({"latex": latex_code})
+                    else:
+                        results.append({})
+            else:
+                for html_code in [self.table_model.img2html(image) for image in images]:
+                    results.append({"html": html_code} if html_code else {})
+        fail_count = sum(1 for result in results if not result)
+        if fail_count > 0:
+            logger.warning(f"------------table recognition processing fails: {fail_count}/{len(images)}----------")
+        return results
+
+    def batch_analyze(self, images, mfr_pending=None, ocr_mask=None, metrics=None, table_group=None):
+        """
+        多页图片的layout检测和公式检测各自按batch推理, 其余模型仍按页处理
+        images: list of np.ndarray
+        mfr_pending: 传入list时公式识别延后执行, 每个公式的(layout item, 公式截图)追加到该list中,
+                     由调用方收集整篇文档的公式后统一调用batch_formula_recognition
+        ocr_mask: list of bool, 与images一一对应, False的页面跳过OCR(例如文字层有效的页面), 为None时所有页面都按apply_ocr处理
+        metrics: 传入list时, 每页的各阶段耗时和数量统计(见model_metrics.new_page_metrics)按页序追加到该list中
+        table_group: 传入TableTaskGroup时表格识别异步执行, 由调用方collect结果;
+                     为None时在本次调用结束前collect
+        return: list of layout_res, 与images一一对应
+        """
+        page_metrics_list = [new_page_metrics() for _ in images]
 
         # layout检测
         layout_start = time.time()
-        layout_res = self.layout_model(image, ignore_catids=[])
+        layout_batch_size = max(self.layout_batch_size, 1)
+        layout_res_list = []
+        for start in range(0, len(images), layout_batch_size):
+            chunk_start = time.time()
+            chunk_res = self.layout_model.batch_predict(images[start: start + layout_batch_size], ignore_catids=[])
+            chunk_cost = (time.time() - chunk_start) / len(chunk_res)
+            for page_metrics, layout_res in zip(page_metrics_list[start: start + layout_batch_size], chunk_res):
+                page_metrics["layout_time"] = chunk_cost
+                page_metrics["layout_regions"] = len(layout_res)
+            layout_res_list.extend(chunk_res)
         layout_cost = round(time.time() - layout_start, 2)
-        logger.info(f"layout detection cost: {layout_cost}")
+        logger.info(f"layout detection cost: {layout_cost}, page nums: {len(images)}")
+
+        # 公式检测
+        if self.apply_formula:
+            mfd_res_list = self.batch_formula_detection(images, metrics=page_metrics_list)
+        else:
+            mfd_res_list = [[] for _ in images]
+
+        if ocr_mask is None:
+            ocr_mask = [True] * len(images)
+        local_table_group = None
+        if table_group is None and self.apply_table:
+            local_table_group = table_group = self.new_table_task_group()
+        result = [self.page_analyze(image, layout_res, mfd_res, mfr_pending, apply_ocr, page_metrics, table_group)
+                  for image, layout_res, mfd_res, apply_ocr, page_metrics
+                  in zip(images, layout_res_list, mfd_res_list, ocr_mask, page_metrics_list)]
+        if local_table_group is not None:
+            local_table_group.collect()
+            local_table_group.close()
+        if metrics is not None:
+            metrics.extend(page_metrics_list)
+        return result
+
+    def batch_formula_detection(self, images, metrics=None):
+        """
+        多页图片按mfd_batch_size送入YOLO推理, 下一个batch的letterbox预处理在后台线程中进行, 与当前batch的推理重叠
+        metrics: 与images一一对应的单页指标, 不为None时填入预处理和推理耗时
+        return: list of mfd items, 与images一一对应, 坐标为原图坐标
+        """
+        mfd_start = time.time()
+        mfd_batch_size = max(self.mfd_batch_size, 1)
+        chunks = [images[start: start + mfd_batch_size] for start in range(0, len(images), mfd_batch_size)]
+        mfd_res_list = []
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(timed_mfd_preprocess, chunks[0]) if chunks else None
+            for chunk_idx, chunk in enumerate(chunks):
+                batch, preprocess_cost = future.result()
+                if chunk_idx + 1 < len(chunks):
+                    future = executor.submit(timed_mfd_preprocess, chunks[chunk_idx + 1])
+                predict_start = time.time()
+                batch_res = self.mfd_model.predict(batch, imgsz=MFD_IMG_SIZE, conf=0.25, iou=0.45, verbose=False)
+                predict_cost = time.time() - predict_start
+                if metrics is not None:
+                    for page_metrics in metrics[chunk_idx * mfd_batch_size: chunk_idx * mfd_batch_size + len(chunk)]:
+                        page_metrics["mfd_preprocess_time"] = preprocess_cost / len(chunk)
+                        page_metrics["mfd_time"] = predict_cost / len(chunk)
+                for image, mfd_res in zip(chunk, batch_res):
+                    # letterbox坐标映射回原图坐标
+                    xyxy_list = ops.scale_boxes(batch.shape[2:], mfd_res.boxes.xyxy.clone(), image.shape).cpu()
+                    page_mfd_res = []
+                    for xyxy, conf, cla in zip(xyxy_list, mfd_res.boxes.conf.cpu(), mfd_res.boxes.cls.cpu()):
+                        xmin, ymin, xmax, ymax = [int(p.item()) for p in xyxy]
+                        page_mfd_res.append({
+                            'category_id': 13 + int(cla.item()),
+                            'poly': [xmin, ymin, xmax, ymin, xmax, ymax, xmin, ymax],
+                            'score': round(float(conf.item()), 2),
+                            'latex': '',
+                        })
+                    mfd_res_list.append(page_mfd_res)
+        mfd_cost = round(time.time() - mfd_start, 2)
+        logger.info(f"mfd cost: {mfd_cost}, page nums: {len(images)}")
+        return mfd_res_list
+
+    def batch_formula_recognition(self, mfr_pending):
+        """
+        对收集到的公式截图做按长度分桶的批量识别, 并把latex回填到对应的layout item中
+        mfr_pending: list of (layout item, PIL.Image)
+        """
+        mfr_start = time.time()
+        # 像素相同的公式截图只识别一次, 结果回填到所有重复的layout item
+        crop_groups = OrderedDict()
+        for item, mf_image in mfr_pending:
+            crop_key = make_crop_key(mf_image)
+            if crop_key not in crop_groups:
+                crop_groups[crop_key] = (mf_image, [])
+            crop_groups[crop_key][1].append(item)
+
+        crop_keys = []
+        mf_image_list = []
+        cache_hits = 0
+        for crop_key, (mf_image, items) in crop_groups.items():
+            latex = self.mfr_cache.get(crop_key) if self.mfr_cache is not None else None
+            if latex is not None:
+                cache_hits += 1
+                for item in items:
+                    item['latex'] = latex
+            else:
+                crop_keys.append(crop_key)
+                mf_image_list.append(mf_image)
+
+        batches = mfr_bucket_batches(mf_image_list, self.mfr_batch_size)
+        if len(batches) > 0:
+            dataset = MathDataset(mf_image_list, transform=self.mfr_transform)
+            dataloader = DataLoader(dataset, batch_sampler=batches, num_workers=0)
+            for batch_idxes, mf_img in zip(batches, dataloader):
+                mf_img = mf_img.to(self.device)
+                output = self.mfr_model.generate({'image': mf_img})
+                for idx, latex in zip(batch_idxes, output['pred_str']):
+                    latex = latex_rm_whitespace(latex)
+                    for item in crop_groups[crop_keys[idx]][1]:
+                        item['latex'] = latex
+                    if self.mfr_cache is not None:
+                        self.mfr_cache.put(crop_keys[idx], latex)
+        mfr_cost = round(time.time() - mfr_start, 2)
+        logger.info(f"formula nums: {len(mfr_pending)}, distinct: {len(crop_groups)}, cache hits: {cache_hits}, "
+                    f"mfr batches: {len(batches)}, mfr time: {mfr_cost}")
+
+    def page_analyze(self, image, layout_res, mfd_res=None, mfr_pending=None, apply_ocr=True, page_metrics=None,
+                     table_group=None):
+
+        if page_metrics is None:
+            page_metrics = new_page_metrics()
+        latex_filling_list = []
+        mf_image_list = []
+        pil_img = Image.fromarray(image)
 
         if self.apply_formula:
             # 公式检测
-            mfd_res = self.mfd_model.predict(image, imgsz=1888, conf=0.25, iou=0.45, verbose=True)[0]
-            for xyxy, conf, cla in zip(mfd_res.boxes.xyxy.cpu(), mfd_res.boxes.conf.cpu(), mfd_res.boxes.cls.cpu()):
-                xmin, ymin, xmax, ymax = [int(p.item()) for p in xyxy]
-                new_item = {
-                    'category_id': 13 + int(cla.item()),
-                    'poly': [xmin, ymin, xmax, ymin, xmax, ymax, xmin, ymax],
-                    'score': round(float(conf.item()), 2),
-                    'latex': '',
-                }
+            if mfd_res is None:
+                mfd_res = self.batch_formula_detection([image], metrics=[page_metrics])[0]
+            page_metrics["formulas"] = len(mfd_res)
+            for new_item in mfd_res:
+                xmin, ymin, _, _, xmax, ymax, _, _ = new_item['poly']
                 layout_res.append(new_item)
                 latex_filling_list.append(new_item)
-                bbox_img = get_croped_image(Image.fromarray(image), [xmin, ymin, xmax, ymax])
+                bbox_img = get_croped_image(pil_img, [xmin, ymin, xmax, ymax])
                 mf_image_list.append(bbox_img)
 
             # 公式识别
-            mfr_start = time.time()
-            dataset = MathDataset(mf_image_list, transform=self.mfr_transform)
-            dataloader = DataLoader(dataset, batch_size=64, num_workers=0)
-            mfr_res = []
-            for mf_img in dataloader:
-                mf_img = mf_img.to(self.device)
-                output = self.mfr_model.generate({'image': mf_img})
-                mfr_res.extend(output['pred_str'])
-            for res, latex in zip(latex_filling_list, mfr_res):
-                res['latex'] = latex_rm_whitespace(latex)
-            mfr_cost = round(time.time() - mfr_start, 2)
-            logger.info(f"formula nums: {len(mf_image_list)}, mfr time: {mfr_cost}")
+            if mfr_pending is not None:
+                mfr_pending.extend(zip(latex_filling_list, mf_image_list))
+            elif len(mf_image_list) > 0:
+                mfr_start = time.time()
+                self.batch_formula_recognition(list(zip(latex_filling_list, mf_image_list)))
+                page_metrics["mfr_time"] = time.time() - mfr_start
 
         # Select regions for OCR / formula regions / table regions
         ocr_res_list = []
@@ -230,12 +487,13 @@ class CustomPEKModel:
             return_list = [crop_paste_x, crop_paste_y, crop_xmin, crop_ymin, crop_xmax, crop_ymax, crop_new_width, crop_new_height]
             return return_image, return_list
 
-        pil_img = Image.fromarray(image)
-
         # ocr识别
-        if self.apply_ocr:
+        if self.apply_ocr and apply_ocr:
             ocr_start = time.time()
             # Process each area that requires OCR processing
+            ocr_images = []
+            ocr_mfd_res_list = []
+            ocr_useful_lists = []
             for res in ocr_res_list:
                 new_image, useful_list = crop_img(res, pil_img, crop_paste_x=50, crop_paste_y=50)
                 paste_x, paste_y, xmin, ymin, xmax, ymax, new_width, new_height = useful_list
@@ -256,11 +514,20 @@ class CustomPEKModel:
                             "bbox": [x0, y0, x1, y1],
                         })
 
-                # OCR recognition
-                new_image = cv2.cvtColor(np.asarray(new_image), cv2.COLOR_RGB2BGR)
-                ocr_res = self.ocr_model.ocr(new_image, mfd_res=adjusted_mfdetrec_res)[0]
+                ocr_images.append(cv2.cvtColor(np.asarray(new_image), cv2.COLOR_RGB2BGR))
+                ocr_mfd_res_list.append(adjusted_mfdetrec_res)
+                ocr_useful_lists.append(useful_list)
+            page_metrics["ocr_preprocess_time"] = time.time() - ocr_start
+            page_metrics["ocr_regions"] = len(ocr_images)
+
+            # OCR recognition, 各区域分别做文字检测, 全页的文本行合并为一次识别
+            ocr_infer_start = time.time()
+            ocr_res_all = self.ocr_model.batch_ocr(ocr_images, mfd_res_list=ocr_mfd_res_list)
+            page_metrics["ocr_time"] = time.time() - ocr_infer_start
 
-                # Integration results
+            # Integration results
+            for useful_list, ocr_res in zip(ocr_useful_lists, ocr_res_all):
+                paste_x, paste_y, xmin, ymin, xmax, ymax, new_width, new_height = useful_list
                 if ocr_res:
                     for box_ocr_res in ocr_res:
                         p1, p2, p3, p4 = box_ocr_res[0]
@@ -278,42 +545,24 @@ class CustomPEKModel:
                             'score': round(score, 2),
                             'text': text,
                         })
+                        page_metrics["ocr_lines"] += 1
 
             ocr_cost = round(time.time() - ocr_start, 2)
             logger.info(f"ocr cost: {ocr_cost}")
 
-        # 表格识别 table recognition
+        # 表格识别 table recognition, 提交给table_group异步执行, 时间预算见TableTaskGroup
         if self.apply_table:
             table_start = time.time()
             for res in table_res_list:
                 new_image, _ = crop_img(res, pil_img)
-                single_table_start_time = time.time()
-                logger.info("------------------table recognition processing begins-----------------")
-                latex_code = None
-                html_code = None
-                with torch.no_grad():
-                    if self.table_model_type == STRUCT_EQTABLE:
-                        latex_code = self.table_model.image2latex(new_image)[0]
-                    else:
-                        html_code = self.table_model.img2html(new_image)
-                run_time = time.time() - single_table_start_time
-                logger.info(f"------------table recognition processing ends within {run_time}s-----")
-                if run_time > self.table_max_time:
-                    logger.warning(f"------------table recognition processing exceeds max time {self.table_max_time}s----------")
-                # 判断是否返回正常
-
-                if latex_code:
-                    expected_ending = latex_code.strip().endswith('end{tabular}') or latex_code.strip().endswith(
-                        'end{table}')
-                    if expected_ending:
-                        res["latex"] = latex_code
-                    else:
-                        logger.warning(f"------------table recognition processing fails----------")
-                elif html_code:
-                    res["html"] = html_code
+                if table_group is not None:
+                    table_group.submit(res, new_image, page_metrics)
                 else:
-                    logger.warning(f"------------table recognition processing fails----------")
+                    single_table_start_time = time.time()
+                    res.update(self.recognize_table(new_image))
+                    page_metrics["table_time"] += time.time() - single_table_start_time
+            page_metrics["tables"] = len(table_res_list)
             table_cost = round(time.time() - table_start, 2)
-            logger.info(f"table cost: {table_cost}")
+            logger.info(f"table nums: {len(table_res_list)}, table cost: {table_cost}")
 
         return layout_res
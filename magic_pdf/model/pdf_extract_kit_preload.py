@@ -1,28 +1,29 @@
-from loguru import logger
+"""
+按组件懒加载的模型注册表, 各个模型在第一次被使用时才加载, 之后在进程内共享
+只处理文本型pdf时不会加载ocr模型, 未开启表格识别时不会加载表格模型
+"""
+import copy
+import gc
 import os
+import threading
 import time
 
-from magic_pdf.libs.Constants import TABLE_MAX_TIME_VALUE
+from loguru import logger
+
+from magic_pdf.libs.Constants import TABLE_MAX_TIME_VALUE, TABLE_DOC_MAX_TIME_VALUE, TABLE_BATCH_SIZE_VALUE, \
+    TABLE_MASTER, MFR_BATCH_SIZE_VALUE, \
+    MFD_BATCH_SIZE_VALUE, LAYOUT_BATCH_SIZE_VALUE, INFERENCE_BACKEND_TORCH, MFR_CACHE_SIZE_VALUE
+from magic_pdf.libs.config_reader import get_local_models_dir, get_device, get_table_recog_config, \
+    get_formula_config, get_layout_config, get_inference_config
+from magic_pdf.model.pdf_extract_kit import CustomPEKModel, mfd_model_init, mfr_model_init, layout_model_init, \
+    table_model_init, ocr_model_init
+from magic_pdf.model.formula_cache import new_formula_cache
+from magic_pdf.model.quantize import apply_inference_backend
 
-os.environ['NO_ALBUMENTATIONS_UPDATE'] = '1'  # 禁止albumentations检查更新
 try:
-    import cv2
-    import yaml
-    import argparse
-    import numpy as np
     import torch
-    import torchtext
-
-    if torchtext.__version__ >= "0.18.0":
-        torchtext.disable_torchtext_deprecation_warning()
-    from PIL import Image
+    import yaml
     from torchvision import transforms
-    from torch.utils.data import Dataset, DataLoader
-    from ultralytics import YOLO
-    from unimernet.common.config import Config
-    import unimernet.tasks as tasks
-    from unimernet.processors import load_processor
-
 except ImportError as e:
     logger.exception(e)
     logger.error(
@@ -30,19 +31,6 @@ except ImportError as e:
         '"pip install magic-pdf[full] --extra-index-url https://myhloli.github.io/wheels/"')
     exit(1)
 
-from magic_pdf.model.pek_sub_modules.layoutlmv3.model_init import Layoutlmv3_Predictor
-from magic_pdf.model.pek_sub_modules.post_process import get_croped_image, latex_rm_whitespace
-from magic_pdf.model.pek_sub_modules.self_modify import ModifiedPaddleOCR
-from magic_pdf.model.pek_sub_modules.structeqtable.StructTableModel import StructTableModel
-
-from magic_pdf.libs.config_reader import get_local_models_dir, get_device, get_table_recog_config
-# 从配置文件读取model-dir和device
-local_models_dir = get_local_models_dir()
-device = get_device()
-logger.info("using device: {}".format(device))
-
-table_config = get_table_recog_config()
-
 root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # model_config目录
 cfg_dir = os.path.join(root_dir, 'resources', 'model_config')
@@ -51,255 +39,151 @@ cfg_path = os.path.join(cfg_dir, 'model_configs.yaml')
 with open(cfg_path, "r", encoding='utf-8') as f:
     model_cfg = yaml.load(f, Loader=yaml.FullLoader)
 
-apply_layout = model_cfg["config"]["layout"]
-apply_formula = model_cfg["config"]["formula"]
-apply_table = table_config.get("is_table_recog_enable", False)
-table_max_time = table_config.get("max_time", TABLE_MAX_TIME_VALUE)
 
-def table_model_init(model_path, max_time, _device_='cpu'):
-    table_model = StructTableModel(model_path, max_time=max_time, device=_device_)
-    return table_model
+class ModelRegistry:
+    """
+    name -> loader, get时按需加载并缓存, unload后下次get会重新加载
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._lock = threading.RLock()
 
+    def register(self, name: str, loader):
+        self._loaders[name] = loader
 
-def mfd_model_init(weight):
-    mfd_model = YOLO(weight)
-    return mfd_model
+    def get(self, name: str):
+        with self._lock:
+            if name not in self._models:
+                load_start = time.time()
+                self._models[name] = self._loaders[name]()
+                logger.info(f"{name} model init cost: {round(time.time() - load_start, 2)}")
+            return self._models[name]
 
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
 
-def mfr_model_init(weight_dir, cfg_path, _device_='cpu'):
-    args = argparse.Namespace(cfg_path=cfg_path, options=None)
-    cfg = Config(args)
-    cfg.config.model.pretrained = os.path.join(weight_dir, "pytorch_model.bin")
-    cfg.config.model.model_config.model_name = weight_dir
-    cfg.config.model.tokenizer_config.path = weight_dir
-    task = tasks.setup_task(cfg)
-    model = task.build_model(cfg)
-    model = model.to(_device_)
-    vis_processor = load_processor('formula_image_eval', cfg.config.datasets.formula_rec_eval.vis_processor.eval)
-    return model, vis_processor
+    def unload(self, name: str = None):
+        """
+        释放指定模型, name为None时释放全部已加载的模型
+        """
+        with self._lock:
+            names = list(self._models.keys()) if name is None else [name]
+            for model_name in names:
+                if self._models.pop(model_name, None) is not None:
+                    logger.info(f"{model_name} model unloaded")
+            gc.collect()
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
 
 
-def layout_model_init(weight, config_file, device):
-    model = Layoutlmv3_Predictor(weight, config_file, device)
-    return model
+def _load_mfd():
+    return mfd_model_init(str(os.path.join(get_local_models_dir(), model_cfg["weights"]["mfd"])))
 
 
-# 初始化解析方案
-logger.info("init from models_dir: {}".format(local_models_dir))
+def _load_mfr():
+    mfr_weight_dir = str(os.path.join(get_local_models_dir(), model_cfg["weights"]["mfr"]))
+    mfr_cfg_path = str(os.path.join(cfg_dir, "UniMERNet", "demo.yaml"))
+    mfr_model, mfr_vis_processors = mfr_model_init(mfr_weight_dir, mfr_cfg_path, _device_=get_device())
+    mfr_model = apply_inference_backend(mfr_model, "mfr", get_inference_config().get("backend", INFERENCE_BACKEND_TORCH),
+                                        get_device())
+    return mfr_model, transforms.Compose([mfr_vis_processors, ])
 
-# 初始化公式检测模型
-mfd_model = mfd_model_init(str(os.path.join(local_models_dir, model_cfg["weights"]["mfd"])))
 
-# 初始化公式解析模型
-mfr_weight_dir = str(os.path.join(local_models_dir, model_cfg["weights"]["mfr"]))
-mfr_cfg_path = str(os.path.join(cfg_dir, "UniMERNet", "demo.yaml"))
-mfr_model, mfr_vis_processors = mfr_model_init(mfr_weight_dir, mfr_cfg_path, _device_=device)
-mfr_transform = transforms.Compose([mfr_vis_processors, ])
+def _load_layout():
+    layout_model = layout_model_init(
+        str(os.path.join(get_local_models_dir(), model_cfg['weights']['layout'])),
+        str(os.path.join(cfg_dir, "layoutlmv3", "layoutlmv3_base_inference.yaml")),
+        device=get_device()
+    )
+    layout_model.predictor.model = apply_inference_backend(
+        layout_model.predictor.model, "layout", get_inference_config().get("backend", INFERENCE_BACKEND_TORCH),
+        get_device())
+    return layout_model
 
-# 初始化layout模型
-layout_model = Layoutlmv3_Predictor(
-    str(os.path.join(local_models_dir, model_cfg['weights']['layout'])),
-    str(os.path.join(cfg_dir, "layoutlmv3", "layoutlmv3_base_inference.yaml")),
-    device=device
-)
-# 初始化ocr 模型
-ocr_model = ModifiedPaddleOCR(show_log=False, use_gpu=True)
 
-# init structeqtable
-table_model = table_model_init(str(os.path.join(local_models_dir, model_cfg["weights"]["table"])),
-                                        max_time = table_max_time, _device_=device)
-logger.info('DocAnalysis init done!')
+def _load_ocr():
+    # paddle只区分cpu和gpu, device配置为cuda时使用gpu
+    return ocr_model_init(show_log=False, use_gpu=str(get_device()).startswith("cuda"))
 
 
-class MathDataset(Dataset):
-    def __init__(self, image_paths, transform=None):
-        self.image_paths = image_paths
-        self.transform = transform
+def _load_table():
+    table_config = get_table_recog_config()
+    table_model_type = table_config.get("model", TABLE_MASTER)
+    return table_model_init(table_model_type,
+                            str(os.path.join(get_local_models_dir(), model_cfg["weights"][table_model_type])),
+                            max_time=table_config.get("max_time", TABLE_MAX_TIME_VALUE), _device_=get_device())
 
-    def __len__(self):
-        return len(self.image_paths)
 
-    def __getitem__(self, idx):
-        # if not pil image, then convert to pil image
-        if isinstance(self.image_paths[idx], str):
-            raw_image = Image.open(self.image_paths[idx])
-        else:
-            raw_image = self.image_paths[idx]
-        if self.transform:
-            image = self.transform(raw_image)
-            return image
+model_registry = ModelRegistry()
+model_registry.register("mfd", _load_mfd)
+model_registry.register("mfr", _load_mfr)
+model_registry.register("layout", _load_layout)
+model_registry.register("ocr", _load_ocr)
+model_registry.register("table", _load_table)
 
 
-class PreloadedPEKModel:
+class PreloadedPEKModel(CustomPEKModel):
+    """
+    与CustomPEKModel的推理逻辑相同, 各个子模型从model_registry中按需获取
+    """
 
     def __init__(self, ocr: bool = False, show_log: bool = False, **kwargs):
         """
-        model init
+        model init, 只读取配置, 不加载模型
         """
-        self.apply_formula = apply_formula
+        table_config = get_table_recog_config()
+        formula_config = get_formula_config()
+        layout_config = get_layout_config()
+
+        self.apply_layout = model_cfg["config"]["layout"]
+        self.apply_formula = model_cfg["config"]["formula"]
         self.apply_ocr = ocr
-        self.apply_table = apply_table
-        self.apply_layout = apply_layout
-
-        self.mfr_model = mfr_model
-        self.mfd_model = mfd_model
-        self.mfr_transform = mfr_transform
-
-        # 初始化layout模型
-        self.layout_model = layout_model
-        # 初始化ocr
-        self.ocr_model = ocr_model
-
-        self.table_model = table_model
-        self.device = device
-        self.table_max_time = table_max_time
-        
-        logger.info('DocAnalysis init done!')
-
-    def __call__(self, image):
-
-        latex_filling_list = []
-        mf_image_list = []
-
-        # layout检测
-        layout_start = time.time()
-        layout_res = self.layout_model(image, ignore_catids=[])
-        layout_cost = round(time.time() - layout_start, 2)
-        logger.info(f"layout detection cost: {layout_cost}")
-
-        if self.apply_formula:
-            # 公式检测
-            mfd_res = self.mfd_model.predict(image, imgsz=1888, conf=0.25, iou=0.45, verbose=True)[0]
-            for xyxy, conf, cla in zip(mfd_res.boxes.xyxy.cpu(), mfd_res.boxes.conf.cpu(), mfd_res.boxes.cls.cpu()):
-                xmin, ymin, xmax, ymax = [int(p.item()) for p in xyxy]
-                new_item = {
-                    'category_id': 13 + int(cla.item()),
-                    'poly': [xmin, ymin, xmax, ymin, xmax, ymax, xmin, ymax],
-                    'score': round(float(conf.item()), 2),
-                    'latex': '',
-                }
-                layout_res.append(new_item)
-                latex_filling_list.append(new_item)
-                bbox_img = get_croped_image(Image.fromarray(image), [xmin, ymin, xmax, ymax])
-                mf_image_list.append(bbox_img)
-
-            # 公式识别
-            mfr_start = time.time()
-            dataset = MathDataset(mf_image_list, transform=self.mfr_transform)
-            dataloader = DataLoader(dataset, batch_size=64, num_workers=0)
-            mfr_res = []
-            for mf_img in dataloader:
-                mf_img = mf_img.to(self.device)
-                output = self.mfr_model.generate({'image': mf_img})
-                mfr_res.extend(output['pred_str'])
-            for res, latex in zip(latex_filling_list, mfr_res):
-                res['latex'] = latex_rm_whitespace(latex)
-            mfr_cost = round(time.time() - mfr_start, 2)
-            logger.info(f"formula nums: {len(mf_image_list)}, mfr time: {mfr_cost}")
-
-        # Select regions for OCR / formula regions / table regions
-        ocr_res_list = []
-        table_res_list = []
-        single_page_mfdetrec_res = []
-        for res in layout_res:
-            if int(res['category_id']) in [13, 14]:
-                single_page_mfdetrec_res.append({
-                    "bbox": [int(res['poly'][0]), int(res['poly'][1]),
-                             int(res['poly'][4]), int(res['poly'][5])],
-                })
-            elif int(res['category_id']) in [0, 1, 2, 4, 6, 7]:
-                ocr_res_list.append(res)
-            elif int(res['category_id']) in [5]:
-                table_res_list.append(res)
-
-        #  Unified crop img logic
-        def crop_img(input_res, input_pil_img, crop_paste_x=0, crop_paste_y=0):
-            crop_xmin, crop_ymin = int(input_res['poly'][0]), int(input_res['poly'][1])
-            crop_xmax, crop_ymax = int(input_res['poly'][4]), int(input_res['poly'][5])
-            # Create a white background with an additional width and height of 50
-            crop_new_width = crop_xmax - crop_xmin + crop_paste_x * 2
-            crop_new_height = crop_ymax - crop_ymin + crop_paste_y * 2
-            return_image = Image.new('RGB', (crop_new_width, crop_new_height), 'white')
-
-            # Crop image
-            crop_box = (crop_xmin, crop_ymin, crop_xmax, crop_ymax)
-            cropped_img = input_pil_img.crop(crop_box)
-            return_image.paste(cropped_img, (crop_paste_x, crop_paste_y))
-            return_list = [crop_paste_x, crop_paste_y, crop_xmin, crop_ymin, crop_xmax, crop_ymax, crop_new_width, crop_new_height]
-            return return_image, return_list
-
-        pil_img = Image.fromarray(image)
-
-        # ocr识别
-        if self.apply_ocr:
-            ocr_start = time.time()
-            # Process each area that requires OCR processing
-            for res in ocr_res_list:
-                new_image, useful_list = crop_img(res, pil_img, crop_paste_x=50, crop_paste_y=50)
-                paste_x, paste_y, xmin, ymin, xmax, ymax, new_width, new_height = useful_list
-                # Adjust the coordinates of the formula area
-                adjusted_mfdetrec_res = []
-                for mf_res in single_page_mfdetrec_res:
-                    mf_xmin, mf_ymin, mf_xmax, mf_ymax = mf_res["bbox"]
-                    # Adjust the coordinates of the formula area to the coordinates relative to the cropping area
-                    x0 = mf_xmin - xmin + paste_x
-                    y0 = mf_ymin - ymin + paste_y
-                    x1 = mf_xmax - xmin + paste_x
-                    y1 = mf_ymax - ymin + paste_y
-                    # Filter formula blocks outside the graph
-                    if any([x1 < 0, y1 < 0]) or any([x0 > new_width, y0 > new_height]):
-                        continue
-                    else:
-                        adjusted_mfdetrec_res.append({
-                            "bbox": [x0, y0, x1, y1],
-                        })
-
-                # OCR recognition
-                new_image = cv2.cvtColor(np.asarray(new_image), cv2.COLOR_RGB2BGR)
-                ocr_res = self.ocr_model.ocr(new_image, mfd_res=adjusted_mfdetrec_res)[0]
-
-                # Integration results
-                if ocr_res:
-                    for box_ocr_res in ocr_res:
-                        p1, p2, p3, p4 = box_ocr_res[0]
-                        text, score = box_ocr_res[1]
-
-                        # Convert the coordinates back to the original coordinate system
-                        p1 = [p1[0] - paste_x + xmin, p1[1] - paste_y + ymin]
-                        p2 = [p2[0] - paste_x + xmin, p2[1] - paste_y + ymin]
-                        p3 = [p3[0] - paste_x + xmin, p3[1] - paste_y + ymin]
-                        p4 = [p4[0] - paste_x + xmin, p4[1] - paste_y + ymin]
-
-                        layout_res.append({
-                            'category_id': 15,
-                            'poly': p1 + p2 + p3 + p4,
-                            'score': round(score, 2),
-                            'text': text,
-                        })
-
-            ocr_cost = round(time.time() - ocr_start, 2)
-            logger.info(f"ocr cost: {ocr_cost}")
-
-        # 表格识别 table recognition
-        if self.apply_table:
-            table_start = time.time()
-            for res in table_res_list:
-                new_image, _ = crop_img(res, pil_img)
-                single_table_start_time = time.time()
-                logger.info("------------------table recognition processing begins-----------------")
-                with torch.no_grad():
-                    latex_code = self.table_model.image2latex(new_image)[0]
-                run_time = time.time() - single_table_start_time
-                logger.info(f"------------table recognition processing ends within {run_time}s-----")
-                if run_time > self.table_max_time:
-                    logger.warning(f"------------table recognition processing exceeds max time {self.table_max_time}s----------")
-                # 判断是否返回正常
-                expected_ending = latex_code.strip().endswith('end{tabular}') or latex_code.strip().endswith('end{table}')
-                if latex_code and expected_ending:
-                    res["latex"] = latex_code
-                else:
-                    logger.warning(f"------------table recognition processing fails----------")
-            table_cost = round(time.time() - table_start, 2)
-            logger.info(f"table cost: {table_cost}")
-
-        return layout_res
+        self.apply_table = table_config.get("is_table_recog_enable", False)
+        self.table_max_time = table_config.get("max_time", TABLE_MAX_TIME_VALUE)
+        self.table_doc_max_time = table_config.get("doc_max_time", TABLE_DOC_MAX_TIME_VALUE)
+        self.table_batch_size = table_config.get("batch_size", TABLE_BATCH_SIZE_VALUE)
+        self.table_model_type = table_config.get("model", TABLE_MASTER)
+        self.mfd_batch_size = formula_config.get("mfd_batch_size", MFD_BATCH_SIZE_VALUE)
+        self.mfr_batch_size = formula_config.get("mfr_batch_size", MFR_BATCH_SIZE_VALUE)
+        self.mfr_cache = new_formula_cache(formula_config.get("mfr_cache_size", MFR_CACHE_SIZE_VALUE))
+        self.layout_batch_size = layout_config.get("batch_size", LAYOUT_BATCH_SIZE_VALUE)
+        self.device = get_device()
+        logger.info(
+            "DocAnalysis init, apply_layout: {}, apply_formula: {}, apply_ocr: {}, apply_table: {}, device: {}".format(
+                self.apply_layout, self.apply_formula, self.apply_ocr, self.apply_table, self.device
+            )
+        )
+
+    def derive(self, ocr: bool, show_log: bool = False):
+        """
+        子模型都在model_registry中共享, 只需复制开关
+        """
+        model = copy.copy(self)
+        model.apply_ocr = ocr
+        return model
+
+    @property
+    def layout_model(self):
+        return model_registry.get("layout")
+
+    @property
+    def mfd_model(self):
+        return model_registry.get("mfd")
+
+    @property
+    def mfr_model(self):
+        return model_registry.get("mfr")[0]
+
+    @property
+    def mfr_transform(self):
+        return model_registry.get("mfr")[1]
+
+    @property
+    def ocr_model(self):
+        return model_registry.get("ocr")
+
+    @property
+    def table_model(self):
+        return model_registry.get("table")
@@ -1,3 +1,5 @@
+import torch
+
 from .visualizer import Visualizer
 from .rcnn_vl import *
 from .backbone import *
@@ -130,11 +132,36 @@ class Layoutlmv3_Predictor(object):
         # page_layout_result = {
         #     "layout_dets": []
         # }
-        layout_dets = []
         outputs = self.predictor(image)
-        boxes = outputs["instances"].to("cpu")._fields["pred_boxes"].tensor.tolist()
-        labels = outputs["instances"].to("cpu")._fields["pred_classes"].tolist()
-        scores = outputs["instances"].to("cpu")._fields["scores"].tolist()
+        return self._instances_to_layout_dets(outputs["instances"], ignore_catids)
+
+    def batch_predict(self, images, ignore_catids=[]):
+        """
+        多页图片一次送入backbone推理, 预处理与DefaultPredictor.__call__保持一致
+        images: list of np.ndarray, 与__call__的输入格式相同
+        return: list of layout_dets, 与images一一对应
+        """
+        if len(images) == 0:
+            return []
+        inputs = []
+        with torch.no_grad():
+            for original_image in images:
+                if self.predictor.input_format == "RGB":
+                    original_image = original_image[:, :, ::-1]
+                height, width = original_image.shape[:2]
+                image = self.predictor.aug.get_transform(original_image).apply_image(original_image)
+                image = torch.as_tensor(image.astype("float32").transpose(2, 0, 1))
+                inputs.append({"image": image, "height": height, "width": width})
+            outputs = self.predictor.model(inputs)
+        return [self._instances_to_layout_dets(output["instances"], ignore_catids) for output in outputs]
+
+    @staticmethod
+    def _instances_to_layout_dets(instances, ignore_catids):
+        layout_dets = []
+        instances = instances.to("cpu")
+        boxes = instances._fields["pred_boxes"].tensor.tolist()
+        labels = instances._fields["pred_classes"].tolist()
+        scores = instances._fields["scores"].tolist()
         for bbox_idx in range(len(boxes)):
             if labels[bbox_idx] in ignore_catids:
                 continue
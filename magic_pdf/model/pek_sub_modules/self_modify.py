@@ -242,6 +242,58 @@ class ModifiedPaddleOCR(PaddleOCR):
                 return cls_res
             return ocr_res
 
+    def batch_ocr(self, imgs, mfd_res_list=None, cls=True, alpha_color=(255, 255, 255)):
+        """
+        先对每张图片分别做文字检测, 再把所有图片的文本行截图合并为一次识别(及方向分类)
+        imgs: list of ndarray, 通常是同一页或多页上的各个版面区域
+        mfd_res_list: 与imgs一一对应的公式框列表, 用于切分与公式重叠的文本框
+        return: 与imgs一一对应的list, 元素格式与ocr()相同, 为[[box, (text, score)], ...]或None
+        """
+        if mfd_res_list is None:
+            mfd_res_list = [None] * len(imgs)
+
+        start = time.time()
+        img_crop_list = []
+        crop_owner_list = []
+        dt_boxes_list = []
+        for img_idx, (img, mfd_res) in enumerate(zip(imgs, mfd_res_list)):
+            img = alpha_to_color(check_img(img), alpha_color)
+            dt_boxes, elapse = self.text_detector(img)
+            if dt_boxes is None or len(dt_boxes) == 0:
+                dt_boxes_list.append([])
+                continue
+            dt_boxes = sorted_boxes(dt_boxes)
+            if mfd_res:
+                dt_boxes = update_det_boxes(dt_boxes, mfd_res)
+            for bno in range(len(dt_boxes)):
+                tmp_box = copy.deepcopy(dt_boxes[bno])
+                if self.args.det_box_type == "quad":
+                    img_crop = get_rotate_crop_image(img, tmp_box)
+                else:
+                    img_crop = get_minarea_rect_crop(img, tmp_box)
+                img_crop_list.append(img_crop)
+                crop_owner_list.append(img_idx)
+            dt_boxes_list.append(dt_boxes)
+        logger.debug("batch det img num : {}, dt_boxes num : {}, elapsed : {}".format(
+            len(imgs), len(img_crop_list), time.time() - start))
+
+        rec_res = []
+        if len(img_crop_list) > 0:
+            if self.use_angle_cls and cls:
+                img_crop_list, angle_list, elapse = self.text_classifier(img_crop_list)
+            rec_res, elapse = self.text_recognizer(img_crop_list)
+            logger.debug("batch rec_res num  : {}, elapsed : {}".format(len(rec_res), elapse))
+
+        ocr_res = [[] for _ in imgs]
+        box_idx_list = [0] * len(imgs)
+        for img_idx, rec_result in zip(crop_owner_list, rec_res):
+            box = dt_boxes_list[img_idx][box_idx_list[img_idx]]
+            box_idx_list[img_idx] += 1
+            text, score = rec_result
+            if score >= self.drop_score:
+                ocr_res[img_idx].append([box.tolist(), rec_result])
+        return [res if res else None for res in ocr_res]
+
     def __call__(self, img, cls=True, mfd_res=None):
         time_dict = {'det': 0, 'rec': 0, 'cls': 0, 'all': 0}
 
@@ -15,6 +15,20 @@ class StructTableModel:
         table_latex = self.model.forward(image)
         return table_latex
 
+    def image2latex_batch(self, images, batch_size=4) -> list:
+        """
+        多张表格截图批量识别, 按面积排序后分batch, 同一batch内的表格输出长度接近, 减少无效的解码步数
+        TableTaskGroup已经按面积对整篇文档的表格分组, 这里的排序只对直接调用时生效
+        return: list of latex, 与images一一对应
+        """
+        order = sorted(range(len(images)), key=lambda idx: images[idx].size[0] * images[idx].size[1])
+        table_latex_list = [None] * len(images)
+        for start in range(0, len(order), batch_size):
+            batch_idxes = order[start: start + batch_size]
+            for idx, table_latex in zip(batch_idxes, self.model.forward([images[idx] for idx in batch_idxes])):
+                table_latex_list[idx] = table_latex
+        return table_latex_list
+
     def image2html(self, image) -> str:
         table_latex = self.image2latex(image)
         table_html = convert_text(table_latex, 'html', format='latex')
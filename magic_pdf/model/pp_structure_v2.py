@@ -18,6 +18,9 @@ def region_to_bbox(region):
 
 
 class CustomPaddleModel:
+    # PPStructure不支持多图推理, doc_analyze每次只传入一页
+    page_batch_size = 1
+
     def __init__(self, ocr: bool = False, show_log: bool = False):
         self.model = PPStructure(table=False, ocr=ocr, show_log=show_log)
 
@@ -85,3 +88,9 @@ class CustomPaddleModel:
             result.extend(spans)
 
         return result
+
+    def batch_analyze(self, images, mfr_pending=None, ocr_mask=None, metrics=None, table_group=None):
+        # 不含公式识别, mfr_pending不会被填充
+        # PPStructure的ocr开关在初始化时确定, 无法按页关闭, ocr_mask被忽略
+        # PPStructure内部的各阶段无法拆分计时, metrics不会被填充
+        return [self(img) for img in images]
@@ -0,0 +1,31 @@
+"""
+CPU推理加速: 对layout和公式识别模型中的nn.Linear做torch动态int8量化
+动态量化只转换权重, 在模型初始化时完成, 耗时远小于加载fp32权重, 不做缓存, 权重始终与models-dir中的fp32权重一致
+"""
+import torch
+from loguru import logger
+
+from magic_pdf.libs.Constants import INFERENCE_BACKEND_TORCH, INFERENCE_BACKEND_TORCH_INT8
+
+
+def quantize_dynamic_int8(model: torch.nn.Module) -> torch.nn.Module:
+    """
+    原地把model中的nn.Linear替换为动态int8量化的版本, 只能在cpu上运行
+    """
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def apply_inference_backend(model: torch.nn.Module, name: str, backend: str, device: str):
+    """
+    按inference-config中的backend处理模型, 量化只在device为cpu时生效
+    """
+    if backend == INFERENCE_BACKEND_TORCH:
+        return model
+    if backend != INFERENCE_BACKEND_TORCH_INT8:
+        logger.warning(f"unknown inference backend: {backend}, use {INFERENCE_BACKEND_TORCH}")
+        return model
+    if not str(device).startswith("cpu"):
+        logger.warning(f"{INFERENCE_BACKEND_TORCH_INT8} backend only works on cpu, {name} model keeps fp32 on {device}")
+        return model
+    logger.info(f"quantize {name} model to int8")
+    return quantize_dynamic_int8(model)
@@ -0,0 +1,160 @@
+"""
+表格识别在单独的线程中执行, 与页面的其余模型并行
+每张表和整篇文档都有时间预算, 超时的表格不写入识别结果, 解析阶段按只有截图的表格处理
+表格线程在多篇文档之间共享, 超时的表格无法中断, 会继续占用线程, 因此整篇文档的预算从该文档第一个任务开始执行时计算
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from loguru import logger
+
+from magic_pdf.libs.Constants import TABLE_SORT_WINDOW_VALUE
+
+# 等待表格结果时检查超时的间隔
+POLL_INTERVAL = 0.5
+
+
+def table_image_area(image):
+    """
+    表格截图的面积, 支持PIL.Image和np.ndarray, 其它类型返回0
+    """
+    if hasattr(image, "shape"):
+        return image.shape[0] * image.shape[1]
+    if hasattr(image, "size") and isinstance(image.size, tuple):
+        return image.size[0] * image.size[1]
+    return 0
+
+
+def new_table_executor():
+    # 表格模型不支持并发推理, 只用一个线程
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="table")
+
+
+class TableTaskGroup:
+    """
+    一篇文档内提交的表格识别任务, 每batch_size张表格提交一次批量识别
+    batch_size大于1时先缓存sort_window个batch的表格, 按截图面积排序后再切分batch, 尺寸接近的表格在同一个batch中,
+    collect时剩余的表格同样排序后提交; 结果按表格写回各自的layout item, 与提交顺序无关
+    recognize_fn(images) -> list of dict, 与images一一对应,
+        识别成功时为需要写入layout item的字段, 如{"latex": ...}或{"html": ...}, 失败时为空dict
+    area_fn(image) -> 截图面积, 用于排序, 默认为table_image_area
+    clock: 计时函数, 默认为time.time
+    """
+
+    def __init__(self, executor, recognize_fn, table_max_time, doc_max_time, batch_size=1,
+                 sort_window=TABLE_SORT_WINDOW_VALUE, area_fn=table_image_area, clock=time.time):
+        self.executor = executor
+        self.recognize_fn = recognize_fn
+        self.table_max_time = table_max_time
+        self.doc_max_time = doc_max_time
+        self.batch_size = max(batch_size, 1)
+        self.sort_window = max(sort_window, 1)
+        self.area_fn = area_fn
+        self.clock = clock
+        self.created = clock()
+        # 第一个任务开始执行时设置
+        self.deadline = None
+        self.cancel_event = threading.Event()
+        self.buffer = []
+        self.tasks = []
+        self.timeout_count = 0
+
+    def _doc_deadline(self):
+        """
+        整篇文档的截止时间; 还没有任务开始执行时, 线程可能仍被之前文档超时的表格占用,
+        最多再等待一张表格的预算加整篇文档的预算
+        """
+        if self.deadline is None:
+            return self.created + self.table_max_time + self.doc_max_time
+        return self.deadline
+
+    def _run(self, images, task_state):
+        if self.deadline is None:
+            self.deadline = self.clock() + self.doc_max_time
+        # 整篇文档的预算用完后, 排队中的任务不再执行
+        if self.cancel_event.is_set() or self.clock() > self.deadline:
+            return None
+        task_state["start"] = self.clock()
+        results = self.recognize_fn(images)
+        run_time = self.clock() - task_state["start"]
+        task_state["run_time"] = run_time
+        # batch内的表格同时识别, 预算与单张表格相同
+        if run_time > self.table_max_time:
+            logger.warning(f"table recognition exceeds max time {self.table_max_time}s, result dropped")
+            return None
+        return results
+
+    def _dispatch(self, flush=False):
+        """
+        按面积排序后每batch_size张表格提交一个任务, flush为False时不足一个batch的表格留在缓存中
+        """
+        if len(self.buffer) == 0:
+            return
+        items = self.buffer
+        if self.batch_size > 1:
+            items = sorted(items, key=lambda item: self.area_fn(item[1]))
+        batch_count = len(items) // self.batch_size if not flush else -(-len(items) // self.batch_size)
+        for start in range(0, batch_count * self.batch_size, self.batch_size):
+            task_state = {}
+            batch_items = items[start: start + self.batch_size]
+            future = self.executor.submit(self._run, [image for _, image, _ in batch_items], task_state)
+            self.tasks.append((batch_items, future, task_state))
+        self.buffer = items[batch_count * self.batch_size:]
+
+    def submit(self, res, image, page_metrics=None):
+        """
+        page_metrics: 不为None时, collect会把该表格分摊的识别耗时累加到page_metrics["table_time"]
+        """
+        self.buffer.append((res, image, page_metrics))
+        if len(self.buffer) >= self.batch_size * (self.sort_window if self.batch_size > 1 else 1):
+            self._dispatch()
+
+    def _wait(self, future, task_state):
+        """
+        等待单个任务, 超过单表或整篇文档的预算时返回None
+        """
+        while True:
+            now = self.clock()
+            deadline = self._doc_deadline()
+            if "start" in task_state:
+                deadline = min(deadline, task_state["start"] + self.table_max_time)
+            if now >= deadline:
+                return None
+            try:
+                return future.result(timeout=min(deadline - now, POLL_INTERVAL))
+            except TimeoutError:
+                continue
+
+    def collect(self):
+        """
+        等待已提交的任务并写回结果, 超时的任务被放弃, 对应的表格保留为只有截图的表格
+        return: 写入了识别结果的表格数
+        """
+        self._dispatch(flush=True)
+        success_count = 0
+        for items, future, task_state in self.tasks:
+            results = self._wait(future, task_state)
+            if results is None and not future.done():
+                self.timeout_count += len(items)
+                future.cancel()
+                if self.clock() >= self._doc_deadline():
+                    # 整篇文档超时, 取消排队中的任务
+                    self.cancel_event.set()
+                    logger.warning("table recognition exceeds the time budget of the document, remaining tables skipped")
+            run_time = task_state.get("run_time", self.clock() - task_state["start"] if "start" in task_state else 0)
+            for index, (res, _, page_metrics) in enumerate(items):
+                if page_metrics is not None:
+                    page_metrics["table_time"] += run_time / len(items)
+                if results and results[index]:
+                    res.update(results[index])
+                    success_count += 1
+        self.tasks = []
+        return success_count
+
+    def close(self):
+        self.cancel_event.set()
+        for _, future, _ in self.tasks:
+            future.cancel()
+        self.buffer = []
+        self.tasks = []
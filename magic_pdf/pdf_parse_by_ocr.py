@@ -7,6 +7,7 @@ def parse_pdf_by_ocr(pdf_bytes,
                      start_page_id=0,
                      end_page_id=None,
                      debug_mode=False,
+                     workers=0,
                      ):
     return pdf_parse_union(pdf_bytes,
                            model_list,
@@ -15,4 +16,5 @@ def parse_pdf_by_ocr(pdf_bytes,
                            start_page_id=start_page_id,
                            end_page_id=end_page_id,
                            debug_mode=debug_mode,
+                           workers=workers,
                            )
@@ -8,6 +8,7 @@ def parse_pdf_by_txt(
     start_page_id=0,
     end_page_id=None,
     debug_mode=False,
+    workers=0,
 ):
     return pdf_parse_union(pdf_bytes,
                            model_list,
@@ -16,4 +17,5 @@ def parse_pdf_by_txt(
                            start_page_id=start_page_id,
                            end_page_id=end_page_id,
                            debug_mode=debug_mode,
+                           workers=workers,
                            )
@@ -1,4 +1,7 @@
+import multiprocessing
+import pickle
 import time
+from concurrent.futures import ProcessPoolExecutor
 
 from loguru import logger
 
@@ -99,7 +102,12 @@ def parse_page_core(pdf_docs, magic_model, page_id, pdf_bytes_md5, imageWriter,
         )
         spans = replace_text_span(pymu_spans, spans)
     elif parse_mode == "ocr":
-        pass
+        if magic_model.get_model_list(page_id)["page_info"].get("text_layer_valid", False):
+            """doc_analyze阶段该页文字层有效而跳过了OCR, 文本类span使用pymu spans"""
+            pymu_spans = txt_spans_extract(
+                pdf_docs[page_id], inline_equations, interline_equations
+            )
+            spans = replace_text_span(pymu_spans, spans)
     else:
         raise Exception("parse_mode must be txt or ocr")
 
@@ -190,6 +198,55 @@ def parse_page_core(pdf_docs, magic_model, page_id, pdf_bytes_md5, imageWriter,
     return page_info
 
 
+# 多进程解析时每个任务的最大页数
+PARSE_PAGES_PER_TASK = 8
+
+_parse_worker_doc = None
+_parse_worker_md5 = None
+
+
+def _parse_worker_init(pdf_bytes):
+    global _parse_worker_doc, _parse_worker_md5
+    _parse_worker_doc = fitz.open("pdf", pdf_bytes)
+    _parse_worker_md5 = compute_md5(pdf_bytes)
+
+
+def _parse_worker_run(model_pages, imageWriter, parse_mode):
+    """
+    在解析进程中解析一段页面, magic_model只包含这段页面的模型数据
+    return: list of (page_id, page_info)
+    """
+    magic_model = MagicModel(model_pages, _parse_worker_doc)
+    return [(model_page_info["page_info"]["page_no"],
+             parse_page_core(_parse_worker_doc, magic_model, model_page_info["page_info"]["page_no"],
+                             _parse_worker_md5, imageWriter, parse_mode))
+            for model_page_info in model_pages]
+
+
+def parse_pages_by_process_pool(pdf_bytes, model_list, imageWriter, parse_mode, start_page_id, end_page_id, workers,
+                                pages_per_task=PARSE_PAGES_PER_TASK):
+    """
+    多进程逐页解析, 每个进程持有自己的fitz.Document, 以页段为单位分配任务, 空闲的进程领取下一段
+    每页只依赖自己的模型数据和pdf页面, 结果按页码顺序汇总后再做跨页的分段
+    model_list不会被原地修改(进程内修改的是副本)
+    return: dict, page_{page_id} -> page_info
+    """
+    # 页数较少时缩小任务, 保证每个进程能分到多个任务
+    pages_per_task = max(min(pages_per_task, (end_page_id + 1 - start_page_id) // (workers * 4)), 1)
+    page_ranges = [(start, min(start + pages_per_task, end_page_id + 1))
+                   for start in range(start_page_id, end_page_id + 1, pages_per_task)]
+    pdf_info_dict = {}
+    # 解析进程使用spawn, 调用方(如pipeline模式)可能已启动模型线程, fork后锁和线程池状态不可靠
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_parse_worker_init, initargs=(pdf_bytes,)) as executor:
+        futures = [executor.submit(_parse_worker_run, model_list[start: end], imageWriter, parse_mode)
+                   for start, end in page_ranges]
+        for future in futures:
+            for page_id, page_info in future.result():
+                pdf_info_dict[f"page_{page_id}"] = page_info
+    return pdf_info_dict
+
+
 def pdf_parse_union(pdf_bytes,
                     model_list,
                     imageWriter,
@@ -197,23 +254,92 @@ def pdf_parse_union(pdf_bytes,
                     start_page_id=0,
                     end_page_id=None,
                     debug_mode=False,
+                    workers=0,
                     ):
+    """
+    workers: 大于1时使用多进程逐页解析, 见parse_pages_by_process_pool; imageWriter需要可以pickle,
+             否则退回单进程解析
+    """
     pdf_bytes_md5 = compute_md5(pdf_bytes)
     pdf_docs = fitz.open("pdf", pdf_bytes)
 
     '''初始化空的pdf_info_dict'''
     pdf_info_dict = {}
 
-    '''用model_list和docs对象初始化magic_model'''
-    magic_model = MagicModel(model_list, pdf_docs)
-
     '''根据输入的起始范围解析pdf'''
     end_page_id = end_page_id if end_page_id else len(pdf_docs) - 1
 
+    if workers > 1 and end_page_id > start_page_id:
+        try:
+            pickle.dumps(imageWriter)
+        except Exception as e:
+            logger.warning(f"imageWriter can not be sent to parse workers, parse in a single process: {e}")
+            workers = 0
+    if workers > 1 and end_page_id > start_page_id:
+        '''多进程解析'''
+        start_time = time.time()
+        pdf_info_dict = parse_pages_by_process_pool(pdf_bytes, model_list, imageWriter, parse_mode,
+                                                    start_page_id, end_page_id, workers)
+        if debug_mode:
+            logger.info(f"parallel parse pages: {len(pdf_info_dict)}, cost_time: {get_delta_time(start_time)}")
+    else:
+        '''用model_list和docs对象初始化magic_model'''
+        magic_model = MagicModel(model_list, pdf_docs)
+
+        '''初始化启动时间'''
+        start_time = time.time()
+
+        for page_id in range(start_page_id, end_page_id + 1):
+
+            '''debug时输出每页解析的耗时'''
+            if debug_mode:
+                time_now = time.time()
+                logger.info(
+                    f"page_id: {page_id}, last_page_cost_time: {get_delta_time(start_time)}"
+                )
+                start_time = time_now
+
+            '''解析pdf中的每一页'''
+            page_info = parse_page_core(pdf_docs, magic_model, page_id, pdf_bytes_md5, imageWriter, parse_mode)
+            pdf_info_dict[f"page_{page_id}"] = page_info
+
+    """分段"""
+    para_split(pdf_info_dict, debug_mode=debug_mode)
+
+    """dict转list"""
+    pdf_info_list = dict_to_list(pdf_info_dict)
+    new_pdf_info_dict = {
+        "pdf_info": pdf_info_list,
+    }
+
+    return new_pdf_info_dict
+
+
+def pdf_parse_union_stream(pdf_bytes,
+                           model_page_iter,
+                           imageWriter,
+                           parse_mode,
+                           debug_mode=False,
+                           ):
+    """
+    流水线模式下的解析, model_page_iter按页码顺序逐页产出模型数据, 每收到一页就解析一页,
+    与模型推理同时进行; 跨页的分段在所有页面解析完之后进行
+    """
+    pdf_bytes_md5 = compute_md5(pdf_bytes)
+    pdf_docs = fitz.open("pdf", pdf_bytes)
+
+    '''初始化空的pdf_info_dict'''
+    pdf_info_dict = {}
+
+    '''magic_model随模型数据逐页追加'''
+    magic_model = MagicModel([], pdf_docs)
+
     '''初始化启动时间'''
     start_time = time.time()
 
-    for page_id in range(start_page_id, end_page_id + 1):
+    for model_page_info in model_page_iter:
+        page_id = model_page_info["page_info"]["page_no"]
+        magic_model.append_page(model_page_info)
 
         '''debug时输出每页解析的耗时'''
         if debug_mode:
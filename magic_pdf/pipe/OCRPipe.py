@@ -15,11 +15,13 @@ class OCRPipe(AbsPipe):
     def pipe_classify(self):
         pass
 
-    def pipe_analyze(self):
-        self.model_list = doc_analyze(self.pdf_bytes, ocr=True)
+    def pipe_analyze(self, checkpoint=None):
+        # 用户显式指定ocr模式, 所有页面都做OCR
+        self.model_list = doc_analyze(self.pdf_bytes, ocr=True, hybrid_ocr=False, checkpoint=checkpoint)
 
-    def pipe_parse(self):
-        self.pdf_mid_data = parse_ocr_pdf(self.pdf_bytes, self.model_list, self.image_writer, is_debug=self.is_debug)
+    def pipe_parse(self, parse_workers=0):
+        self.pdf_mid_data = parse_ocr_pdf(self.pdf_bytes, self.model_list, self.image_writer, is_debug=self.is_debug,
+                                          parse_workers=parse_workers)
 
     def pipe_mk_uni_format(self, img_parent_path: str, drop_mode=DropMode.WHOLE_PDF):
         result = super().pipe_mk_uni_format(img_parent_path, drop_mode)
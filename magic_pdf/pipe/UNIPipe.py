@@ -8,7 +8,7 @@ from magic_pdf.rw.AbsReaderWriter import AbsReaderWriter
 from magic_pdf.rw.DiskReaderWriter import DiskReaderWriter
 from magic_pdf.libs.commons import join_path
 from magic_pdf.pipe.AbsPipe import AbsPipe
-from magic_pdf.user_api import parse_union_pdf, parse_ocr_pdf
+from magic_pdf.user_api import parse_union_pdf, parse_ocr_pdf, parse_pdf_pipelined
 
 
 class UNIPipe(AbsPipe):
@@ -24,19 +24,41 @@ class UNIPipe(AbsPipe):
     def pipe_classify(self):
         self.pdf_type = AbsPipe.classify(self.pdf_bytes)
 
-    def pipe_analyze(self):
+    def pipe_analyze(self, checkpoint=None):
+        """
+        checkpoint: AnalyzeCheckpoint, 中断后重新运行时跳过已有结果的页面
+        """
         if self.pdf_type == self.PIP_TXT:
-            self.model_list = doc_analyze(self.pdf_bytes, ocr=False)
+            self.model_list = doc_analyze(self.pdf_bytes, ocr=False, checkpoint=checkpoint)
         elif self.pdf_type == self.PIP_OCR:
-            self.model_list = doc_analyze(self.pdf_bytes, ocr=True)
+            self.model_list = doc_analyze(self.pdf_bytes, ocr=True, checkpoint=checkpoint)
 
-    def pipe_parse(self):
+    def pipe_parse(self, parse_workers=0):
         if self.pdf_type == self.PIP_TXT:
             self.pdf_mid_data = parse_union_pdf(self.pdf_bytes, self.model_list, self.image_writer,
-                                                is_debug=self.is_debug, input_model_is_empty=self.input_model_is_empty)
+                                                is_debug=self.is_debug, input_model_is_empty=self.input_model_is_empty,
+                                                parse_workers=parse_workers)
         elif self.pdf_type == self.PIP_OCR:
             self.pdf_mid_data = parse_ocr_pdf(self.pdf_bytes, self.model_list, self.image_writer,
-                                              is_debug=self.is_debug)
+                                              is_debug=self.is_debug, parse_workers=parse_workers)
+
+    def pipe_analyze_parse(self, queue_size=None, checkpoint=None):
+        """
+        流水线模式, 模型推理和逐页解析同时进行, 等价于依次调用pipe_analyze和pipe_parse
+        """
+        pipelined_kwargs = {"checkpoint": checkpoint}
+        if queue_size is not None:
+            pipelined_kwargs["queue_size"] = queue_size
+        if self.pdf_type == self.PIP_TXT:
+            try:
+                self.model_list, self.pdf_mid_data = parse_pdf_pipelined(self.pdf_bytes, self.image_writer, ocr=False,
+                                                                         is_debug=self.is_debug, **pipelined_kwargs)
+                return
+            except Exception as e:
+                logger.exception(e)
+                logger.warning("pipelined txt parse error, switch to ocr")
+        self.model_list, self.pdf_mid_data = parse_pdf_pipelined(self.pdf_bytes, self.image_writer, ocr=True,
+                                                                 is_debug=self.is_debug, **pipelined_kwargs)
 
     def pipe_mk_uni_format(self, img_parent_path: str, drop_mode=DropMode.WHOLE_PDF):
         result = super().pipe_mk_uni_format(img_parent_path, drop_mode)
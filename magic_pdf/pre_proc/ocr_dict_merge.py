@@ -1,5 +1,6 @@
 from loguru import logger
 
+from magic_pdf.libs.bbox_index import BboxGridIndex
 from magic_pdf.libs.boxbase import __is_overlaps_y_exceeds_threshold, get_minbox_if_overlap_by_ratio, \
     calculate_overlap_area_in_bbox1_area_ratio, _is_in_or_part_overlap_with_area_ratio
 from magic_pdf.libs.drop_tag import DropTag
@@ -144,7 +145,12 @@ def sort_blocks_by_layout(all_bboxes, layout_bboxes):
 def fill_spans_in_blocks(blocks, spans, radio):
     '''
     将allspans中的span按位置关系，放入blocks中
+    用网格索引只对与block相交的候选span计算重叠, 已放入block的span按下标标记删除,
+    每个block中span的顺序和剩余spans的顺序与逐个比较时相同
     '''
+    # radio小于0时不相交的span也满足条件, 无法用索引筛选候选
+    span_index = BboxGridIndex([span['bbox'] for span in spans]) if radio >= 0 else None
+    assigned_idxes = set()
     block_with_spans = []
     for block in blocks:
         block_type = block[7]
@@ -154,10 +160,17 @@ def fill_spans_in_blocks(blocks, spans, radio):
             'bbox': block_bbox,
         }
         block_spans = []
-        for span in spans:
-            span_bbox = span['bbox']
+        if span_index is not None:
+            candidate_idxes = span_index.query(block_bbox)
+        else:
+            candidate_idxes = [idx for idx in range(len(spans)) if idx not in assigned_idxes]
+        for idx in candidate_idxes:
+            span_bbox = spans[idx]['bbox']
             if calculate_overlap_area_in_bbox1_area_ratio(span_bbox, block_bbox) > radio:
-                block_spans.append(span)
+                block_spans.append(spans[idx])
+                assigned_idxes.add(idx)
+                if span_index is not None:
+                    span_index.remove(idx)
 
         '''行内公式调整, 高度调整至与同行文字高度一致(优先左侧, 其次右侧)'''
         # displayed_list = []
@@ -173,10 +186,9 @@ def fill_spans_in_blocks(blocks, spans, radio):
         block_dict['spans'] = block_spans
         block_with_spans.append(block_dict)
 
-        # 从spans删除已经放入block_spans中的span
-        if len(block_spans) > 0:
-            for span in block_spans:
-                spans.remove(span)
+    # 从spans删除已经放入block_spans中的span
+    if len(assigned_idxes) > 0:
+        spans[:] = [span for idx, span in enumerate(spans) if idx not in assigned_idxes]
 
     return block_with_spans, spans
 
@@ -1,29 +1,63 @@
+import numpy as np
 from loguru import logger
 
-from magic_pdf.libs.boxbase import calculate_overlap_area_in_bbox1_area_ratio, get_minbox_if_overlap_by_ratio, \
-    __is_overlaps_y_exceeds_threshold, calculate_iou
+from magic_pdf.libs.boxbase import calculate_overlap_area_in_bbox1_area_ratio, \
+    __is_overlaps_y_exceeds_threshold, calculate_iou_matrix, calculate_overlap_area_2_minbox_area_ratio_matrix
 from magic_pdf.libs.drop_tag import DropTag
 from magic_pdf.libs.ocr_content_type import ContentType, BlockType
 
 
+# 两两计算重叠指标时每次处理的行数, 限制中间矩阵的内存
+PAIRWISE_CHUNK_ROWS = 512
+
+
+def _bbox_key(bbox):
+    # list和tuple的bbox即使数值相同也不相等, key中区分类型
+    return isinstance(bbox, tuple), tuple(bbox)
+
+
+def _span_equal_groups(spans):
+    """
+    return: list, 每个span对应与它相等(==)的第一个span的下标
+    相等的span的bbox必然相等, 只需要在bbox相同的span之间比较
+    """
+    groups = []
+    same_bbox = {}
+    for idx, span in enumerate(spans):
+        representatives = same_bbox.setdefault(_bbox_key(span['bbox']), [])
+        group = next((first for first in representatives if spans[first] == span), idx)
+        if group == idx:
+            representatives.append(idx)
+        groups.append(group)
+    return groups
+
+
+def _iter_overlap_pairs(bboxes: np.ndarray, overlap_matrix_func, threshold: float):
+    """
+    按行分块计算两两之间的重叠指标, 按(i, j)的字典序产出指标大于threshold的下标对(包括i == j)
+    overlap_matrix_func: calculate_iou_matrix或calculate_overlap_area_2_minbox_area_ratio_matrix
+    """
+    for start in range(0, len(bboxes), PAIRWISE_CHUNK_ROWS):
+        value = overlap_matrix_func(bboxes[start: start + PAIRWISE_CHUNK_ROWS], bboxes)
+        # 除零得到的nan与threshold比较为False, 不会被选中
+        row_idx, col_idx = np.nonzero(value > threshold)
+        yield from zip((row_idx + start).tolist(), col_idx.tolist())
+
+
 def remove_overlaps_low_confidence_spans(spans):
     dropped_spans = []
-    #  删除重叠spans中置信度低的的那些
-    for span1 in spans:
-        for span2 in spans:
-            if span1 != span2:
-                # span1 或 span2 任何一个都不应该在 dropped_spans 中
-                if span1 in dropped_spans or span2 in dropped_spans:
-                    continue
-                else:
-                    if calculate_iou(span1['bbox'], span2['bbox']) > 0.9:
-                        if span1['score'] < span2['score']:
-                            span_need_remove = span1
-                        else:
-                            span_need_remove = span2
-                        if span_need_remove is not None and span_need_remove not in dropped_spans:
-                            dropped_spans.append(span_need_remove)
-
+    #  删除重叠spans中置信度低的的那些, 只遍历iou > 0.9的span对, 遍历顺序与两两循环相同
+    if len(spans) > 1:
+        groups = _span_equal_groups(spans)
+        dropped_groups = set()
+        bboxes = np.array([span['bbox'][:4] for span in spans], dtype=np.float64)
+        for i, j in _iter_overlap_pairs(bboxes, calculate_iou_matrix, 0.9):
+            # 相等的span之间不比较, span1 或 span2 任何一个都不应该在 dropped_spans 中
+            if groups[i] == groups[j] or groups[i] in dropped_groups or groups[j] in dropped_groups:
+                continue
+            span_need_remove = i if spans[i]['score'] < spans[j]['score'] else j
+            dropped_groups.add(groups[span_need_remove])
+            dropped_spans.append(spans[span_need_remove])
     if len(dropped_spans) > 0:
         for span_need_remove in dropped_spans:
             spans.remove(span_need_remove)
@@ -34,16 +68,24 @@ def remove_overlaps_low_confidence_spans(spans):
 
 def remove_overlaps_min_spans(spans):
     dropped_spans = []
-    #  删除重叠spans中较小的那些
-    for span1 in spans:
-        for span2 in spans:
-            if span1 != span2:
-                overlap_box = get_minbox_if_overlap_by_ratio(span1['bbox'], span2['bbox'], 0.65)
-                if overlap_box is not None:
-                    span_need_remove = next((span for span in spans if span['bbox'] == overlap_box), None)
-                    if span_need_remove is not None and span_need_remove not in dropped_spans:
-                        dropped_spans.append(span_need_remove)
-
+    #  删除重叠spans中较小的那些, 只遍历重叠面积占较小框的比例 > 0.65的span对
+    if len(spans) > 1:
+        groups = _span_equal_groups(spans)
+        dropped_groups = set()
+        # 较小的bbox对应的span取bbox相同的第一个span
+        first_by_bbox = {}
+        for idx, span in enumerate(spans):
+            first_by_bbox.setdefault(_bbox_key(span['bbox']), idx)
+        bboxes = np.array([span['bbox'][:4] for span in spans], dtype=np.float64)
+        areas = (bboxes[:, 2] - bboxes[:, 0]) * (bboxes[:, 3] - bboxes[:, 1])
+        for i, j in _iter_overlap_pairs(bboxes, calculate_overlap_area_2_minbox_area_ratio_matrix, 0.65):
+            if groups[i] == groups[j]:
+                continue
+            min_box_idx = i if areas[i] <= areas[j] else j
+            span_need_remove = first_by_bbox[_bbox_key(spans[min_box_idx]['bbox'])]
+            if groups[span_need_remove] not in dropped_groups:
+                dropped_groups.add(groups[span_need_remove])
+                dropped_spans.append(spans[span_need_remove])
     if len(dropped_spans) > 0:
         for span_need_remove in dropped_spans:
             spans.remove(span_need_remove)
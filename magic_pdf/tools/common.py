@@ -1,9 +1,12 @@
 import os
 import json as json_parse
 import copy
+import shutil
 import click
 from loguru import logger
 from magic_pdf.libs.MakeContentConfig import DropMode, MakeMode
+from magic_pdf.libs.config_reader import get_pipeline_config, get_checkpoint_config, get_parse_config
+from magic_pdf.model.checkpoint import AnalyzeCheckpoint
 from magic_pdf.libs.draw_bbox import draw_layout_bbox, draw_span_bbox, drow_model_bbox
 from magic_pdf.pipe.UNIPipe import UNIPipe
 from magic_pdf.pipe.OCRPipe import OCRPipe
@@ -60,15 +63,36 @@ def do_parse(
 
     pipe.pipe_classify()
 
+    # 模型推理完成后逐页解析使用的进程数, 传入model_list时同样生效
+    try:
+        parse_workers = int(get_parse_config().get("workers", 0))
+    except FileNotFoundError:
+        # 传入model_list时不要求存在magic-pdf.json, 缺省为串行解析
+        parse_workers = 0
     if len(model_list) == 0:
         if model_config.__use_inside_model__:
-            pipe.pipe_analyze()
-            orig_model_list = copy.deepcopy(pipe.model_list)
+            # 每页的模型结果写入输出目录下的checkpoint目录, 中断后重新运行时从断点继续
+            checkpoint_dir = os.path.join(local_md_dir, "checkpoint")
+            checkpoint = None
+            if get_checkpoint_config().get("enable", False):
+                checkpoint = AnalyzeCheckpoint(md_writer, "checkpoint")
+            pipeline_config = get_pipeline_config()
+            if parse_method == "auto" and pipeline_config.get("enable", False):
+                # 流水线模式, 推理和解析同时进行
+                pipe.pipe_analyze_parse(queue_size=pipeline_config.get("queue_size"), checkpoint=checkpoint)
+                orig_model_list = copy.deepcopy(pipe.model_list)
+            else:
+                pipe.pipe_analyze(checkpoint=checkpoint)
+                orig_model_list = copy.deepcopy(pipe.model_list)
+                pipe.pipe_parse(parse_workers=parse_workers)
+            if checkpoint is not None:
+                # 模型结果已完整, 不再需要checkpoint
+                shutil.rmtree(checkpoint_dir, ignore_errors=True)
         else:
             logger.error("need model list input")
             exit(2)
-
-    pipe.pipe_parse()
+    else:
+        pipe.pipe_parse(parse_workers=parse_workers)
     pdf_info = pipe.pdf_mid_data["pdf_info"]
     if f_draw_layout_bbox:
         draw_layout_bbox(pdf_info, pdf_bytes, local_md_dir)
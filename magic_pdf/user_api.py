@@ -11,24 +11,30 @@
 其余部分至于构造s3cli, 获取ak,sk都在code-clean里写代码完成。不要反向依赖！！！
 
 """
+import copy
+import queue
 import re
+import threading
 
 from loguru import logger
 
+from magic_pdf.libs.Constants import PIPELINE_QUEUE_SIZE_VALUE
 from magic_pdf.libs.version import __version__
 from magic_pdf.model.doc_analyze_by_custom_model import doc_analyze
 from magic_pdf.rw import AbsReaderWriter
 from magic_pdf.pdf_parse_by_ocr import parse_pdf_by_ocr
 from magic_pdf.pdf_parse_by_txt import parse_pdf_by_txt
+from magic_pdf.pdf_parse_union_core import pdf_parse_union_stream
 
 PARSE_TYPE_TXT = "txt"
 PARSE_TYPE_OCR = "ocr"
 
 
-def parse_txt_pdf(pdf_bytes: bytes, pdf_models: list, imageWriter: AbsReaderWriter, is_debug=False, start_page=0, *args,
-                  **kwargs):
+def parse_txt_pdf(pdf_bytes: bytes, pdf_models: list, imageWriter: AbsReaderWriter, is_debug=False, start_page=0,
+                  parse_workers=0, *args, **kwargs):
     """
     解析文本类pdf
+    parse_workers: 大于1时多进程逐页解析
     """
     pdf_info_dict = parse_pdf_by_txt(
         pdf_bytes,
@@ -36,6 +42,7 @@ def parse_txt_pdf(pdf_bytes: bytes, pdf_models: list, imageWriter: AbsReaderWrit
         imageWriter,
         start_page_id=start_page,
         debug_mode=is_debug,
+        workers=parse_workers,
     )
 
     pdf_info_dict["_parse_type"] = PARSE_TYPE_TXT
@@ -45,10 +52,11 @@ def parse_txt_pdf(pdf_bytes: bytes, pdf_models: list, imageWriter: AbsReaderWrit
     return pdf_info_dict
 
 
-def parse_ocr_pdf(pdf_bytes: bytes, pdf_models: list, imageWriter: AbsReaderWriter, is_debug=False, start_page=0, *args,
-                  **kwargs):
+def parse_ocr_pdf(pdf_bytes: bytes, pdf_models: list, imageWriter: AbsReaderWriter, is_debug=False, start_page=0,
+                  parse_workers=0, *args, **kwargs):
     """
     解析ocr类pdf
+    parse_workers: 大于1时多进程逐页解析
     """
     pdf_info_dict = parse_pdf_by_ocr(
         pdf_bytes,
@@ -56,6 +64,7 @@ def parse_ocr_pdf(pdf_bytes: bytes, pdf_models: list, imageWriter: AbsReaderWrit
         imageWriter,
         start_page_id=start_page,
         debug_mode=is_debug,
+        workers=parse_workers,
     )
 
     pdf_info_dict["_parse_type"] = PARSE_TYPE_OCR
@@ -66,10 +75,11 @@ def parse_ocr_pdf(pdf_bytes: bytes, pdf_models: list, imageWriter: AbsReaderWrit
 
 
 def parse_union_pdf(pdf_bytes: bytes, pdf_models: list, imageWriter: AbsReaderWriter, is_debug=False, start_page=0,
-                    input_model_is_empty: bool = False,
+                    input_model_is_empty: bool = False, parse_workers=0,
                     *args, **kwargs):
     """
     ocr和文本混合的pdf，全部解析出来
+    parse_workers: 大于1时多进程逐页解析
     """
 
     def parse_pdf(method):
@@ -80,6 +90,7 @@ def parse_union_pdf(pdf_bytes: bytes, pdf_models: list, imageWriter: AbsReaderWr
                 imageWriter,
                 start_page_id=start_page,
                 debug_mode=is_debug,
+                workers=parse_workers,
             )
         except Exception as e:
             logger.exception(e)
@@ -101,3 +112,64 @@ def parse_union_pdf(pdf_bytes: bytes, pdf_models: list, imageWriter: AbsReaderWr
     pdf_info_dict["_version_name"] = __version__
 
     return pdf_info_dict
+
+
+def parse_pdf_pipelined(pdf_bytes: bytes, imageWriter: AbsReaderWriter, ocr: bool, is_debug=False,
+                        queue_size=PIPELINE_QUEUE_SIZE_VALUE, checkpoint=None, *args, **kwargs):
+    """
+    流水线模式: 渲染、模型推理和逐页解析分别在各自的线程中进行, 页面之间通过有界队列传递,
+    跨页的分段在最后进行. 等价于先doc_analyze再parse_ocr_pdf/parse_txt_pdf, 不会fallback
+    checkpoint: 传给doc_analyze的AnalyzeCheckpoint, 已有结果的页面直接送去解析
+    return: (model_list, pdf_info_dict), model_list为未被解析过程修改的模型数据
+    """
+    page_queue = queue.Queue(maxsize=max(queue_size, 1))
+    stop_event = threading.Event()
+    end_flag = object()
+    analyze_result = {}
+
+    def put(item):
+        while not stop_event.is_set():
+            try:
+                page_queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+        # 解析线程已退出, 终止模型推理
+        raise InterruptedError("pipelined parse stopped")
+
+    def analyze_worker():
+        try:
+            # 解析会原地修改模型数据, 送给解析的是副本
+            analyze_result["model_list"] = doc_analyze(pdf_bytes, ocr=ocr,
+                                                       page_callback=lambda page_dict: put(copy.deepcopy(page_dict)),
+                                                       checkpoint=checkpoint)
+        except InterruptedError:
+            return
+        except Exception as e:
+            put(e)
+            return
+        put(end_flag)
+
+    def iter_model_pages():
+        while True:
+            item = page_queue.get()
+            if item is end_flag:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    worker = threading.Thread(target=analyze_worker, daemon=True)
+    worker.start()
+    try:
+        pdf_info_dict = pdf_parse_union_stream(pdf_bytes, iter_model_pages(), imageWriter,
+                                               PARSE_TYPE_OCR if ocr else PARSE_TYPE_TXT, debug_mode=is_debug)
+    finally:
+        stop_event.set()
+        worker.join()
+
+    pdf_info_dict["_parse_type"] = PARSE_TYPE_OCR if ocr else PARSE_TYPE_TXT
+
+    pdf_info_dict["_version_name"] = __version__
+
+    return analyze_result["model_list"], pdf_info_dict
@@ -0,0 +1,29 @@
+import fitz
+
+from magic_pdf.model.doc_analyze_by_custom_model import get_adaptive_dpi, render_page_to_image
+
+
+def _new_page(width, height, font_size):
+    doc = fitz.open()
+    page = doc.new_page(width=width, height=height)
+    page.insert_text((50, 100), "adaptive rendering resolution " * 2, fontsize=font_size)
+    return doc, page
+
+
+def test_adaptive_dpi_keeps_a4():
+    doc, page = _new_page(595, 842, 10)
+    assert get_adaptive_dpi(page, 200) == 200
+    assert render_page_to_image(page, 200, adaptive_dpi=True)["width"] == render_page_to_image(page, 200)["width"]
+
+
+def test_adaptive_dpi_large_format():
+    # A0幅面按像素预算降低分辨率, 像素数只因取整略有出入
+    doc, page = _new_page(2384, 3370, 10)
+    img_dict = render_page_to_image(page, 200, adaptive_dpi=True)
+    assert img_dict["width"] * img_dict["height"] <= 4500000 * 1.01
+
+
+def test_adaptive_dpi_large_font():
+    # 大字号页面按字号降低分辨率, 但不低于最小dpi
+    doc, page = _new_page(595, 842, 36)
+    assert get_adaptive_dpi(page, 200) == 100
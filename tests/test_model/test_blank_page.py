@@ -0,0 +1,44 @@
+import os
+
+import fitz
+import numpy as np
+
+from magic_pdf.model.doc_analyze_by_custom_model import is_blank_page, is_empty_pdf_page, render_page_to_image
+
+paper_pdf_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "paper", "paper.pdf")
+
+
+def test_blank_page():
+    doc = fitz.open()
+    page = doc.new_page()
+    img = render_page_to_image(page)["img"]
+    assert is_blank_page(img)
+
+    # 扫描件背面: 偏灰的底色加轻微噪点
+    rng = np.random.default_rng(0)
+    scanned = np.clip(img.astype(int) - 40 + rng.normal(0, 8, img.shape), 0, 255).astype(np.uint8)
+    assert is_blank_page(scanned)
+
+    # 只有一行短文字的页面不是空白页
+    page.insert_text((50, 100), "Section 3", fontsize=12)
+    assert not is_blank_page(render_page_to_image(page)["img"])
+
+
+def test_content_page_is_not_blank():
+    with fitz.open(paper_pdf_path) as doc:
+        assert not is_blank_page(render_page_to_image(doc[0])["img"])
+
+
+def test_pale_content_is_not_empty_pdf_page():
+    doc = fitz.open()
+    page = doc.new_page()
+    assert is_empty_pdf_page(page)
+
+    # 浅色文字渲染后接近空白, 但pdf页面中有文字
+    page.insert_text((50, 100), "pale footnote", fontsize=8, color=(0.95, 0.95, 0.95))
+    assert is_blank_page(render_page_to_image(page)["img"])
+    assert not is_empty_pdf_page(page)
+
+    page = doc.new_page()
+    page.draw_line((50, 50), (60, 50), color=(0.9, 0.9, 0.9))
+    assert not is_empty_pdf_page(page)
@@ -0,0 +1,57 @@
+import os
+
+import fitz
+
+from magic_pdf.model.checkpoint import AnalyzeCheckpoint
+from magic_pdf.model.doc_analyze_by_custom_model import iter_images_from_pdf
+from magic_pdf.rw.DiskReaderWriter import DiskReaderWriter
+
+signature = {"version": "test", "ocr": False}
+
+
+def _page_dict(page_no):
+    return {"layout_dets": [{"category_id": 1, "poly": [0, 0, 1, 0, 1, 1, 0, 1], "score": 0.9}],
+            "page_info": {"page_no": page_no, "height": 100, "width": 80}}
+
+
+def test_resume_pages(tmp_path):
+    writer = DiskReaderWriter(str(tmp_path))
+    checkpoint = AnalyzeCheckpoint(writer)
+    checkpoint.bind(b"pdf", signature)
+    assert checkpoint.load() == []
+    for page_no in range(3):
+        checkpoint.save(_page_dict(page_no))
+
+    resumed = AnalyzeCheckpoint(writer)
+    resumed.bind(b"pdf", signature)
+    assert resumed.load() == [_page_dict(page_no) for page_no in range(3)]
+
+    # pdf或配置不同时不会读到旧的结果
+    other = AnalyzeCheckpoint(writer)
+    other.bind(b"other pdf", signature)
+    assert other.load() == []
+    other.bind(b"pdf", dict(signature, ocr=True))
+    assert other.load() == []
+
+
+def test_incomplete_page_stops_resume(tmp_path):
+    checkpoint = AnalyzeCheckpoint(DiskReaderWriter(str(tmp_path)))
+    checkpoint.bind(b"pdf", signature)
+    for page_no in range(3):
+        checkpoint.save(_page_dict(page_no))
+    # 写入第1页时进程被中断
+    page_path = os.path.join(str(tmp_path), checkpoint.key_dir, "page_00001.json")
+    with open(page_path, "r+") as f:
+        f.truncate(10)
+    assert checkpoint.load() == [_page_dict(0)]
+
+
+def test_render_from_start_page():
+    doc = fitz.open()
+    for width in [100, 200, 300]:
+        doc.new_page(width=width, height=400)
+    pdf_bytes = doc.tobytes()
+    widths = [img_dict["width"] for img_dict in iter_images_from_pdf(pdf_bytes, dpi=72, start_page=1)]
+    assert widths == [200, 300]
+    widths = [img_dict["width"] for img_dict in iter_images_from_pdf(pdf_bytes, dpi=72, workers=2, start_page=2)]
+    assert widths == [300]
@@ -0,0 +1,35 @@
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from magic_pdf.model.formula_cache import FormulaLatexCache, make_crop_key, new_formula_cache
+
+
+def _crop(text_color, size=(40, 20), dot=(5, 5)):
+    image = Image.new("RGB", size, (255, 255, 255))
+    image.putpixel(dot, text_color)
+    return image
+
+
+def test_crop_key():
+    assert make_crop_key(_crop((0, 0, 0))) == make_crop_key(_crop((0, 0, 0)))
+    assert make_crop_key(_crop((0, 0, 0))) != make_crop_key(_crop((0, 0, 0), dot=(6, 5)))
+    # 像素相同但尺寸不同的截图不是同一个公式
+    assert make_crop_key(Image.new("L", (20, 40), 255)) != make_crop_key(Image.new("L", (40, 20), 255))
+
+
+def test_lru_eviction():
+    cache = FormulaLatexCache(2)
+    cache.put("a", "x")
+    cache.put("b", "y")
+    assert cache.get("a") == "x"
+    cache.put("c", "z")
+    # b最久未使用, 被淘汰
+    assert cache.get("b") is None
+    assert cache.get("a") == "x"
+    assert cache.get("c") == "z"
+    assert cache.stats() == {"entries": 2, "hits": 3, "misses": 1}
+
+
+def test_cache_disabled():
+    assert new_formula_cache(0) is None
@@ -0,0 +1,59 @@
+import fitz
+import pytest
+
+from magic_pdf.model.magic_model import MagicModel
+
+
+def _det(name, category_id, bbox=None, poly=None, score=0.9):
+    layout_det = {"category_id": category_id, "score": score, "name": name}
+    if bbox is not None:
+        layout_det["bbox"] = bbox
+    else:
+        layout_det["poly"] = poly
+    return layout_det
+
+
+def _fix(layout_dets):
+    # 模型结果的页面尺寸是pdf页面的2倍, 坐标缩放后取整
+    model_list = [{"page_info": {"page_no": 0, "width": 400, "height": 600}, "layout_dets": layout_dets}]
+    with fitz.open() as docs:
+        docs.new_page(width=200, height=300)
+        MagicModel(model_list, docs)
+    return [(layout_det["name"], layout_det["bbox"]) for layout_det in model_list[0]["layout_dets"]]
+
+
+def test_poly_and_bbox_are_scaled():
+    assert _fix([_det("poly", 1, poly=[21, 41, 101, 41, 101, 81, 21, 81]),
+                 _det("bbox", 1, bbox=[200, 200, 260, 250])]) == [("poly", [10, 20, 50, 40]),
+                                                                   ("bbox", [100, 100, 130, 125])]
+
+
+# 宽或高为0(含缩放取整后为0)的数据被删除
+@pytest.mark.parametrize("bbox", [[20, 20, 20, 60], [20, 60, 80, 60], [20, 60, 80, 40], [20, 20, 21, 60]])
+def test_zero_area_is_removed(bbox):
+    assert _fix([_det("zero_area", 1, bbox=bbox), _det("kept", 1, bbox=[200, 200, 260, 250])]) == \
+        [("kept", [100, 100, 130, 125])]
+
+
+def test_low_confidence_is_removed():
+    assert [name for name, _ in _fix([_det("low", 1, bbox=[0, 0, 40, 40], score=0.05),
+                                      _det("kept", 1, bbox=[100, 100, 140, 140], score=0.06)])] == ["kept"]
+
+
+@pytest.mark.parametrize("layout_dets, kept", [
+    # iou > 0.9 时删除置信度较低的一个
+    ([_det("high", 1, bbox=[0, 0, 200, 200], score=0.9), _det("low", 2, bbox=[2, 0, 200, 200], score=0.5)], ["high"]),
+    # 置信度相同时两两比较各删除一次, 两个都被删除
+    ([_det("a", 1, bbox=[0, 0, 200, 200], score=0.8), _det("b", 1, bbox=[2, 0, 200, 200], score=0.8)], []),
+    # 完全相同的数据互不比较
+    ([_det("dup", 1, bbox=[0, 0, 200, 200]), _det("dup", 1, bbox=[0, 0, 200, 200])], ["dup", "dup"]),
+    # category_id不小于10(公式/ocr结果)不参与
+    ([_det("formula", 13, bbox=[0, 0, 200, 200], score=0.9), _det("ocr", 15, bbox=[2, 0, 200, 200], score=0.5)],
+     ["formula", "ocr"]),
+    # iou不超过0.9时都保留
+    ([_det("left", 1, bbox=[0, 0, 200, 200], score=0.9), _det("right", 1, bbox=[40, 0, 240, 200], score=0.5)],
+     ["left", "right"]),
+    ([], []),
+])
+def test_high_iou_low_confidence_is_removed(layout_dets, kept):
+    assert [name for name, _ in _fix(layout_dets)] == kept
@@ -0,0 +1,74 @@
+import fitz
+import pytest
+
+from magic_pdf.model.magic_model import MagicModel
+
+FIGURE, FIGURE_CAPTION, TABLE, TABLE_CAPTION, TABLE_FOOTNOTE = 3, 4, 5, 6, 7
+
+
+def _det(category_id, bbox):
+    return {"category_id": category_id, "bbox": bbox, "score": 0.9}
+
+
+def _magic_model(layout_dets, docs):
+    # 模型结果与pdf页面尺寸相同, 坐标不缩放
+    return MagicModel([{"page_info": {"page_no": 0, "width": 600, "height": 800}, "layout_dets": layout_dets}], docs)
+
+
+@pytest.fixture
+def docs():
+    with fitz.open() as docs:
+        docs.new_page(width=600, height=800)
+        yield docs
+
+
+# (img_body_bbox, img_caption_bbox)
+@pytest.mark.parametrize("layout_dets, imgs", [
+    ([_det(FIGURE, [100, 100, 300, 250]), _det(FIGURE_CAPTION, [110, 260, 290, 280])],
+     [([100, 100, 300, 250], [110, 260, 290, 280])]),
+    ([_det(FIGURE, [100, 100, 300, 250])], [([100, 100, 300, 250], None)]),
+    ([], []),
+    # 没有图片时标题不输出
+    ([_det(FIGURE_CAPTION, [100, 210, 300, 230])], []),
+    # 与两个图片距离相同的标题归属于先处理的(左上角离原点较近的)图片
+    ([_det(FIGURE, [100, 300, 300, 400]), _det(FIGURE, [100, 100, 300, 200]), _det(FIGURE_CAPTION, [100, 240, 300, 260])],
+     [([100, 100, 300, 200], [100, 240, 300, 260]), ([100, 300, 300, 400], None)]),
+    # 上下两个距离相同的标题取先出现的一个
+    ([_det(FIGURE, [100, 100, 300, 200]), _det(FIGURE_CAPTION, [100, 70, 300, 90]),
+      _det(FIGURE_CAPTION, [100, 210, 300, 230])], [([100, 100, 300, 200], [100, 70, 300, 90])]),
+    ([_det(FIGURE, [100, 100, 300, 200]), _det(FIGURE_CAPTION, [100, 210, 300, 230]),
+      _det(FIGURE_CAPTION, [100, 70, 300, 90])], [([100, 100, 300, 200], [100, 210, 300, 230])]),
+    # 相邻的多行标题合并
+    ([_det(FIGURE, [100, 100, 300, 200]), _det(FIGURE_CAPTION, [100, 205, 300, 220]),
+      _det(FIGURE_CAPTION, [100, 222, 300, 237])], [([100, 100, 300, 200], [100, 205, 300, 237])]),
+    # 面积为0的标题和斜对角的标题不关联
+    ([_det(FIGURE, [100, 100, 300, 200]), _det(FIGURE_CAPTION, [100, 210, 300, 210])],
+     [([100, 100, 300, 200], None)]),
+    ([_det(FIGURE, [100, 100, 300, 200]), _det(FIGURE_CAPTION, [310, 210, 400, 230])],
+     [([100, 100, 300, 200], None)]),
+    # 被包含的图片先被去掉
+    ([_det(FIGURE, [100, 100, 300, 300]), _det(FIGURE, [150, 150, 200, 200]), _det(FIGURE_CAPTION, [100, 310, 300, 330])],
+     [([100, 100, 300, 300], [100, 310, 300, 330])]),
+])
+def test_get_imgs(docs, layout_dets, imgs):
+    result = _magic_model(layout_dets, docs).get_imgs(0)
+    assert [(img["img_body_bbox"], img["img_caption_bbox"]) for img in result] == imgs
+    for img, (body_bbox, caption_bbox) in zip(result, imgs):
+        bboxes = [body_bbox] + ([caption_bbox] if caption_bbox else [])
+        assert img["bbox"] == [min(b[0] for b in bboxes), min(b[1] for b in bboxes),
+                               max(b[2] for b in bboxes), max(b[3] for b in bboxes)]
+
+
+def test_get_tables(docs):
+    magic_model = _magic_model([_det(TABLE, [100, 100, 400, 300]), _det(TABLE_CAPTION, [100, 70, 400, 90]),
+                                _det(TABLE_FOOTNOTE, [100, 310, 400, 330]), _det(TABLE, [100, 500, 400, 600])], docs)
+    assert magic_model.get_tables(0) == [
+        {"score": 0.9, "table_caption_bbox": [100, 70, 400, 90], "table_body_bbox": [100, 100, 400, 300],
+         "table_footnote_bbox": [100, 310, 400, 330], "bbox": [100, 70, 400, 330]},
+        {"score": 0.9, "table_caption_bbox": None, "table_body_bbox": [100, 500, 400, 600],
+         "table_footnote_bbox": None, "bbox": [100, 500, 400, 600]},
+    ]
+
+
+def test_empty_page_has_no_tables(docs):
+    assert _magic_model([_det(TABLE_CAPTION, [100, 70, 400, 90])], docs).get_tables(0) == []
@@ -0,0 +1,37 @@
+from magic_pdf.model.model_metrics import new_page_metrics, summarize_doc_metrics
+
+
+def test_summarize_doc_metrics():
+    page_metrics_list = []
+    for page_no, (analyze_time, ocr_lines) in enumerate([(0.5, 10), (2.0, 30), (0.0, 0)]):
+        page_metrics = new_page_metrics()
+        page_metrics.update(page_no=page_no, analyze_time=analyze_time, ocr_lines=ocr_lines, mfr_time=0.1,
+                            cache_hit=analyze_time == 0.0)
+        if analyze_time > 0:
+            page_metrics.update(batch_no=page_no, batch_pages=1, batch_time=analyze_time)
+        page_metrics_list.append(page_metrics)
+
+    summary = summarize_doc_metrics(page_metrics_list, doc_time=3.0, mfr_time=1.0, top_n=2)
+    assert summary["pages"] == 3
+    assert summary["ocr_lines"] == 40
+    # 单页公式识别耗时与整篇文档统一识别的耗时合并
+    assert summary["mfr_time"] == 1.3
+    assert summary["cache_hits"] == 1
+    assert [batch["page_nos"] for batch in summary["slowest_batches"]] == [[1], [0]]
+
+
+def test_slowest_batches_report_whole_batch():
+    page_metrics_list = []
+    # batch 0有3页, 平均耗时最短但总耗时最长; 缓存命中的页没有batch
+    for page_no, (batch_no, batch_time, batch_pages) in enumerate([(0, 3.0, 3)] * 3 + [(1, 2.0, 1), (None, 0, 0)]):
+        page_metrics = new_page_metrics()
+        page_metrics.update(page_no=page_no)
+        if batch_no is not None:
+            page_metrics.update(analyze_time=batch_time / batch_pages, batch_no=batch_no, batch_pages=batch_pages,
+                                batch_time=batch_time)
+        page_metrics_list.append(page_metrics)
+
+    summary = summarize_doc_metrics(page_metrics_list, doc_time=5.0)
+    assert summary["analyze_time"] == 5.0
+    assert summary["slowest_batches"] == [{"batch_no": 0, "page_nos": [0, 1, 2], "batch_time": 3.0},
+                                          {"batch_no": 1, "page_nos": [3], "batch_time": 2.0}]
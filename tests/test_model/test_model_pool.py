@@ -0,0 +1,115 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from magic_pdf.model.model_metrics import new_page_metrics
+from magic_pdf.model.model_pool import ModelPool, new_model_pool
+
+
+class FakeModel:
+    """
+    每页返回一个记录页面编号、进程号和ocr开关的layout item, 像素值为1的页面推理较慢
+    """
+
+    def __init__(self, ocr):
+        self.ocr = ocr
+
+    def derive(self, ocr, show_log=False):
+        return FakeModel(ocr)
+
+    def batch_analyze(self, images, mfr_pending=None, ocr_mask=None, metrics=None, table_group=None):
+        result = []
+        for image, apply_ocr in zip(images, ocr_mask):
+            if image[0, 0, 0] == 1:
+                time.sleep(3)
+            result.append([{"page": int(image[0, 1, 0]), "pid": os.getpid(), "ocr": self.ocr and apply_ocr,
+                            "threads": os.environ.get("OMP_NUM_THREADS")}])
+            mfr_pending.append(({"latex": ""}, None))
+            metrics.append(new_page_metrics())
+        return result
+
+    def batch_formula_recognition(self, mfr_pending):
+        for item, _ in mfr_pending:
+            item["latex"] = "x"
+
+
+def _fake_model_init(ocr, show_log):
+    if os.environ.get("FAKE_MODEL_FAIL"):
+        raise ValueError("fake model failed")
+    return FakeModel(ocr)
+
+
+def _page(index, slow=False):
+    image = np.zeros((4, 4, 3), dtype=np.uint8)
+    image[0, 0] = 1 if slow else 0
+    image[0, 1] = index
+    return image
+
+
+def test_results_keep_page_order():
+    pool = ModelPool(2, threads_per_worker=3, task_pages=2, ocr=True, model_init=_fake_model_init)
+    try:
+        metrics = []
+        result = pool.batch_analyze([_page(index) for index in range(7)], ocr_mask=[True, False] * 3 + [True],
+                                    metrics=metrics)
+        assert [layout_res[0]["page"] for layout_res in result] == list(range(7))
+        assert [layout_res[0]["ocr"] for layout_res in result] == [True, False] * 3 + [True]
+        assert all(layout_res[0]["threads"] == "3" for layout_res in result)
+        assert len(metrics) == 7
+
+        # derive出的实例共享模型进程
+        result = pool.derive(ocr=False).batch_analyze([_page(0)])
+        assert result[0][0]["ocr"] is False
+    finally:
+        pool.close()
+
+
+def test_idle_worker_steals_remaining_pages():
+    pool = ModelPool(2, threads_per_worker=1, model_init=_fake_model_init)
+    try:
+        result = pool.batch_analyze([_page(0, slow=True)] + [_page(index) for index in range(1, 6)])
+        pids = [layout_res[0]["pid"] for layout_res in result]
+        # 慢页面占住一个进程, 其余页面都由另一个进程处理, 而不是按进程数静态切分
+        assert all(pid != pids[0] for pid in pids[2:])
+    finally:
+        pool.close()
+
+
+def test_task_error_raises(monkeypatch):
+    monkeypatch.setenv("FAKE_MODEL_FAIL", "1")
+    pool = ModelPool(2, threads_per_worker=1, model_init=_fake_model_init)
+    with pytest.raises(RuntimeError, match="fake model failed"):
+        pool.batch_analyze([_page(0)])
+    with pytest.raises(RuntimeError, match="closed"):
+        pool.batch_analyze([_page(0)])
+
+
+def test_single_worker_config_disables_pool():
+    assert new_model_pool(False, False, {"workers": 1}) is None
+
+
+def test_closed_pool_is_recreated(monkeypatch):
+    from magic_pdf.model import doc_analyze_by_custom_model
+
+    monkeypatch.setattr(doc_analyze_by_custom_model.ModelSingleton, "_models", {})
+    monkeypatch.setattr(doc_analyze_by_custom_model, "model_pool_init",
+                        lambda ocr, show_log: ModelPool(2, threads_per_worker=1, ocr=ocr, model_init=_fake_model_init))
+    singleton = doc_analyze_by_custom_model.ModelSingleton()
+    # 模型进程启动时继承环境变量, 第一个进程池的任务都会失败
+    monkeypatch.setenv("FAKE_MODEL_FAIL", "1")
+    pool = singleton.get_model(True, False)
+    derived = singleton.get_model(False, False)
+    try:
+        with pytest.raises(RuntimeError, match="fake model failed"):
+            pool.batch_analyze([_page(0)])
+        assert pool.closed and derived.closed
+
+        monkeypatch.delenv("FAKE_MODEL_FAIL")
+        new_pool = singleton.get_model(False, False)
+        assert new_pool is not derived and not new_pool.closed
+        assert new_pool.batch_analyze([_page(3)])[0][0]["page"] == 3
+    finally:
+        for model in doc_analyze_by_custom_model.ModelSingleton._models.values():
+            model.close()
@@ -0,0 +1,46 @@
+import os
+
+import numpy as np
+
+from magic_pdf.model.page_cache import PageResultCache
+
+
+def _page(value):
+    return np.full((32, 24, 3), value, dtype=np.uint8)
+
+
+def test_page_cache_hit_and_miss(tmp_path):
+    cache = PageResultCache(str(tmp_path))
+    signature = {"version": "test", "ocr": True}
+    key = PageResultCache.make_key(_page(1), signature)
+    layout_dets = [{"category_id": 1, "poly": [0, 0, 10, 0, 10, 10, 0, 10], "score": 0.9}]
+
+    assert cache.get(key) is None
+    cache.put(key, layout_dets)
+    assert cache.get(key) == layout_dets
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+    # 图片或签名不同, key都不同
+    assert PageResultCache.make_key(_page(2), signature) != key
+    assert PageResultCache.make_key(_page(1), {"version": "test", "ocr": False}) != key
+
+    # 重新打开同一目录时恢复已有的缓存
+    assert PageResultCache(str(tmp_path)).get(key) == layout_dets
+
+
+def test_page_cache_lru_eviction(tmp_path):
+    layout_dets = [{"category_id": 1, "score": 0.5, "text": "x" * 400}]
+    cache = PageResultCache(str(tmp_path), max_size_mb=1000 / 1024 / 1024)
+    keys = [PageResultCache.make_key(_page(value), {}) for value in range(3)]
+    cache.put(keys[0], layout_dets)
+    cache.put(keys[1], layout_dets)
+    # 访问keys[0]后, keys[1]成为最久未使用的页面
+    assert cache.get(keys[0]) is not None
+    cache.put(keys[2], layout_dets)
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[2]) is not None
+    assert cache.stats()["size"] <= 1000
+    assert not os.path.exists(os.path.join(str(tmp_path), keys[1][:2], keys[1] + ".json"))
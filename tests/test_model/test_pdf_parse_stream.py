@@ -0,0 +1,49 @@
+import copy
+import json
+import os
+
+import pytest
+
+from magic_pdf.pdf_parse_union_core import pdf_parse_union, pdf_parse_union_stream
+from magic_pdf.rw.DiskReaderWriter import DiskReaderWriter
+
+pdf_dev_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test_cli", "pdf_dev")
+
+
+@pytest.mark.parametrize("pdf_name", ["academic_literature_f7904bc37cc2e25c1e3e412978854b10",
+                                      "research_report_1f978cd81fb7260c8f7644039ec2c054"])
+@pytest.mark.parametrize("parse_mode", ["txt", "ocr"])
+def test_pdf_parse_union_stream(tmp_path, pdf_name, parse_mode):
+    """
+    逐页追加模型数据的流水线解析结果与一次性解析相同
+    """
+    with open(os.path.join(pdf_dev_dir, "pdf", f"{pdf_name}.pdf"), "rb") as f:
+        pdf_bytes = f.read()
+    with open(os.path.join(pdf_dev_dir, f"{pdf_name}_model.json"), "r", encoding="utf-8") as f:
+        model_list = json.load(f)
+    image_writer = DiskReaderWriter(str(tmp_path))
+
+    expected = pdf_parse_union(pdf_bytes, copy.deepcopy(model_list), image_writer, parse_mode)
+    result = pdf_parse_union_stream(pdf_bytes, iter(copy.deepcopy(model_list)), image_writer, parse_mode)
+    assert result == expected
+
+
+@pytest.mark.parametrize("pdf_name", ["academic_literature_f7904bc37cc2e25c1e3e412978854b10",
+                                      "academic_literature_0b2c9c91f5232541a7ace8984df306b2",
+                                      "research_report_1f978cd81fb7260c8f7644039ec2c054"])
+@pytest.mark.parametrize("parse_mode", ["txt", "ocr"])
+def test_pdf_parse_union_parallel(tmp_path, pdf_name, parse_mode):
+    """
+    多进程逐页解析的结果与单进程解析相同, 且不修改传入的model_list
+    """
+    with open(os.path.join(pdf_dev_dir, "pdf", f"{pdf_name}.pdf"), "rb") as f:
+        pdf_bytes = f.read()
+    with open(os.path.join(pdf_dev_dir, f"{pdf_name}_model.json"), "r", encoding="utf-8") as f:
+        model_list = json.load(f)
+    image_writer = DiskReaderWriter(str(tmp_path))
+
+    expected = pdf_parse_union(pdf_bytes, copy.deepcopy(model_list), image_writer, parse_mode)
+    parallel_model_list = copy.deepcopy(model_list)
+    result = pdf_parse_union(pdf_bytes, parallel_model_list, image_writer, parse_mode, workers=2)
+    assert result == expected
+    assert parallel_model_list == model_list
@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from magic_pdf.libs.Constants import INFERENCE_BACKEND_TORCH, INFERENCE_BACKEND_TORCH_INT8
+from magic_pdf.model.quantize import apply_inference_backend, quantize_dynamic_int8
+
+
+def _model():
+    torch.manual_seed(0)
+    return torch.nn.Sequential(torch.nn.Linear(64, 128), torch.nn.ReLU(), torch.nn.Linear(128, 16)).eval()
+
+
+def test_int8_output_close_to_fp32():
+    model = _model()
+    x = torch.randn(8, 64)
+    with torch.no_grad():
+        fp32_out = model(x)
+        int8_out = quantize_dynamic_int8(model)(x)
+    assert isinstance(model[0], torch.nn.quantized.dynamic.Linear)
+    assert torch.allclose(fp32_out, int8_out, atol=0.05)
+
+
+def test_backend_only_quantizes_on_cpu():
+    model = apply_inference_backend(_model(), "test", INFERENCE_BACKEND_TORCH, "cpu")
+    assert isinstance(model[0], torch.nn.Linear)
+    model = apply_inference_backend(_model(), "test", INFERENCE_BACKEND_TORCH_INT8, "cuda")
+    assert isinstance(model[0], torch.nn.Linear)
+    model = apply_inference_backend(_model(), "test", INFERENCE_BACKEND_TORCH_INT8, "cpu")
+    assert isinstance(model[0], torch.nn.quantized.dynamic.Linear)
+
+
+def _models_dir():
+    try:
+        from magic_pdf.libs.config_reader import get_local_models_dir
+        models_dir = get_local_models_dir()
+    except FileNotFoundError:
+        pytest.skip("magic-pdf.json not found")
+    if not os.path.exists(os.path.join(models_dir, "Layout", "model_final.pth")):
+        pytest.skip("models not downloaded")
+    return models_dir
+
+
+def _iou(box1, box2):
+    x0, y0 = max(box1[0], box2[0]), max(box1[1], box2[1])
+    x1, y1 = min(box1[2], box2[2]), min(box1[3], box2[3])
+    inter = max(0, x1 - x0) * max(0, y1 - y0)
+    union = (box1[2] - box1[0]) * (box1[3] - box1[1]) + (box2[2] - box2[0]) * (box2[3] - box2[1]) - inter
+    return inter / union if union > 0 else 0
+
+
+def _bbox(res):
+    poly = res["poly"]
+    return [poly[0], poly[1], poly[4], poly[5]]
+
+
+def test_int8_layout_mfr_parity_on_paper(tmp_path):
+    models_dir = _models_dir()
+    from magic_pdf.model.doc_analyze_by_custom_model import load_images_from_pdf
+    from magic_pdf.model.pdf_extract_kit import CustomPEKModel
+
+    paper_pdf_path = os.path.join(os.path.dirname(__file__), "..", "assets", "paper", "paper.pdf")
+    with open(paper_pdf_path, "rb") as f:
+        images = [page["img"] for page in load_images_from_pdf(f.read())]
+
+    model_input = {"models_dir": models_dir, "device": "cpu"}
+    fp32_results = CustomPEKModel(**model_input).batch_analyze(images)
+    int8_model = CustomPEKModel(inference_config={"backend": INFERENCE_BACKEND_TORCH_INT8}, **model_input)
+    int8_results = int8_model.batch_analyze(images)
+
+    # layout: fp32的检测框在int8结果中能找到同类别且IoU>0.8的框
+    matched = total = 0
+    # 公式: 两个结果都有的公式区域, latex一致的比例
+    latex_same = latex_total = 0
+    for fp32_page, int8_page in zip(fp32_results, int8_results):
+        for res in fp32_page:
+            candidates = [r for r in int8_page if r["category_id"] == res["category_id"]]
+            best = max(candidates, key=lambda r: _iou(_bbox(r), _bbox(res)), default=None)
+            total += 1
+            if best is not None and _iou(_bbox(best), _bbox(res)) > 0.8:
+                matched += 1
+                if "latex" in res and "latex" in best:
+                    latex_total += 1
+                    latex_same += res["latex"] == best["latex"]
+    assert total > 0
+    assert matched / total >= 0.95
+    if latex_total > 0:
+        assert latex_same / latex_total >= 0.9
@@ -0,0 +1,111 @@
+import os
+import threading
+
+import fitz
+import numpy as np
+import pytest
+
+from magic_pdf.model import doc_analyze_by_custom_model
+from magic_pdf.model.doc_analyze_by_custom_model import iter_images_from_pdf, render_page_to_image
+
+SHM_DIR = "/dev/shm"
+
+held_lock = threading.Lock()
+
+
+def _pdf_bytes(page_count):
+    with fitz.open() as doc:
+        for index in range(page_count):
+            page = doc.new_page(width=200 + index * 10, height=300)
+            page.insert_text((20, 50), f"page {index}", fontsize=12)
+        return doc.tobytes()
+
+
+def _shm_names():
+    if not os.path.isdir(SHM_DIR):
+        pytest.skip("shared memory is not visible in the file system")
+    return set(os.listdir(SHM_DIR))
+
+
+def test_process_pool_keeps_page_order():
+    pdf_bytes = _pdf_bytes(7)
+    shm_before = _shm_names()
+    with fitz.open("pdf", pdf_bytes) as doc:
+        expected = [render_page_to_image(doc[index], 72) for index in range(doc.page_count)]
+    result = list(iter_images_from_pdf(pdf_bytes, dpi=72, prefetch=3, workers=2))
+    assert [img_dict["width"] for img_dict in result] == [img_dict["width"] for img_dict in expected]
+    assert all(np.array_equal(img_dict["img"], expected_dict["img"])
+               for img_dict, expected_dict in zip(result, expected))
+    assert _shm_names() - shm_before == set()
+
+
+def test_process_pool_releases_shm_on_early_exit():
+    pdf_bytes = _pdf_bytes(9)
+    shm_before = _shm_names()
+    images = iter_images_from_pdf(pdf_bytes, dpi=72, prefetch=4, workers=2)
+    assert next(images)["width"] == 200
+    images.close()
+    assert _shm_names() - shm_before == set()
+
+
+def test_process_pool_pending_pages_bounded_by_prefetch(monkeypatch):
+    # workers多于prefetch时, 同时在途的页面数仍不超过prefetch
+    submitted = []
+
+    class RecordingExecutor(doc_analyze_by_custom_model.ProcessPoolExecutor):
+        def submit(self, fn, page_start, page_end, *args):
+            submitted.append(page_end - page_start)
+            return super().submit(fn, page_start, page_end, *args)
+
+    monkeypatch.setattr(doc_analyze_by_custom_model, "ProcessPoolExecutor", RecordingExecutor)
+    images = iter_images_from_pdf(_pdf_bytes(6), dpi=72, prefetch=2, workers=4)
+    next(images)
+    # 产出第一页时已提交的页数
+    assert sum(submitted) <= 2
+    images.close()
+
+
+def _locking_worker_init(pdf_bytes):
+    # fork出的进程会继承主进程中已被持有的锁, 在这里一直等不到
+    if not held_lock.acquire(timeout=10):
+        raise RuntimeError("lock held by the parent process was inherited")
+    held_lock.release()
+    doc_analyze_by_custom_model._raster_worker_init(pdf_bytes)
+
+
+def test_process_pool_ignores_locks_held_by_parent_threads(monkeypatch):
+    monkeypatch.setattr(doc_analyze_by_custom_model, "_raster_worker_init", _locking_worker_init)
+    acquired, release = threading.Event(), threading.Event()
+
+    def hold_lock():
+        with held_lock:
+            acquired.set()
+            release.wait()
+
+    holder = threading.Thread(target=hold_lock, daemon=True)
+    holder.start()
+    acquired.wait()
+    try:
+        result = list(iter_images_from_pdf(_pdf_bytes(4), dpi=72, prefetch=2, workers=2))
+    finally:
+        release.set()
+        holder.join()
+    assert [img_dict["width"] for img_dict in result] == [200, 210, 220, 230]
+
+
+class FailingModel:
+    def batch_analyze(self, images, **kwargs):
+        raise ValueError("inference failed")
+
+
+def test_doc_analyze_stops_renderer_on_error(monkeypatch):
+    monkeypatch.setattr(doc_analyze_by_custom_model.ModelSingleton, "_models", {(False, False): FailingModel()})
+    monkeypatch.setattr(doc_analyze_by_custom_model, "get_raster_config", lambda: {"workers": 2, "prefetch": 4})
+    monkeypatch.setattr(doc_analyze_by_custom_model, "get_blank_page_config", lambda: {"enable": False})
+    monkeypatch.setattr(doc_analyze_by_custom_model, "get_page_cache", lambda: None)
+    shm_before = _shm_names()
+    # 异常的traceback引用着doc_analyze的栈帧, 渲染生成器不会被垃圾回收, 需要doc_analyze自己关闭
+    with pytest.raises(ValueError, match="inference failed") as excinfo:
+        doc_analyze_by_custom_model.doc_analyze(_pdf_bytes(9))
+    assert _shm_names() - shm_before == set()
+    del excinfo
@@ -0,0 +1,134 @@
+import threading
+
+from magic_pdf.model.table_task import TableTaskGroup, new_table_executor
+
+
+class FakeClock:
+    """
+    由识别函数推进的时钟, 预算相关的测试不依赖真实的耗时
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def fake_recognizer(clock):
+    def recognize(images):
+        # image为需要的耗时(秒)
+        clock.now += sum(images)
+        return [{"html": f"<table>{image}</table>"} for image in images]
+    return recognize
+
+
+def fake_recognize(images):
+    return [{"html": f"<table>{image}</table>"} for image in images]
+
+
+def test_table_task_group():
+    group = TableTaskGroup(new_table_executor(), fake_recognize, table_max_time=10, doc_max_time=10)
+    tables = [{"category_id": 5} for _ in range(3)]
+    for res in tables:
+        group.submit(res, 0)
+    assert group.collect() == 3
+    assert all("html" in res for res in tables)
+    group.close()
+
+
+def test_table_task_group_table_budget():
+    # 超过单表预算的表格不写入结果, 后面的表格不受影响
+    clock = FakeClock()
+    group = TableTaskGroup(new_table_executor(), fake_recognizer(clock), table_max_time=0.3, doc_max_time=10,
+                           clock=clock)
+    slow_table, fast_table = {"category_id": 5}, {"category_id": 5}
+    group.submit(slow_table, 0.6)
+    group.submit(fast_table, 0)
+    assert group.collect() == 1
+    assert "html" not in slow_table
+    assert "html" in fast_table
+    group.close()
+
+
+def test_table_task_group_doc_budget():
+    # 整篇文档的预算用完后, 排队中的表格被跳过
+    clock = FakeClock()
+    group = TableTaskGroup(new_table_executor(), fake_recognizer(clock), table_max_time=10, doc_max_time=0.3,
+                           clock=clock)
+    tables = [{"category_id": 5} for _ in range(4)]
+    for res in tables:
+        group.submit(res, 0.2)
+    # 第3张表格开始时已经超过预算
+    assert group.collect() == 2
+    assert "html" in tables[1]
+    assert "html" not in tables[2] and "html" not in tables[3]
+    group.close()
+
+
+def test_doc_budget_starts_with_first_task():
+    # 前一篇文档超时的表格仍占用共享的表格线程, 不消耗下一篇文档的预算
+    clock = FakeClock()
+    executor = new_table_executor()
+    started, release = threading.Event(), threading.Event()
+
+    def recognize(images):
+        if images == ["stuck"]:
+            started.set()
+            release.wait()
+            return [{}]
+        return fake_recognize(images)
+
+    first_doc = TableTaskGroup(executor, recognize, table_max_time=1, doc_max_time=100, clock=clock)
+    first_doc.submit({"category_id": 5}, "stuck")
+    started.wait()
+    clock.now += 2
+    assert first_doc.collect() == 0
+    assert first_doc.timeout_count == 1
+
+    second_doc = TableTaskGroup(executor, recognize, table_max_time=100, doc_max_time=1, clock=clock)
+    table = {"category_id": 5}
+    second_doc.submit(table, "fast")
+    clock.now += 10
+    release.set()
+    assert second_doc.collect() == 1
+    assert "html" in table
+    first_doc.close()
+    second_doc.close()
+
+
+def test_table_task_group_batch():
+    batch_sizes = []
+
+    def recognize(images):
+        batch_sizes.append(len(images))
+        return fake_recognize(images)
+
+    group = TableTaskGroup(new_table_executor(), recognize, table_max_time=10, doc_max_time=10, batch_size=2)
+    tables = [{"category_id": 5} for _ in range(5)]
+    for res in tables:
+        group.submit(res, 0)
+    assert group.collect() == 5
+    assert batch_sizes == [2, 2, 1]
+    group.close()
+
+
+def test_table_task_group_groups_by_size():
+    batches = []
+
+    def recognize(images):
+        batches.append(list(images))
+        return [{"html": f"<table>{image}</table>"} for image in images]
+
+    # image为截图面积, 大小表格交替提交
+    group = TableTaskGroup(new_table_executor(), recognize, table_max_time=10, doc_max_time=10, batch_size=2,
+                           sort_window=2, area_fn=lambda image: image)
+    areas = [100, 1, 90, 2, 80, 3, 70]
+    tables = [{"category_id": 5} for _ in areas]
+    for res, area in zip(tables, areas):
+        group.submit(res, area)
+    assert group.collect() == len(areas)
+    # 每4张表格排序后切分batch, 剩余的表格在collect时排序提交
+    assert batches == [[1, 2], [90, 100], [3, 70], [80]]
+    assert [res["html"] for res in tables] == [f"<table>{area}</table>" for area in areas]
+    group.close()
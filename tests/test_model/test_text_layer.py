@@ -0,0 +1,33 @@
+import fitz
+
+from magic_pdf.libs.pdf_check import detect_page_text_layer_valid
+
+LINES = ["Thequickbrownfoxjumpsoverthelazydog", "Packmyboxwithfivedozenliquorjugs", "Sphinxofblackquartzjudgemyvow"]
+
+
+def _page_pdf_bytes(garbled):
+    with fitz.open() as doc:
+        page = doc.new_page()
+        page.insert_font(fontname="F0", fontbuffer=fitz.Font("cjk").buffer)
+        for index, line in enumerate(LINES):
+            page.insert_text((50, 80 + index * 20), line, fontname="F0", fontsize=11)
+        if garbled:
+            # 去掉ToUnicode和内嵌字体后, fitz输出看似正常但错误的字母, pdfminer输出(cid:xxx)
+            for xref in range(1, doc.xref_length()):
+                for key in ("ToUnicode", "FontFile2"):
+                    if doc.xref_get_key(xref, key)[0] != "null":
+                        doc.xref_set_key(xref, key, "null")
+        return doc.tobytes()
+
+
+def test_normal_text_layer_is_valid():
+    with fitz.open("pdf", _page_pdf_bytes(garbled=False)) as doc:
+        assert detect_page_text_layer_valid(doc[0])
+
+
+def test_garbled_font_text_layer_is_invalid():
+    with fitz.open("pdf", _page_pdf_bytes(garbled=True)) as doc:
+        text = doc[0].get_text()
+        # fitz的文字没有乱码字符, 只能通过pdfminer的cid比例识别
+        assert "�" not in text and text.strip() != ""
+        assert not detect_page_text_layer_valid(doc[0])
@@ -0,0 +1,81 @@
+import pytest
+
+from magic_pdf.libs.bbox_index import BboxGridIndex
+from magic_pdf.pre_proc.ocr_dict_merge import fill_spans_in_blocks
+
+
+def _block(bbox, block_type="text"):
+    return bbox + [None, None, None, block_type]
+
+
+def _span(name, bbox):
+    return {'bbox': bbox, 'content': name}
+
+
+def _names(spans):
+    return [span['content'] for span in spans]
+
+
+SPANS = [
+    _span("inside", [10, 10, 50, 20]),
+    _span("image", [210, 10, 250, 20]),
+    # 与第一个block重叠的面积占span的1/4
+    _span("quarter", [90, 30, 130, 40]),
+    _span("outside", [400, 400, 420, 410]),
+    _span("inside2", [20, 50, 60, 60]),
+    # 与第一个block右边界相接, 重叠面积为0
+    _span("edge", [100, 70, 110, 80]),
+    # 面积为0的span
+    _span("zero_area", [10, 90, 10, 95]),
+]
+
+
+# block按顺序领取span, block内span的顺序和剩余span的顺序与输入相同
+@pytest.mark.parametrize("radio, block_spans, remaining", [
+    (0.5, [["inside", "inside2"], ["image"]], ["quarter", "outside", "edge", "zero_area"]),
+    (0.2, [["inside", "quarter", "inside2"], ["image"]], ["outside", "edge", "zero_area"]),
+    (0, [["inside", "quarter", "inside2"], ["image"]], ["outside", "edge", "zero_area"]),
+    # radio小于0时不相交的span也满足条件, 全部放入第一个block
+    (-1, [[span['content'] for span in SPANS], []], []),
+])
+def test_fill_spans_in_blocks(radio, block_spans, remaining):
+    blocks = [_block([0, 0, 100, 100]), _block([200, 0, 300, 100], "image")]
+    spans = list(SPANS)
+    block_with_spans, spans_left = fill_spans_in_blocks(blocks, spans, radio)
+    assert [block['type'] for block in block_with_spans] == ["text", "image"]
+    assert [block['bbox'] for block in block_with_spans] == [[0, 0, 100, 100], [200, 0, 300, 100]]
+    assert [_names(block['spans']) for block in block_with_spans] == block_spans
+    assert _names(spans_left) == remaining
+    # 剩余的span原地修改
+    assert spans_left is spans
+
+
+def test_span_in_overlapping_blocks_goes_to_first_block():
+    blocks = [_block([0, 0, 100, 100]), _block([50, 0, 150, 100])]
+    spans = [_span("both", [60, 10, 90, 20]), _span("second", [110, 10, 140, 20])]
+    block_with_spans, spans_left = fill_spans_in_blocks(blocks, spans, 0.5)
+    assert [_names(block['spans']) for block in block_with_spans] == [["both"], ["second"]]
+    assert spans_left == []
+
+
+def test_duplicate_spans_are_both_assigned():
+    span = _span("dup", [10, 10, 50, 20])
+    block_with_spans, spans_left = fill_spans_in_blocks([_block([0, 0, 100, 100])], [span, dict(span)], 0.5)
+    assert _names(block_with_spans[0]['spans']) == ["dup", "dup"]
+    assert spans_left == []
+
+
+def test_no_blocks_or_spans():
+    assert fill_spans_in_blocks([], [_span("a", [0, 0, 1, 1])], 0.5) == ([], [_span("a", [0, 0, 1, 1])])
+    block_with_spans, spans_left = fill_spans_in_blocks([_block([0, 0, 10, 10])], [], 0.5)
+    assert block_with_spans == [{'type': "text", 'bbox': [0, 0, 10, 10], 'spans': []}] and spans_left == []
+
+
+def test_grid_index_query():
+    index = BboxGridIndex([[0, 0, 10, 10], [120, 120, 130, 130], [45, 45, 55, 55]], cell_size=50)
+    # 候选按格子筛选, 同一格子内不相交的bbox也会返回
+    assert index.query([0, 0, 20, 20]) == [0, 2]
+    assert index.query([100, 100, 140, 140]) == [1]
+    assert index.query([300, 300, 310, 310]) == []
+    index.remove(2)
+    assert index.query([0, 0, 20, 20]) == [0]
@@ -0,0 +1,71 @@
+import copy
+
+import pytest
+
+import magic_pdf.pre_proc.ocr_span_list_modify as ocr_span_list_modify
+from magic_pdf.libs.drop_tag import DropTag
+from magic_pdf.pre_proc.ocr_span_list_modify import remove_overlaps_low_confidence_spans, remove_overlaps_min_spans
+
+
+def _span(name, bbox, score=1.0):
+    return {'bbox': bbox, 'score': score, 'type': 'text', 'content': name}
+
+
+def _names(spans):
+    return [span['content'] for span in spans]
+
+
+@pytest.fixture(params=[None, 2], ids=["one_chunk", "chunked"])
+def chunk_rows(request, monkeypatch):
+    # 分块计算两两重叠时结果不变
+    if request.param is not None:
+        monkeypatch.setattr(ocr_span_list_modify, "PAIRWISE_CHUNK_ROWS", request.param)
+
+
+# iou > 0.9 的两个span删除分数较低的一个
+@pytest.mark.parametrize("spans, kept, dropped", [
+    ([_span("high", [0, 0, 100, 10], 0.9), _span("low", [1, 0, 100, 10], 0.5), _span("alone", [200, 0, 300, 10], 0.3)],
+     ["high", "alone"], ["low"]),
+    # 分数相同时删除后出现的span
+    ([_span("first", [0, 0, 100, 10], 0.8), _span("second", [0, 0, 100, 10.5], 0.8)], ["first"], ["second"]),
+    # 多个互相重叠的span只保留分数最高的
+    ([_span("a", [0, 0, 100, 10], 0.9), _span("b", [0, 0, 100, 10.2], 0.5), _span("c", [0.5, 0, 100, 10], 0.7)],
+     ["a"], ["b", "c"]),
+    # 内容完全相同的span互不比较
+    ([_span("dup", [0, 0, 100, 10], 0.5), _span("dup", [0, 0, 100, 10], 0.5)], ["dup", "dup"], []),
+    # iou不超过0.9和面积为0的span都保留
+    ([_span("wide", [0, 0, 100, 10]), _span("shifted", [10, 0, 110, 10], 0.5), _span("zero_area", [50, 0, 50, 10], 0.1)],
+     ["wide", "shifted", "zero_area"], []),
+    ([], [], []),
+])
+def test_remove_overlaps_low_confidence_spans(chunk_rows, spans, kept, dropped):
+    # 函数会原地修改spans
+    spans = copy.deepcopy(spans)
+    result, dropped_spans = remove_overlaps_low_confidence_spans(spans)
+    assert result is spans
+    assert _names(result) == kept
+    assert _names(dropped_spans) == dropped
+    assert all(span['tag'] == DropTag.SPAN_OVERLAP for span in dropped_spans)
+
+
+# 重叠面积占较小框的比例 > 0.65 时删除较小的span
+@pytest.mark.parametrize("spans, kept, dropped", [
+    ([_span("big", [0, 0, 100, 20]), _span("small", [10, 5, 40, 15]), _span("alone", [200, 0, 300, 10])],
+     ["big", "alone"], ["small"]),
+    # 面积相同时两两比较各删除一次, 两个span都被删除
+    ([_span("left", [0, 0, 100, 10]), _span("right", [20, 0, 120, 10])], [], ["left", "right"]),
+    # bbox相同的span中删除第一个
+    ([_span("same1", [0, 0, 50, 10]), _span("same2", [0, 0, 50, 10])], ["same2"], ["same1"]),
+    # 边界相接和面积为0的span都保留
+    ([_span("a", [300, 0, 310, 10]), _span("b", [310, 0, 320, 10]), _span("outer", [150, 0, 250, 20]),
+      _span("zero_area", [200, 0, 200, 10])], ["a", "b", "outer", "zero_area"], []),
+    ([_span("only", [0, 0, 10, 10])], ["only"], []),
+])
+def test_remove_overlaps_min_spans(chunk_rows, spans, kept, dropped):
+    # 函数会原地修改spans
+    spans = copy.deepcopy(spans)
+    result, dropped_spans = remove_overlaps_min_spans(spans)
+    assert result is spans
+    assert _names(result) == kept
+    assert _names(dropped_spans) == dropped
+    assert all(span['tag'] == DropTag.SPAN_OVERLAP for span in dropped_spans)